@@ -0,0 +1,65 @@
+from cloudshell.snmp.quali_snmp import QualiMibTable
+from cloudshell.networking.cisco.autoload.entity_table import EntityTable
+
+
+class AutoloadContext(object):
+    """State of single discovery run: snmp handler, loaded tables, detected elements and built resources.
+
+    New context is created for every discovery, so autoload object can be reused
+    and shared between discoveries running in parallel threads.
+    """
+
+    RUN_ATTRIBUTES = ('snmp', 'state_storage', 'deadline')
+
+    def __init__(self, snmp=None):
+        """
+        :param snmp: CachedSnmpHandler object used by this run
+        """
+
+        self.snmp = snmp
+        self.state_storage = None
+        self.deadline = None
+        self.completed_phases = []
+        self.raw_entity_table = None
+        self.stack_inventory = None
+
+        self.exclusion_list = []
+        self.excluded_models = []
+        self.chassis_list = []
+        self.module_list = []
+        self.port_list = []
+        self.power_supply_list = []
+        self.relative_path = {}
+        self.port_mapping = {}
+        self.port_channel_members = {}
+        self.resources = list()
+        self.attributes = list()
+
+        self.entity_table = EntityTable()
+        self.if_table = QualiMibTable('ifDescr')
+        self.lldp_local_table = QualiMibTable('lldpLocPortDesc')
+        self.lldp_remote_table = QualiMibTable('lldpRemTable')
+        self.cdp_index_table = QualiMibTable('cdpInterface')
+        self.cdp_table = QualiMibTable('cdpCacheTable')
+        self.duplex_table = QualiMibTable('dot3StatsIndex')
+        self.ip_v4_table = QualiMibTable('ipAddrTable')
+        self.ip_v6_table = QualiMibTable('ipv6AddrEntry')
+        self.port_channel_ports = QualiMibTable('dot3adAggPortAttachedAggID')
+
+    def get_checkpoint_data(self):
+        """Get discovered data to be stored in checkpoint, run specific attributes like snmp handler are skipped
+
+        :rtype: dict
+        """
+
+        return {name: value for name, value in self.__dict__.iteritems() if name not in self.RUN_ATTRIBUTES}
+
+    def restore_checkpoint_data(self, data):
+        """Restore discovered data from checkpoint
+
+        :param data: dict received from get_checkpoint_data
+        """
+
+        for name, value in data.iteritems():
+            if name not in self.RUN_ATTRIBUTES:
+                setattr(self, name, value)
@@ -0,0 +1,38 @@
+STRUCTURE_PROFILE = 'structure'
+STANDARD_PROFILE = 'standard'
+FULL_PROFILE = 'full'
+
+DEFAULT_AUTOLOAD_PROFILE = FULL_PROFILE
+
+PORT_DETAILS = 'port_details'
+PORT_DESCRIPTION = 'port_description'
+IP_ADDRESSES = 'ip_addresses'
+PORT_CHANNELS = 'port_channels'
+ADJACENCY = 'adjacency'
+DUPLEX = 'duplex'
+AUTO_NEGOTIATION = 'auto_negotiation'
+
+AUTOLOAD_PROFILES = \
+    {
+        STRUCTURE_PROFILE: [],
+        STANDARD_PROFILE: [PORT_DETAILS, PORT_DESCRIPTION, IP_ADDRESSES, PORT_CHANNELS],
+        FULL_PROFILE: [PORT_DETAILS, PORT_DESCRIPTION, IP_ADDRESSES, PORT_CHANNELS, ADJACENCY, DUPLEX,
+                       AUTO_NEGOTIATION]
+    }
+
+
+def get_profile_features(profile_name):
+    """Get list of optional autoload features enabled by provided profile
+
+    :param profile_name: autoload profile name, i.e. 'structure', 'standard' or 'full'
+    :return: list of enabled features
+    :rtype: list
+    """
+
+    if not profile_name:
+        profile_name = DEFAULT_AUTOLOAD_PROFILE
+    profile_name = profile_name.lower().strip()
+    if profile_name not in AUTOLOAD_PROFILES:
+        raise Exception('Cisco Generic SNMP Autoload', 'Unknown autoload profile \'{0}\', use one of: {1}'.format(
+            profile_name, ', '.join(sorted(AUTOLOAD_PROFILES.keys()))))
+    return AUTOLOAD_PROFILES[profile_name]
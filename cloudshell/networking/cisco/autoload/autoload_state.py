@@ -0,0 +1,83 @@
+import re
+
+from cloudshell.networking.cisco.local_storage import get_local_storage_path, load_pickle, save_pickle, remove_file
+
+
+class AutoloadStateStorage(object):
+    """Local storage of the device structure detected by the last full autoload:
+    entity table rows, relative paths and entity -> ifTable mapping.
+
+    Stored structure is used by scoped operations, i.e. subtree rediscovery, to keep relative addresses
+    consistent with the resources created by the full autoload.
+    Checkpoints of the interrupted full autoload are stored separately.
+    """
+
+    FILE_NAME_TEMPLATE = 'autoload_state_{0}.pickle'
+    CHECKPOINT_FILE_NAME_TEMPLATE = 'autoload_checkpoint_{0}.pickle'
+    STATE_VERSION = 1
+
+    def __init__(self, device_id, storage_folder=None):
+        """
+        :param device_id: unique device identifier, i.e. resource name
+        :param storage_folder: optional custom storage folder
+        """
+
+        self.device_id = device_id
+        self._storage_folder = storage_folder
+
+    @property
+    def file_path(self):
+        return self._get_file_path(self.FILE_NAME_TEMPLATE)
+
+    @property
+    def checkpoint_file_path(self):
+        return self._get_file_path(self.CHECKPOINT_FILE_NAME_TEMPLATE)
+
+    def _get_file_path(self, file_name_template):
+        file_name = file_name_template.format(re.sub(r'[^\w\-.]+', '_', self.device_id))
+        return get_local_storage_path(file_name, self._storage_folder)
+
+    def load(self):
+        """Load stored state
+
+        :return: state dict or None if state wasn't stored yet or was stored by incompatible driver version
+        """
+
+        state = load_pickle(self.file_path)
+        if not isinstance(state, dict) or state.get('version') != self.STATE_VERSION:
+            return None
+        return state
+
+    def save(self, state):
+        """Store state
+
+        :param state: dict with picklable values
+        """
+
+        state = dict(state)
+        state['version'] = self.STATE_VERSION
+        save_pickle(self.file_path, state)
+
+    def load_checkpoint(self):
+        """Load checkpoint of the interrupted autoload
+
+        :return: checkpoint dict or None
+        """
+
+        checkpoint = load_pickle(self.checkpoint_file_path)
+        if not isinstance(checkpoint, dict) or checkpoint.get('version') != self.STATE_VERSION:
+            return None
+        return checkpoint
+
+    def save_checkpoint(self, checkpoint):
+        """Store checkpoint of the autoload in progress
+
+        :param checkpoint: dict with picklable values
+        """
+
+        checkpoint = dict(checkpoint)
+        checkpoint['version'] = self.STATE_VERSION
+        save_pickle(self.checkpoint_file_path, checkpoint)
+
+    def remove_checkpoint(self):
+        remove_file(self.checkpoint_file_path)
@@ -0,0 +1,560 @@
+import re
+import time
+from collections import OrderedDict
+from threading import Lock, RLock
+from weakref import WeakKeyDictionary
+
+from pyasn1.type.univ import Null
+from pysnmp.error import PySnmpError
+from pysnmp.proto import errind
+from pysnmp.smi.rfc1902 import ObjectIdentity
+from cloudshell.snmp.quali_snmp import QualiMibTable, QualiSnmp
+
+
+class CachedSnmpHandler(object):
+    """Request scoped wrapper around snmp handler, which deduplicates identical (MIB, object, index) reads.
+
+    Values received from table walks are also used to answer later point requests for the same object and index.
+    Create new instance for every discovery, cached values are never expired.
+    If transport policy is provided, tables are walked with GETBULK requests sized by the policy.
+    If capability cache is provided, tables and objects known as unsupported by the platform are not requested.
+    Sparse per element properties can be prefetched with packed multi varbind GET requests.
+    If rate governor is provided, every request sent to the device waits for it's permission.
+    Requests of all wrappers of the same snmp handler are serialized, as QualiSnmp keeps response of the last
+    request on the instance, so discoveries running in parallel threads can share it.
+    """
+
+    MIB_RENDERED_VALUE_MARKER = '::'
+    NO_SUCH_OBJECT_MARKER = 'No Such Object'
+    NO_SUCH_VALUE_PATTERN = r'^No Such (Object|Instance)'
+    MAX_TIMEOUT_RETRIES = 3
+    TIMEOUT_PATTERN = r'No SNMP response received before timeout'
+
+    _HANDLER_LOCKS = WeakKeyDictionary()
+    _HANDLER_LOCKS_LOCK = Lock()
+
+    def __init__(self, snmp_handler, transport_policy=None, capabilities=None, rate_governor=None):
+        """Wrap provided snmp handler
+
+        :param snmp_handler: QualiSnmp object
+        :param transport_policy: AdaptiveSnmpTransportPolicy object
+        :param capabilities: SnmpCapabilityCache object
+        :param rate_governor: SnmpRateGovernor object
+        """
+
+        self._snmp = snmp_handler
+        self._handler_lock = self._get_handler_lock(snmp_handler)
+        self.transport_policy = transport_policy
+        self.capabilities = capabilities
+        self.rate_governor = rate_governor
+        self.platform_id = None
+        self._transport_targets = {}
+        self._loaded_mibs = set()
+        self._tables = {}
+        self._values = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, item):
+        return getattr(self._snmp, item)
+
+    @classmethod
+    def _get_handler_lock(cls, snmp_handler):
+        """Get lock, which serializes requests sent with provided snmp handler
+
+        :rtype: RLock
+        """
+
+        with cls._HANDLER_LOCKS_LOCK:
+            if snmp_handler not in cls._HANDLER_LOCKS:
+                cls._HANDLER_LOCKS[snmp_handler] = RLock()
+            return cls._HANDLER_LOCKS[snmp_handler]
+
+    def update_mib_sources(self, mib_folder_path):
+        with self._handler_lock:
+            self._snmp.update_mib_sources(mib_folder_path)
+
+    @staticmethod
+    def _get_key(snmp_module_name, property_name, index):
+        if isinstance(index, (list, tuple)):
+            index = '.'.join([str(item) for item in index])
+        return snmp_module_name, property_name, str(index)
+
+    def set_platform(self, platform_id):
+        """Set platform identifier used to look up tuned transport settings and known capabilities
+
+        :param platform_id: platform identifier, i.e. sysObjectID
+        """
+
+        self.platform_id = platform_id
+        if self.transport_policy:
+            self.transport_policy.set_platform(platform_id)
+
+    def _is_supported(self, snmp_module_name, object_name):
+        return not self.capabilities or self.capabilities.is_supported(self.platform_id, snmp_module_name,
+                                                                       object_name)
+
+    def _update_capabilities(self, snmp_module_name, object_name, value):
+        if not self.capabilities:
+            return
+        if self.NO_SUCH_OBJECT_MARKER in value:
+            self.capabilities.set_unsupported(self.platform_id, snmp_module_name, object_name)
+        elif value:
+            self.capabilities.set_supported(self.platform_id, snmp_module_name, object_name)
+
+    def _acquire(self):
+        if self.rate_governor:
+            self.rate_governor.acquire()
+
+    def _record_timeout(self):
+        if self.transport_policy:
+            self.transport_policy.record_timeout()
+        if self.rate_governor:
+            self.rate_governor.record_timeout()
+
+    def _record_success(self):
+        if self.rate_governor:
+            self.rate_governor.record_success()
+
+    @staticmethod
+    def _is_timeout(error):
+        return any(isinstance(arg, errind.RequestTimedOut) or re.search(CachedSnmpHandler.TIMEOUT_PATTERN, str(arg))
+                   for arg in getattr(error, 'args', []))
+
+    def _send(self, request, *args):
+        """Send single request to the device, it waits for rate governor permission
+        and it's timeout or response is accounted by the governor
+
+        :param request: handler method, i.e. QualiSnmp.get
+        :param args: method arguments
+        """
+
+        self._acquire()
+        try:
+            with self._handler_lock:
+                result = request(*args)
+        except Exception as e:
+            if self.rate_governor and self._is_timeout(e):
+                self.rate_governor.record_timeout()
+            raise
+        if self.rate_governor:
+            self.rate_governor.record_success()
+        return result
+
+    def _get_property(self, snmp_module_name, property_name, index):
+        """Same as QualiSnmp.get_property, but the request is sent with _send, so it's timeout isn't hidden
+        from the rate governor
+        """
+
+        if not isinstance(self._snmp, QualiSnmp):
+            return self._send(self._snmp.get_property, snmp_module_name, property_name, index)
+        if isinstance(index, str):
+            index_list = index.split('.')
+        else:
+            index_list = [index]
+        try:
+            result = self._send(self._snmp.get, (snmp_module_name, property_name) + tuple(index_list))
+            return list(result.values())[0].strip(' \t\n\r')
+        except Exception as e:
+            self._snmp.logger.error(e.args)
+            return ''
+
+    def get_statistics(self):
+        """Get cache hit/miss counters
+
+        :return: dict{'hits': int, 'misses': int}
+        """
+
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def get_cache(self):
+        """Get cached values and tables, i.e. to store them in autoload checkpoint
+
+        :return: dict{'values': dict, 'tables': dict}
+        """
+
+        return {'values': dict(self._values), 'tables': dict(self._tables)}
+
+    def update_cache(self, cache):
+        """Add values and tables received from get_cache, MIBs used to render them should be already loaded
+
+        :param cache: dict{'values': dict, 'tables': dict}
+        """
+
+        self._values.update(cache.get('values', {}))
+        self._tables.update(cache.get('tables', {}))
+
+    def load_mib(self, mib_list):
+        """Load MIBs, which were not loaded yet during this request.
+        Cached values rendered with help of MIBs (i.e. 'SNMPv2-SMI::enterprises.9.1.359') are dropped,
+        as newly loaded MIBs change their representation.
+
+        :param mib_list: List of MIB names, for example: ['CISCO-PRODUCTS-MIB', 'CISCO-ENTITY-VENDORTYPE-OID-MIB']
+        """
+
+        if isinstance(mib_list, str):
+            mib_list = [mib_list]
+
+        new_mibs = [mib for mib in mib_list if mib not in self._loaded_mibs]
+        if not new_mibs:
+            return
+        with self._handler_lock:
+            self._snmp.load_mib(new_mibs)
+        self._loaded_mibs.update(new_mibs)
+        self._tables.clear()
+        for key, value in self._values.items():
+            if self.MIB_RENDERED_VALUE_MARKER in value:
+                del self._values[key]
+
+    def get(self, *oids):
+        """Get operation for scalars, single (MIB, object, [index]) requests are served from cache when possible
+
+        :param oids: list of oids to get, see QualiSnmp.get
+        :return: a dictionary of <oid, value>
+        """
+
+        if len(oids) != 1 or not isinstance(oids[0], (list, tuple)) or len(oids[0]) < 2:
+            self.misses += 1
+            return self._send(self._snmp.get, *oids)
+
+        oid = list(oids[0])
+        if len(oid) == 2:
+            oid.append(0)
+        key = self._get_key(oid[0], oid[1], oid[2:])
+        if key in self._values:
+            self.hits += 1
+            return OrderedDict([(oid[1], self._values[key])])
+
+        if not self._is_supported(oid[0], oid[1]):
+            self.hits += 1
+            raise Exception(self.__class__.__name__, '{0}::{1} is not supported by the device'.format(oid[0],
+                                                                                                      oid[1]))
+
+        self.misses += 1
+        result = self._send(self._snmp.get, *oids)
+        if result:
+            self._values[key] = result.values()[0]
+            self._update_capabilities(oid[0], oid[1], self._values[key])
+        return result
+
+    def get_property(self, snmp_module_name, property_name, index, return_type='str'):
+        """Get SNMP value from specified MIB and property name, use cached value if exists
+
+        :param snmp_module_name: MIB name, like 'IF-MIB'
+        :param property_name: map of required property and it's default type, i.e. 'ifDescr'
+        :param index: index of the required element, i.e. '1' or '1.2.3.0'
+        :param return_type: type of the output we expect to get in response, i.e. 'int'
+        :return: string
+        """
+
+        key = self._get_key(snmp_module_name, property_name, index)
+        if key in self._values:
+            self.hits += 1
+            return_value = self._values[key].strip(' \t\n\r')
+        elif not self._is_supported(snmp_module_name, property_name):
+            self.hits += 1
+            return_value = ''
+        else:
+            self.misses += 1
+            return_value = self._get_property(snmp_module_name, property_name, index)
+            self._values[key] = return_value
+            self._update_capabilities(snmp_module_name, property_name, return_value)
+
+        if 'int' in return_type:
+            try:
+                return_value = int(return_value)
+            except ValueError:
+                return_value = 0
+        return return_value
+
+    def get_properties(self, snmp_mib_name, index, properties_map):
+        """Get SNMP table from specified MIB and map of properties.
+
+        :param snmp_mib_name: MIB name 'IF-MIB'
+        :param index: index of the required element '1'
+        :param properties_map: map of required property and it's default type, i.e. {'ifDescr': 'str', 'ifMtu': 'int'}
+        :return: QualiMibTable
+        """
+
+        result = QualiMibTable(snmp_mib_name)
+        result[index] = {}
+        for command_key, command_type in properties_map.iteritems():
+            result[index][command_key] = self.get_property(snmp_mib_name, command_key, index, command_type)
+        return result
+
+    def prefetch(self, snmp_module_name, property_names, indexes):
+        """Read provided properties of provided elements with packed multi varbind GET requests,
+        PDU size is limited by transport policy and shrunk on 'tooBig' responses.
+        Received values serve following get_property requests, values which weren't received are read by them as usual.
+
+        :param snmp_module_name: MIB name, i.e. 'ENTITY-MIB'
+        :param property_names: list of property names, i.e. ['entPhysicalModelName', 'entPhysicalSerialNum']
+        :param indexes: list of element indexes
+        """
+
+        # Packed GET has the same transport requirements as GETBULK, SNMPv1 agent fails whole PDU on missing value
+        if not self._is_bulk_walk_supported():
+            return
+        requests = OrderedDict()
+        for index in indexes:
+            for property_name in property_names:
+                key = self._get_key(snmp_module_name, property_name, index)
+                if key not in self._values and self._is_supported(snmp_module_name, property_name):
+                    requests[key] = None
+        requests = list(requests)
+
+        policy = self.transport_policy
+        timeouts = 0
+        while requests:
+            chunk = requests[:policy.max_varbinds]
+            oids = [ObjectIdentity(mib, property_name, *index.split('.')) for mib, property_name, index in chunk]
+            self._acquire()
+            with self._handler_lock:
+                start_time = time.time()
+                error_indication, error_status, error_index, var_binds = self._snmp.cmd_gen.getCmd(
+                    self._snmp.security, self._get_transport_target(policy.timeout), *oids)
+                rtt = time.time() - start_time
+
+            if isinstance(error_indication, errind.RequestTimedOut) and timeouts < self.MAX_TIMEOUT_RETRIES:
+                timeouts += 1
+                self._record_timeout()
+                continue
+            if not error_indication and error_status and 'tooBig' in error_status.prettyPrint() and len(chunk) > 1:
+                policy.record_too_big()
+                continue
+            if error_indication or error_status:
+                self._snmp.logger.error('Packed GET request failed, values will be requested one by one: {0}'.format(
+                    error_indication or error_status.prettyPrint()))
+                return
+            timeouts = 0
+            self._record_success()
+
+            self.misses += 1
+            for key, (name, value) in zip(chunk, var_binds):
+                value = value.prettyPrint()
+                self._update_capabilities(key[0], key[1], value)
+                if re.search(self.NO_SUCH_VALUE_PATTERN, value):
+                    value = ''
+                self._values[key] = value
+            policy.record_get_response(rtt, len(chunk))
+            requests = requests[len(chunk):]
+
+    def get_table(self, snmp_module_name, table_name):
+        """Get SNMP table from specified MIB and table name.
+        Every walked cell is stored for following get/get_property requests.
+
+        :param snmp_module_name: MIB name
+        :param table_name: table name
+        :return: QualiMibTable
+        """
+
+        return self._get_table(snmp_module_name, table_name)
+
+    def get_optional_table(self, snmp_module_name, table_name):
+        """Get SNMP table, which may be not implemented by the device.
+        Table is skipped if it's recorded as not implemented on this platform, i.e. by 'noSuchObject' response.
+        Empty table isn't recorded, it's walked again by the following discoveries.
+
+        :param snmp_module_name: MIB name
+        :param table_name: table name
+        :return: QualiMibTable
+        """
+
+        return self._get_table(snmp_module_name, table_name, is_optional=True)
+
+    def _get_table(self, snmp_module_name, table_name, is_optional=False):
+        key = (snmp_module_name, table_name)
+        if key in self._tables:
+            self.hits += 1
+            return self._tables[key]
+
+        if is_optional and not self._is_supported(snmp_module_name, table_name):
+            self.hits += 1
+            self._snmp.logger.debug('\'{0}\' table is not supported by the platform, skipped'.format(table_name))
+            return QualiMibTable(table_name)
+
+        self.misses += 1
+        table = self._read_table(snmp_module_name, table_name)
+        self._tables[key] = table
+        # Empty table isn't a sign of unsupported one, i.e. no CDP neighbours, so it's never recorded as unsupported
+        if self.capabilities and is_optional and table:
+            self.capabilities.set_supported(self.platform_id, snmp_module_name, table_name)
+        self._store_table_values(snmp_module_name, table)
+        return table
+
+    def get_table_rows(self, snmp_module_name, column_name, index):
+        """Walk only rows of the table column, which index starts with provided index,
+        i.e. children of single entity in entPhysicalChildIndex column or CDP neighbours of single interface.
+        Column known as unsupported by the platform is not requested.
+
+        :param snmp_module_name: MIB name
+        :param column_name: table column name
+        :param index: index prefix, i.e. 5 or '5.1'
+        :return: QualiMibTable with rows indexed by the full row index
+        """
+
+        key = (snmp_module_name, column_name, str(index))
+        if key in self._tables:
+            self.hits += 1
+            return self._tables[key]
+        if not self._is_supported(snmp_module_name, column_name):
+            self.hits += 1
+            return QualiMibTable(column_name)
+
+        self.misses += 1
+        table = self._read_table(snmp_module_name, column_name, *str(index).split('.'))
+        self._tables[key] = table
+        self._store_table_values(snmp_module_name, table)
+        return table
+
+    def _read_table(self, snmp_module_name, table_name, *indexes):
+        """Walk table with GETBULK requests if possible, fall back to GETNEXT walk
+
+        :rtype: QualiMibTable
+        """
+
+        if self._is_bulk_walk_supported():
+            try:
+                return self._bulk_walk(snmp_module_name, table_name, *indexes)
+            except Exception as e:
+                self._snmp.logger.error('Bulk walk of \'{0}\' failed, fall back to walk: {1}'.format(table_name,
+                                                                                                   e.args))
+        if isinstance(self._snmp, QualiSnmp):
+            try:
+                return self._send(self._walk, snmp_module_name, table_name, *indexes)
+            except Exception as e:
+                self._snmp.logger.error(e.args)
+                return QualiMibTable(table_name)
+        if indexes:
+            return self._send(self._snmp.walk, (snmp_module_name, table_name) + indexes)
+        return self._send(self._snmp.get_table, snmp_module_name, table_name)
+
+    def _store_table_values(self, snmp_module_name, table):
+        for index, row in table.iteritems():
+            suffix = row.get('suffix', str(index))
+            for column, value in row.iteritems():
+                if column != 'suffix':
+                    self._values.setdefault((snmp_module_name, column, suffix), value)
+
+    def _is_bulk_walk_supported(self):
+        """GETBULK is used only with QualiSnmp handler, as it relies on it's transport details, and not for SNMPv1"""
+
+        return self.transport_policy is not None and isinstance(self._snmp, QualiSnmp) and \
+            getattr(self._snmp.security, 'mpModel', 1) != 0
+
+    def _get_transport_target(self, timeout):
+        """Get transport target with provided timeout and transport retries of the policy.
+        Pysnmp caches target settings per target address and tag list, so a separate tagged target is created
+        for every used timeout value.
+
+        :param timeout: request timeout in seconds
+        """
+
+        retries = self.transport_policy.TRANSPORT_RETRIES
+        target = self._snmp.target
+        if target.timeout == timeout and target.retries == retries:
+            return target
+        if timeout not in self._transport_targets:
+            self._transport_targets[timeout] = target.__class__(target.transportAddr, timeout=timeout,
+                                                                retries=retries,
+                                                                tagList='timeout{0}'.format(int(timeout * 100)))
+        return self._transport_targets[timeout]
+
+    @staticmethod
+    def _get_table_index(suffix):
+        """Build table index of walked row: int, float or string, like QualiSnmp.walk does.
+        Double index which can't be represented by float without loss, i.e. '1.10', is kept as string,
+        so it doesn't collide with '1.1'. Both bulk and plain walks of the handler use it,
+        so table has the same indexes whichever way it was read.
+        """
+
+        if str(suffix).isdigit():
+            return int(str(suffix))
+        elif str(suffix).replace('.', '', 1).isdigit() and str(float(str(suffix))) == str(suffix):
+            return float(str(suffix))
+        return str(suffix)
+
+    def _walk(self, snmp_module_name, table_name, *indexes):
+        """Walk table with GETNEXT requests, same as QualiSnmp.walk, but rows are indexed with _get_table_index
+
+        :param snmp_module_name: MIB name
+        :param table_name: table name
+        :param indexes: walk only column rows under the index prefix
+        :return: QualiMibTable
+        """
+
+        error_indication, error_status, error_index, var_bind_table = self._snmp.cmd_gen.nextCmd(
+            self._snmp.security, self._snmp.target, ObjectIdentity(snmp_module_name, table_name, *indexes))
+        if error_indication:
+            raise PySnmpError(error_indication)
+        if error_status:
+            raise PySnmpError(error_status)
+
+        result = QualiMibTable(table_name)
+        for var_binds in var_bind_table:
+            name, value = var_binds[0]
+            mod_name, mib_name, suffix = self._snmp.mib_viewer.getNodeLocation(name)
+            index = self._get_table_index(suffix)
+            if not result.get(index):
+                result[index] = {'suffix': str(suffix)}
+            result[index][mib_name] = value.prettyPrint()
+        return result
+
+    def _bulk_walk(self, snmp_module_name, table_name, *indexes):
+        """Walk table with GETBULK requests, every request is sized by transport policy
+
+        :param snmp_module_name: MIB name
+        :param table_name: table name
+        :param indexes: walk only column rows under the index prefix
+        :return: QualiMibTable
+        """
+
+        policy = self.transport_policy
+        table_oid = ObjectIdentity(snmp_module_name, table_name, *indexes).resolveWithMib(
+            self._snmp.mib_viewer).getOid()
+        result = QualiMibTable(table_name)
+        next_oid = table_oid
+        timeouts = 0
+        while True:
+            max_repetitions = policy.max_repetitions
+            self._acquire()
+            with self._handler_lock:
+                start_time = time.time()
+                error_indication, error_status, error_index, var_bind_table = self._snmp.cmd_gen.bulkCmd(
+                    self._snmp.security, self._get_transport_target(policy.timeout), 0, max_repetitions,
+                    ObjectIdentity(next_oid), lexicographicMode=True, maxCalls=1)
+                rtt = time.time() - start_time
+
+            if isinstance(error_indication, errind.RequestTimedOut) and timeouts < self.MAX_TIMEOUT_RETRIES:
+                timeouts += 1
+                self._record_timeout()
+                continue
+            if error_indication:
+                raise PySnmpError(error_indication)
+            if error_status:
+                raise PySnmpError(error_status.prettyPrint())
+            timeouts = 0
+            self._record_success()
+
+            received_count = 0
+            response_size = 0
+            end_of_table = not var_bind_table
+            for var_binds in var_bind_table:
+                name, value = var_binds[0]
+                if isinstance(value, Null) or not table_oid.isPrefixOf(name):
+                    end_of_table = True
+                    break
+                value = value.prettyPrint()
+                received_count += 1
+                response_size += len(name) + len(value)
+                mod_name, mib_name, suffix = self._snmp.mib_viewer.getNodeLocation(name)
+                index = self._get_table_index(suffix)
+                if not result.get(index):
+                    result[index] = {'suffix': str(suffix)}
+                result[index][mib_name] = value
+                next_oid = name
+
+            policy.record_bulk_response(rtt, max_repetitions, received_count, response_size, end_of_table)
+            if end_of_table or received_count == 0:
+                break
+        return result
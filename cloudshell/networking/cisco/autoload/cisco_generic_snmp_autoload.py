@@ -2,46 +2,96 @@ from cloudshell.configuration.cloudshell_shell_core_binding_keys import LOGGER
 from cloudshell.configuration.cloudshell_snmp_binding_keys import SNMP_HANDLER
 import re
 import os
+import threading
+import time
 
 import inject
 from cloudshell.networking.operations.interfaces.autoload_operations_interface import AutoloadOperationsInterface
 
+from cloudshell.shell.core.context_utils import get_resource_name
 from cloudshell.shell.core.driver_context import AutoLoadDetails
 from cloudshell.snmp.quali_snmp import QualiMibTable
 from cloudshell.networking.autoload.networking_autoload_resource_structure import Port, PortChannel, PowerPort, \
     Chassis, Module
 from cloudshell.networking.autoload.networking_autoload_resource_attributes import NetworkingStandardRootAttributes
 from cloudshell.networking.cisco.resource_drivers_map import CISCO_RESOURCE_DRIVERS_MAP
+from cloudshell.networking.cisco.autoload.autoload_profiles import get_profile_features, PORT_DETAILS, \
+    PORT_DESCRIPTION, IP_ADDRESSES, PORT_CHANNELS, ADJACENCY, DUPLEX, AUTO_NEGOTIATION
+from cloudshell.networking.cisco.autoload.cached_snmp_handler import CachedSnmpHandler
+from cloudshell.networking.cisco.autoload.snmp_transport_policy import AdaptiveSnmpTransportPolicy
+from cloudshell.networking.cisco.autoload.snmp_capabilities import SnmpCapabilityCache
+from cloudshell.networking.cisco.autoload.autoload_state import AutoloadStateStorage
+from cloudshell.networking.cisco.autoload.autoload_context import AutoloadContext
+from cloudshell.networking.cisco.autoload.snmp_rate_governor import SnmpRateGovernor
+from cloudshell.networking.cisco.autoload.entity_table import EntityTable
+from cloudshell.networking.cisco.autoload.cisco_stack_inventory import CiscoStackInventory
+
+
+def _context_attribute(name):
+    """Property delegating access to the attribute of the current thread's discovery context"""
+
+    return property(lambda self: getattr(self.context, name), lambda self, value: setattr(self.context, name, value))
 
 
 class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
     IF_ENTITY = "ifDescr"
     ENTITY_PHYSICAL = "entPhysicalDescr"
-
-    def __init__(self, snmp_handler=None, logger=None, supported_os=None):
+    CHECKPOINT_TTL = 60 * 60
+    STACK_MIB_OS_PATTERN = r'catalyst operating system|catos'
+    STACK_MIB_CHASSIS = 'chassis'
+
+    exclusion_list = _context_attribute('exclusion_list')
+    _excluded_models = _context_attribute('excluded_models')
+    chassis_list = _context_attribute('chassis_list')
+    module_list = _context_attribute('module_list')
+    port_list = _context_attribute('port_list')
+    power_supply_list = _context_attribute('power_supply_list')
+    relative_path = _context_attribute('relative_path')
+    port_mapping = _context_attribute('port_mapping')
+    port_channel_members = _context_attribute('port_channel_members')
+    resources = _context_attribute('resources')
+    attributes = _context_attribute('attributes')
+    entity_table = _context_attribute('entity_table')
+    if_table = _context_attribute('if_table')
+    lldp_local_table = _context_attribute('lldp_local_table')
+    lldp_remote_table = _context_attribute('lldp_remote_table')
+    cdp_index_table = _context_attribute('cdp_index_table')
+    cdp_table = _context_attribute('cdp_table')
+    duplex_table = _context_attribute('duplex_table')
+    ip_v4_table = _context_attribute('ip_v4_table')
+    ip_v6_table = _context_attribute('ip_v6_table')
+    port_channel_ports = _context_attribute('port_channel_ports')
+
+    def __init__(self, snmp_handler=None, logger=None, supported_os=None, autoload_profile=None,
+                 resource_name=None, device_rate_limit=None, global_rate_limit=None):
         """Basic init with injected snmp handler and logger
 
         :param snmp_handler:
         :param logger:
+        :param autoload_profile: name of the autoload profile, 'structure', 'standard' or 'full',
+            if not provided AUTOLOAD_PROFILE from config will be used
+        :param resource_name: resource name, used as a key of the locally stored device structure
+        :param device_rate_limit: max snmp requests per second sent to the device,
+            if not provided SNMP_DEVICE_RATE_LIMIT from config or default limit will be used
+        :param global_rate_limit: max snmp requests per second sent by all autoloads of the driver process,
+            if not provided SNMP_GLOBAL_RATE_LIMIT from config or default limit will be used
         :return:
         """
 
-        self._snmp = snmp_handler
+        self._snmp_handler = snmp_handler
         self._logger = logger
-        self.exclusion_list = []
-        self._excluded_models = []
-        self.module_list = []
-        self.chassis_list = []
+        self._local = threading.local()
         self.supported_os = supported_os
-        self.port_list = []
-        self.power_supply_list = []
-        self.relative_path = {}
-        self.port_mapping = {}
+        self._autoload_profile = autoload_profile
+        self._profile_features = None
         self.entity_table_black_list = ['alarm', 'fan', 'sensor']
         self.port_exclude_pattern = r'serial|stack|engine|management|mgmt|voice|foreign'
         self.module_exclude_pattern = r'cevsfp'
-        self.resources = list()
-        self.attributes = list()
+        self.capabilities = SnmpCapabilityCache()
+        self.resource_name = resource_name
+        self._state_storage = None
+        self._device_rate_limit = device_rate_limit
+        self._global_rate_limit = global_rate_limit
 
     @property
     def logger(self):
@@ -51,55 +101,516 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
             logger = inject.instance(LOGGER)
         return logger
 
+    @property
+    def context(self):
+        """Discovery context of the current thread, per run state is kept there instead of autoload object,
+        so several discoveries can run in parallel threads sharing capability cache and configuration
+
+        :rtype: AutoloadContext
+        """
+
+        context = getattr(self._local, 'context', None)
+        if context is None:
+            context = self._start_context()
+        return context
+
+    def _start_context(self):
+        """Start new discovery run in the current thread"""
+
+        self._local.context = AutoloadContext()
+        return self._local.context
+
     @property
     def snmp(self):
-        if not self._snmp:
-            self._snmp = inject.instance(SNMP_HANDLER)
-        return self._snmp
+        """Request scoped caching snmp handler, new cache is created for every discovery
+
+        :rtype: CachedSnmpHandler
+        """
+
+        if self.context.snmp is None:
+            snmp_handler = self._snmp_handler or inject.instance(SNMP_HANDLER)
+            self.context.snmp = CachedSnmpHandler(snmp_handler, transport_policy=AdaptiveSnmpTransportPolicy(),
+                                                  capabilities=self.capabilities,
+                                                  rate_governor=self._get_rate_governor(snmp_handler))
+        return self.context.snmp
+
+    def _get_rate_governor(self, snmp_handler):
+        """Build rate governor for the device, which is polled by provided snmp handler
+
+        :rtype: SnmpRateGovernor
+        """
+
+        device_rate_limit = self._device_rate_limit or self._get_config_value('SNMP_DEVICE_RATE_LIMIT')
+        global_rate_limit = self._global_rate_limit or self._get_config_value('SNMP_GLOBAL_RATE_LIMIT')
+        device_id = getattr(getattr(snmp_handler, 'target', None), 'transportAddr', None) or id(snmp_handler)
+        return SnmpRateGovernor(device_id, device_rate_limit, global_rate_limit)
+
+    @staticmethod
+    def _get_config_value(name):
+        try:
+            config = inject.instance('config')
+        except Exception:
+            return None
+        return getattr(config, name, None)
+
+    @property
+    def profile_features(self):
+        """List of optional features enabled by selected autoload profile
+
+        :rtype: list
+        """
+
+        if self._profile_features is None:
+            if not self._autoload_profile:
+                self._autoload_profile = self._get_config_value('AUTOLOAD_PROFILE')
+            self._profile_features = get_profile_features(self._autoload_profile)
+        return self._profile_features
+
+    @property
+    def state_storage(self):
+        """Storage of the device structure detected by the last full autoload
+
+        :rtype: AutoloadStateStorage
+        """
+
+        if self._state_storage:
+            return self._state_storage
+        if self.context.state_storage is None:
+            resource_name = self.resource_name
+            if not resource_name:
+                try:
+                    resource_name = get_resource_name()
+                except Exception:
+                    resource_name = self.snmp.get_property('SNMPv2-MIB', 'sysName', 0)
+            self.context.state_storage = AutoloadStateStorage(resource_name)
+        return self.context.state_storage
+
+    def _is_feature_enabled(self, feature):
+        return feature in self.profile_features
 
     def load_cisco_mib(self):
         path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'mibs'))
         self.snmp.update_mib_sources(path)
 
-    def discover(self):
+    def discover(self, time_budget=None, partial_results=False):
         """General entry point for autoload,
         read device structure and attributes: chassis, modules, submodules, ports, port-channels and power supplies
 
+        :param time_budget: time budget in seconds, if provided completed discovery phases are checkpointed
+            to local storage and next phase isn't started once the budget is exhausted,
+            next discovery resumes from the last checkpoint
+        :param partial_results: return resources discovered so far instead of raising an exception
+            when the time budget is exhausted
         :return: AutoLoadDetails object
         """
 
+        self._start_context()
+        if time_budget:
+            self.context.deadline = time.time() + time_budget
         self._is_valid_device_os()
+        self.snmp.set_platform(self.snmp.get_property('SNMPv2-MIB', 'sysObjectID', 0))
 
         self.logger.info('************************************************************************')
         self.logger.info('Start SNMP discovery process .....')
+        self.logger.info('Autoload profile features: {0}'.format(', '.join(self.profile_features) or 'none'))
 
         self.load_cisco_mib()
         self._get_device_details()
         self.snmp.load_mib(['CISCO-PRODUCTS-MIB', 'CISCO-ENTITY-VENDORTYPE-OID-MIB'])
-        self._load_snmp_tables()
+        if time_budget:
+            self._resume_from_checkpoint()
+
+        is_stack_mib_device = self._is_stack_mib_device()
+        load_tables = self._load_stack_mib_tables if is_stack_mib_device else self._load_snmp_tables
+        if not self._run_phase('tables', load_tables):
+            return self._stop_on_time_budget(partial_results)
 
         if len(self.chassis_list) < 1:
             self.logger.error('Entity table error, no chassis found')
             return AutoLoadDetails(list(), list())
 
-        for chassis in self.chassis_list:
-            if chassis not in self.exclusion_list:
-                chassis_id = self._get_resource_id(chassis)
-                if chassis_id == '-1':
-                    chassis_id = '0'
-                self.relative_path[chassis] = chassis_id
+        if is_stack_mib_device:
+            phases = [('structure', self._build_stack_mib_structure),
+                      ('chassis', self._get_stack_mib_chassis_attributes),
+                      ('ports', self._get_ports_attributes),
+                      ('modules', self._get_stack_mib_module_attributes),
+                      ('power_ports', self._get_stack_mib_power_ports)]
+        else:
+            phases = [('structure', self._build_structure),
+                      ('chassis', lambda: self._get_chassis_attributes(self.chassis_list)),
+                      ('ports', self._get_ports_attributes),
+                      ('modules', self._get_module_attributes),
+                      ('power_ports', self._get_power_ports)]
+        if self._is_feature_enabled(PORT_CHANNELS):
+            phases.append(('port_channels', self._get_port_channels))
+        for phase, phase_method in phases:
+            if not self._run_phase(phase, phase_method):
+                return self._stop_on_time_budget(partial_results)
+
+        result = AutoLoadDetails(resources=self.resources, attributes=self.attributes)
+        if not is_stack_mib_device:
+            self._save_state(self.context.raw_entity_table)
+        if time_budget:
+            self._remove_checkpoint()
+        self._log_discovery_results()
+        return result
+
+    def _build_structure(self):
+        """Build relative paths of chassis, modules and ports"""
 
+        self._add_chassis_relative_paths(self.chassis_list)
+        self.context.raw_entity_table = self._copy_entity_table()
         self._filter_lower_bay_containers()
         self.get_module_list()
         self.add_relative_paths()
-        self._get_chassis_attributes(self.chassis_list)
-        self._get_ports_attributes()
-        self._get_module_attributes()
-        self._get_power_ports()
-        self._get_port_channels()
+
+    def _is_stack_mib_device(self):
+        """CatOS switches describe their structure in CISCO-STACK-MIB, which is read instead of ENTITY-MIB"""
+
+        system_description = self.snmp.get_property('SNMPv2-MIB', 'sysDescr', 0)
+        return bool(re.search(self.STACK_MIB_OS_PATTERN, system_description, flags=re.IGNORECASE))
+
+    def _load_stack_mib_tables(self):
+        """Load ifTable and CISCO-STACK-MIB module, port and chassis component tables"""
+
+        self.logger.info('Start loading CISCO-STACK-MIB tables:')
+        self.if_table = self.snmp.get_table('IF-MIB', self.IF_ENTITY)
+        self.logger.info('{0} table loaded'.format(self.IF_ENTITY))
+        self.context.stack_inventory = CiscoStackInventory(self.snmp, self.logger).load()
+        if not self.context.stack_inventory.modules:
+            raise Exception('Cannot load moduleTable. Autoload cannot continue')
+        self.chassis_list = [self.STACK_MIB_CHASSIS]
+        self._load_port_attribute_tables()
+        self.logger.info('MIB Tables loaded successfully')
+
+    def _build_stack_mib_structure(self):
+        """Build relative paths of single chassis, it's modules and ports from CISCO-STACK-MIB inventory"""
+
+        inventory = self.context.stack_inventory
+        self.relative_path[self.STACK_MIB_CHASSIS] = '0'
+        module_slots = {}
+        for module in inventory.modules:
+            module_id = 'module.{0}'.format(module.index)
+            self.module_list.append(module_id)
+            self.relative_path[module_id] = '0/{0}'.format(module.slot)
+            module_slots[module.index] = module.slot
+        for port in inventory.ports:
+            port_id = 'port.{0}.{1}'.format(port.module_index, port.port_index)
+            self.port_list.append(port_id)
+            self.port_mapping[port_id] = port.if_index
+            self.relative_path[port_id] = '0/{0}/{1}'.format(module_slots[port.module_index], port.port_index)
+            if not self.if_table.get(port.if_index, {}).get(self.IF_ENTITY):
+                self.if_table[port.if_index] = {'suffix': str(port.if_index),
+                                                self.IF_ENTITY: '{0}/{1}'.format(port.module_index, port.port_index)}
+
+    def _get_stack_mib_chassis_attributes(self):
+        self.logger.info('Start loading Chassis')
+        chassis_object = Chassis(relative_path=self.relative_path[self.STACK_MIB_CHASSIS],
+                                 **self.context.stack_inventory.chassis)
+        self._add_resource(chassis_object)
+        self.logger.info('Finished Loading Chassis')
+
+    def _get_stack_mib_module_attributes(self):
+        self.logger.info('Start loading Modules')
+        for module in self.context.stack_inventory.modules:
+            module_object = Module(name='Module {0}'.format(module.slot), model='Generic Module',
+                                   relative_path=self.relative_path['module.{0}'.format(module.index)],
+                                   module_model=module.model, version=module.version,
+                                   serial_number=module.serial_number)
+            self._add_resource(module_object)
+            self.logger.info('Module {} added'.format(module.model))
+        self.logger.info('Load modules completed.')
+
+    def _get_stack_mib_power_ports(self):
+        self.logger.info('Load Power Ports:')
+        for position, power_supply in enumerate(self.context.stack_inventory.power_supplies):
+            power_port_object = PowerPort(name='PP{0}'.format(position),
+                                          relative_path='0/PP{0}'.format(power_supply.index),
+                                          port_model=power_supply.model,
+                                          description='{0}, status {1}'.format(power_supply.model,
+                                                                               power_supply.status))
+            self._add_resource(power_port_object)
+            self.logger.info('Added ' + power_supply.model + ' Power Port')
+        self.logger.info('Load Power Ports completed.')
+
+    def _run_phase(self, phase, phase_method):
+        """Run discovery phase unless it was completed before the checkpoint discovery was resumed from.
+        If time budget is set, completed phase is checkpointed.
+
+        :param phase: phase name
+        :param phase_method: method to run
+        :return: False if time budget is exhausted and phase wasn't started
+        """
+
+        if phase in self.context.completed_phases:
+            return True
+        if self.context.deadline is not None and time.time() > self.context.deadline:
+            return False
+        phase_method()
+        self.context.completed_phases.append(phase)
+        if self.context.deadline is not None:
+            self._save_checkpoint()
+        return True
+
+    def _stop_on_time_budget(self, partial_results):
+        message = 'Autoload time budget is exhausted, completed phases: {0}. ' \
+                  'Next autoload will resume from the checkpoint'.format(', '.join(self.context.completed_phases))
+        if not partial_results:
+            self.logger.error(message)
+            raise Exception('Cisco Generic SNMP Autoload', message)
+        self.logger.warning(message)
+        return AutoLoadDetails(resources=self.resources, attributes=self.attributes)
+
+    def _save_checkpoint(self):
+        checkpoint = {'time': time.time(),
+                      'platform_id': self.snmp.platform_id,
+                      'profile_features': self.profile_features,
+                      'context': self.context.get_checkpoint_data(),
+                      'snmp_cache': self.snmp.get_cache()}
+        try:
+            self.state_storage.save_checkpoint(checkpoint)
+        except Exception as e:
+            self.logger.error('Failed to save autoload checkpoint: {0}'.format(e))
+
+    def _resume_from_checkpoint(self):
+        """Restore discovered data and snmp cache from the checkpoint of interrupted autoload, if it's still valid"""
+
+        checkpoint = self.state_storage.load_checkpoint()
+        if not checkpoint:
+            return
+        if time.time() - checkpoint['time'] > self.CHECKPOINT_TTL or \
+                checkpoint['platform_id'] != self.snmp.platform_id or \
+                checkpoint['profile_features'] != self.profile_features:
+            self.logger.info('Autoload checkpoint is outdated, discovery is started from scratch')
+            return
+        self.context.restore_checkpoint_data(checkpoint['context'])
+        self.snmp.update_cache(checkpoint['snmp_cache'])
+        self.logger.info('Autoload is resumed from the checkpoint, completed phases: {0}'.format(
+            ', '.join(self.context.completed_phases)))
+
+    def _remove_checkpoint(self):
+        try:
+            self.state_storage.remove_checkpoint()
+        except Exception as e:
+            self.logger.error('Failed to remove autoload checkpoint: {0}'.format(e))
+
+    def discover_subtree(self, entity):
+        """Rediscover single chassis or module subtree of the device containment hierarchy, i.e. after line card swap.
+        Only entity rows under the subtree root and interfaces mapped to it are read from the device,
+        the rest of the structure is taken from the last full autoload, so relative addresses stay consistent.
+        Entity and port attribute tables are walked only under the subtree indexes, except LLDP and ipAddrTable,
+        which aren't indexed by ifIndex.
+
+        :param entity: entity index (int) or relative path (str, i.e. '1/3') of the subtree root
+        :return: AutoLoadDetails object with resources and attributes of the subtree elements
+        """
+
+        self._start_scoped_discovery()
+        root = self._get_subtree_root(entity)
+
+        self.logger.info('************************************************************************')
+        self.logger.info('Start SNMP discovery of the subtree with root entity {0} .....'.format(root))
+
+        self.snmp.load_mib(['CISCO-PRODUCTS-MIB', 'CISCO-ENTITY-VENDORTYPE-OID-MIB'])
+        subtree = self._walk_subtree_indexes(root)
+        self._forget_entities(subtree | self._get_subtree_indexes(root, self.entity_table))
+
+        self.entity_table.update(self._get_entity_table(subtree))
+        self._load_port_attribute_rows([self.port_mapping[port] for port in self.port_list if port in subtree])
+        self._add_chassis_relative_paths([chassis for chassis in self.chassis_list if chassis in subtree])
+        raw_entity_table = self._copy_entity_table()
+        self._filter_lower_bay_containers()
+
+        port_list = [port for port in self.port_list if port in subtree]
+        self.get_module_list(port_list)
+        self.add_relative_paths(subtree)
+        self._get_chassis_attributes([chassis for chassis in self.chassis_list if chassis in subtree])
+        self._get_ports_attributes([port for port in self.port_list if port in subtree])
+        self._get_module_attributes([module for module in self.module_list if module in subtree])
+        self._get_power_ports(subtree)
 
         result = AutoLoadDetails(resources=self.resources, attributes=self.attributes)
+        self._save_state(raw_entity_table)
+        self._log_discovery_results()
+        return result
+
+    def refresh_port_attributes(self):
+        """Re-read frequently changing port and port-channel attributes, like description, adjacency, MTU, speed
+        and IP addresses, without entity table discovery.
+        Ports and their relative paths are taken from the last full autoload,
+        interface columns are walked in bulk instead of per port requests.
+
+        :return: AutoLoadDetails object with attributes of ports and port-channels only
+        """
+
+        self._start_scoped_discovery()
+        self.logger.info('************************************************************************')
+        self.logger.info('Start SNMP refresh of port attributes .....')
+
+        self._load_interface_columns()
+        self._load_port_attribute_tables()
+        self._get_ports_attributes([port for port in self.port_list if self.port_mapping[port] in self.if_table])
+        if self._is_feature_enabled(PORT_CHANNELS):
+            self._get_port_channels()
+
+        result = AutoLoadDetails(resources=list(), attributes=self.attributes)
+        self._log_discovery_results()
+        return result
+
+    def _start_scoped_discovery(self):
+        """Restore device structure stored by the last full autoload and prepare snmp handler"""
+
+        self._start_context()
+        state = self.state_storage.load()
+        if not state:
+            raise Exception('Cisco Generic SNMP Autoload',
+                            'Device structure is unknown, full autoload is required before scoped discovery')
+        self._restore_state(state)
+        self.snmp.set_platform(state['platform_id'])
+        self.load_cisco_mib()
+
+    def _load_interface_columns(self):
+        """Walk ifTable and ifXTable columns used by ports attributes enabled in autoload profile,
+        walked values serve following per port requests
+        """
+
+        columns = []
+        if self._is_feature_enabled(PORT_DETAILS):
+            columns.extend(['ifType', 'ifPhysAddress', 'ifMtu', 'ifSpeed'])
+        if self._is_feature_enabled(PORT_DESCRIPTION):
+            columns.append('ifAlias')
+        self.if_table = self.snmp.get_table('IF-MIB', self.IF_ENTITY)
+        for column in columns:
+            self.snmp.get_table('IF-MIB', column)
+        self.logger.info('Interface columns loaded: {0}'.format(', '.join([self.IF_ENTITY] + columns)))
+
+    def _get_subtree_root(self, entity):
+        """Find entity index of the subtree root in the stored device structure
+
+        :param entity: entity index (int) or relative path (str)
+        :return: entity index
+        """
+
+        if isinstance(entity, int):
+            if entity not in self.entity_table:
+                raise Exception('Cisco Generic SNMP Autoload', 'Entity {0} was not discovered'.format(entity))
+            return entity
+        for index, relative_path in self.relative_path.iteritems():
+            if relative_path == str(entity).strip('/'):
+                return index
+        raise Exception('Cisco Generic SNMP Autoload', 'Element with relative path {0} was not discovered'.format(
+            entity))
+
+    def _walk_subtree_indexes(self, root):
+        """Read indexes of the root element and all it's descendants from the device,
+        entPhysicalChildIndex column is walked only under the subtree elements, not the whole entity table
+
+        :param root: subtree root entity index
+        :rtype: set
+        """
+
+        result = set()
+        indexes = [root]
+        while indexes:
+            index = indexes.pop()
+            if index in result:
+                continue
+            result.add(index)
+            for row in self.snmp.get_table_rows('ENTITY-MIB', 'entPhysicalChildIndex', index).itervalues():
+                try:
+                    indexes.append(int(row.get('entPhysicalChildIndex', '')))
+                except ValueError:
+                    continue
+        return result
+
+    @staticmethod
+    def _get_subtree_indexes(root, entity_table):
+        """Get indexes of the root element and all it's descendants
+
+        :param root: subtree root entity index
+        :param entity_table: table with entPhysicalContainedIn column
+        :rtype: set
+        """
+
+        children = {}
+        for index, row in entity_table.iteritems():
+            try:
+                parent_id = int(row.get('entPhysicalContainedIn', ''))
+            except ValueError:
+                continue
+            children.setdefault(parent_id, []).append(index)
+
+        result = set()
+        indexes = [root]
+        while indexes:
+            index = indexes.pop()
+            if index not in result:
+                result.add(index)
+                indexes.extend(children.get(index, []))
+        return result
+
+    def _forget_entities(self, indexes):
+        """Remove provided elements from the device structure, so they can be discovered again
+
+        :param indexes: entity indexes
+        """
+
+        for index in indexes:
+            self.entity_table.pop(index, None)
+            self.relative_path.pop(index, None)
+            self.port_mapping.pop(index, None)
+            for entity_list in (self.chassis_list, self.module_list, self.port_list, self.power_supply_list,
+                                self.exclusion_list, self._excluded_models):
+                while index in entity_list:
+                    entity_list.remove(index)
+
+    def _copy_entity_table(self):
+        return {index: dict(row) for index, row in self.entity_table.iteritems()}
+
+    def _save_state(self, raw_entity_table):
+        """Store detected device structure for following scoped discoveries
+
+        :param raw_entity_table: entity table before lower bay containers were merged
+        """
+
+        state = {'platform_id': self.snmp.platform_id,
+                 'entity_table': raw_entity_table,
+                 'if_table': {index: dict(row) for index, row in self.if_table.iteritems()},
+                 'relative_path': self.relative_path,
+                 'port_mapping': self.port_mapping,
+                 'chassis_list': self.chassis_list,
+                 'module_list': self.module_list,
+                 'port_list': self.port_list,
+                 'power_supply_list': self.power_supply_list,
+                 'exclusion_list': self.exclusion_list,
+                 'excluded_models': self._excluded_models}
+        try:
+            self.state_storage.save(state)
+        except Exception as e:
+            self.logger.error('Failed to save device structure: {0}'.format(e))
+
+    def _restore_state(self, state):
+        """Restore device structure detected by the last full autoload
+
+        :param state: dict loaded from AutoloadStateStorage
+        """
+
+        self.entity_table = EntityTable()
+        self.entity_table.update({index: dict(row) for index, row in state['entity_table'].iteritems()})
+        self.if_table = QualiMibTable(self.IF_ENTITY)
+        self.if_table.update({index: dict(row) for index, row in state['if_table'].iteritems()})
+        self.relative_path = dict(state['relative_path'])
+        self.port_mapping = dict(state['port_mapping'])
+        self.chassis_list = list(state['chassis_list'])
+        self.module_list = list(state['module_list'])
+        self.port_list = list(state['port_list'])
+        self.power_supply_list = list(state['power_supply_list'])
+        self.exclusion_list = list(state['exclusion_list'])
+        self._excluded_models = list(state['excluded_models'])
+        self.resources = list()
+        self.attributes = list()
 
+    def _log_discovery_results(self):
         self.logger.info('*******************************************')
         self.logger.info('SNMP discovery Completed.')
         self.logger.info('The following platform structure detected:' +
@@ -115,8 +626,14 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
                                                           attribute.attribute_value))
 
         self.logger.info('*******************************************')
-
-        return result
+        self.logger.info('SNMP requests cache statistics: {hits} hits, {misses} misses'.format(
+            **self.snmp.get_statistics()))
+        self.logger.info('SNMP transport settings: max-repetitions {max_repetitions}, varbinds per request '
+                         '{max_varbinds}, timeout {timeout} sec'.format(**self.snmp.transport_policy.get_settings()))
+        try:
+            self.capabilities.save()
+        except Exception as e:
+            self.logger.error('Failed to save snmp capabilities: {0}'.format(e))
 
     def _is_valid_device_os(self):
         """Validate device OS using snmp
@@ -156,32 +673,103 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
         if len(self.entity_table.keys()) < 1:
             raise Exception('Cannot load entPhysicalTable. Autoload cannot continue')
         self.logger.info('Entity table loaded')
+        self._load_port_attribute_tables()
+        self.logger.info('MIB Tables loaded successfully')
 
-        self.lldp_local_table = self.snmp.get_table('LLDP-MIB', 'lldpLocPortDesc')
-        self.lldp_remote_table = self.snmp.get_table('LLDP-MIB', 'lldpRemTable')
-        self.cdp_index_table = self.snmp.get_table('CISCO-CDP-MIB', 'cdpInterface')
-        self.cdp_table = self.snmp.get_table('CISCO-CDP-MIB', 'cdpCacheTable')
-        self.duplex_table = self.snmp.get_table('EtherLike-MIB', 'dot3StatsIndex')
-        self.ip_v4_table = self.snmp.get_table('IP-MIB', 'ipAddrTable')
-        self.ip_v6_table = self.snmp.get_table('IPV6-MIB', 'ipv6AddrEntry')
-        self.port_channel_ports = self.snmp.get_table('IEEE8023-LAG-MIB', 'dot3adAggPortAttachedAggID')
+    def _load_port_attribute_tables(self):
+        """Load optional tables used to build ports and port-channels attributes"""
+
+        self.lldp_local_table = self._get_optional_table(ADJACENCY, 'LLDP-MIB', 'lldpLocPortDesc')
+        self.lldp_remote_table = self._get_optional_table(ADJACENCY, 'LLDP-MIB', 'lldpRemTable')
+        self.cdp_index_table = self._get_optional_table(ADJACENCY, 'CISCO-CDP-MIB', 'cdpInterface')
+        self.cdp_table = self._get_optional_table(ADJACENCY, 'CISCO-CDP-MIB', 'cdpCacheTable')
+        self.duplex_table = self._get_optional_table(DUPLEX, 'EtherLike-MIB', 'dot3StatsIndex')
+        self.ip_v4_table = self._get_optional_table(IP_ADDRESSES, 'IP-MIB', 'ipAddrTable')
+        self.ip_v6_table = self._get_optional_table(IP_ADDRESSES, 'IPV6-MIB', 'ipv6AddrEntry')
+        self.port_channel_ports = self._get_optional_table(PORT_CHANNELS, 'IEEE8023-LAG-MIB',
+                                                           'dot3adAggPortAttachedAggID')
+
+    def _load_port_attribute_rows(self, port_indexes):
+        """Load rows of optional port attribute tables only for provided interfaces,
+        LLDP and ipAddrTable aren't indexed by ifIndex, so they are loaded whole.
+        Port-channel tables aren't loaded, as they aren't used by ports attributes.
+
+        :param port_indexes: ifIndexes of the ports
+        """
 
-        self.logger.info('MIB Tables loaded successfully')
+        self.lldp_local_table = self._get_optional_table(ADJACENCY, 'LLDP-MIB', 'lldpLocPortDesc')
+        self.lldp_remote_table = self._get_optional_table(ADJACENCY, 'LLDP-MIB', 'lldpRemTable')
+        self.cdp_index_table = QualiMibTable('cdpInterface')
+        self.cdp_table = self._get_optional_table_rows(ADJACENCY, 'CISCO-CDP-MIB', 'cdpCacheTable',
+                                                       ['cdpCacheDeviceId', 'cdpCacheDevicePort'], port_indexes)
+        self.duplex_table = self._get_optional_table_rows(DUPLEX, 'EtherLike-MIB', 'dot3StatsIndex',
+                                                          ['dot3StatsIndex'], port_indexes)
+        self.ip_v4_table = self._get_optional_table(IP_ADDRESSES, 'IP-MIB', 'ipAddrTable')
+        self.ip_v6_table = self._get_optional_table_rows(IP_ADDRESSES, 'IPV6-MIB', 'ipv6AddrEntry',
+                                                         ['ipv6AddrPfxLength'], port_indexes)
+        self.port_channel_ports = QualiMibTable('dot3adAggPortAttachedAggID')
+
+    def _get_optional_table_rows(self, feature, snmp_module_name, table_name, column_names, indexes):
+        """Load rows of provided table columns under provided indexes,
+        only if they are required by the selected autoload profile
+
+        :param feature: autoload feature which requires the table
+        :param snmp_module_name: MIB name
+        :param table_name: name of the returned table
+        :param column_names: table columns to walk
+        :param indexes: row index prefixes, i.e. ifIndexes
+        :rtype: QualiMibTable
+        """
+
+        result = QualiMibTable(table_name)
+        if not self._is_feature_enabled(feature):
+            self.logger.info('{0} table skipped by autoload profile'.format(table_name))
+            return result
+        for index in indexes:
+            for column_name in column_names:
+                for key, row in self.snmp.get_table_rows(snmp_module_name, column_name, index).iteritems():
+                    result.setdefault(key, {}).update(row)
+        self.logger.info('{0} table rows loaded'.format(table_name))
+        return result
+
+    def _get_optional_table(self, feature, snmp_module_name, table_name):
+        """Load snmp table only if it is required by the selected autoload profile
+
+        :param feature: autoload feature which requires the table
+        :param snmp_module_name: MIB name
+        :param table_name: table name
+        :rtype: QualiMibTable
+        """
+
+        if not self._is_feature_enabled(feature):
+            self.logger.info('{0} table skipped by autoload profile'.format(table_name))
+            return QualiMibTable(table_name)
+        table = self.snmp.get_optional_table(snmp_module_name, table_name)
+        self.logger.info('{0} table loaded'.format(table_name))
+        return table
 
-    def _get_entity_table(self):
+    def _get_entity_table(self, entity_indexes=None):
         """Read Entity-MIB and filter out device's structure and all it's elements, like ports, modules, chassis, etc.
 
+        :param entity_indexes: read only provided entities instead of whole table, interface names of their ports
+            are re-read as well
         :rtype: QualiMibTable
         :return: structured and filtered EntityPhysical table.
         """
 
-        result_dict = QualiMibTable('entPhysicalTable')
+        result_dict = EntityTable()
 
         entity_table_critical_port_attr = {'entPhysicalContainedIn': 'str', 'entPhysicalClass': 'str',
                                            'entPhysicalVendorType': 'str'}
         entity_table_optional_port_attr = {'entPhysicalDescr': 'str', 'entPhysicalName': 'str'}
 
-        physical_indexes = self.snmp.get_table('ENTITY-MIB', 'entPhysicalParentRelPos')
+        if entity_indexes is None:
+            physical_indexes = self.snmp.get_table('ENTITY-MIB', 'entPhysicalParentRelPos')
+        else:
+            physical_indexes = QualiMibTable('entPhysicalTable')
+            for index in sorted(entity_indexes):
+                physical_indexes.update(self.snmp.get_properties('ENTITY-MIB', index,
+                                                                 {'entPhysicalParentRelPos': 'str'}))
         for index in physical_indexes.keys():
             is_excluded = False
             if physical_indexes[index]['entPhysicalParentRelPos'] == '':
@@ -236,6 +824,8 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
                         and not re.search(self.port_exclude_pattern, temp_entity_table['entPhysicalDescr'],
                                           re.IGNORECASE):
                     port_id = self._get_mapping(index, temp_entity_table[self.ENTITY_PHYSICAL])
+                    if port_id and entity_indexes is not None:
+                        self._update_if_table_row(port_id)
                     if port_id and port_id in self.if_table and port_id not in self.port_mapping.values():
                         self.port_mapping[index] = port_id
                         self.port_list.append(index)
@@ -245,6 +835,26 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
         self._filter_entity_table(result_dict)
         return result_dict
 
+    def _update_if_table_row(self, port_id):
+        """Re-read name of single interface instead of walking whole ifTable
+
+        :param port_id: ifTable index
+        """
+
+        if_descr = self.snmp.get_property('IF-MIB', self.IF_ENTITY, port_id)
+        if if_descr:
+            self.if_table[port_id] = {'suffix': str(port_id), self.IF_ENTITY: if_descr}
+        else:
+            self.if_table.pop(port_id, None)
+
+    def _add_chassis_relative_paths(self, chassis_list):
+        for chassis in chassis_list:
+            if chassis not in self.exclusion_list:
+                chassis_id = self._get_resource_id(chassis)
+                if chassis_id == '-1':
+                    chassis_id = '0'
+                self.relative_path[chassis] = chassis_id
+
     def _filter_lower_bay_containers(self):
 
         upper_container = None
@@ -257,23 +867,22 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
             if 'lowermodulebay' in vendor_type.lower():
                 lower_container = container
         if lower_container and upper_container:
-            child_upper_items_len = len(self.entity_table.filter_by_column('ContainedIn', str(upper_container)
-                                                                           ).sort_by_column('ParentRelPos').keys())
-            child_lower_items = self.entity_table.filter_by_column('ContainedIn', str(lower_container)
-                                                                   ).sort_by_column('ParentRelPos').keys()
+            child_upper_items_len = len(self.entity_table.get_children(upper_container))
+            child_lower_items = self.entity_table.get_children(lower_container).keys()
             for child in child_lower_items:
-                self.entity_table[child]['entPhysicalContainedIn'] = upper_container
-                self.entity_table[child]['entPhysicalParentRelPos'] = str(child_upper_items_len + int(
-                    self.entity_table[child]['entPhysicalParentRelPos']))
+                self.entity_table.set_value(child, 'entPhysicalContainedIn', upper_container)
+                self.entity_table.set_value(child, 'entPhysicalParentRelPos', str(child_upper_items_len + int(
+                    self.entity_table[child]['entPhysicalParentRelPos'])))
 
-    def add_relative_paths(self):
+    def add_relative_paths(self, entity_indexes=None):
         """Build dictionary of relative paths for each module and port
 
+        :param entity_indexes: build paths only for provided elements, paths of other elements are kept
         :return:
         """
 
-        port_list = list(self.port_list)
-        module_list = list(self.module_list)
+        port_list = [port for port in self.port_list if entity_indexes is None or port in entity_indexes]
+        module_list = [module for module in self.module_list if entity_indexes is None or module in entity_indexes]
         for module in module_list:
             if module not in self.exclusion_list:
                 self.relative_path[module] = self.get_relative_path(module) + '/' + self._get_resource_id(module)
@@ -309,13 +918,16 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
         self.resources.append(resource.get_autoload_resource_details())
         self.attributes.extend(resource.get_autoload_resource_attributes())
 
-    def get_module_list(self):
+    def get_module_list(self, port_list=None):
         """Set list of all modules from entity mib table for provided list of ports
 
+        :param port_list: ports to find modules for, all ports by default
         :return:
         """
 
-        for port in self.port_list:
+        if port_list is None:
+            port_list = self.port_list
+        for port in port_list:
             modules = []
             modules.extend(self._get_module_parents(port))
             for module in modules:
@@ -362,6 +974,7 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
         """
 
         self.logger.info('Start loading Chassis')
+        self.snmp.prefetch('ENTITY-MIB', ['entPhysicalModelName', 'entPhysicalSerialNum'], chassis_list)
         for chassis in chassis_list:
             chassis_id = self.relative_path[chassis]
             chassis_details_map = {
@@ -376,14 +989,18 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
             self.logger.info('Added ' + self.entity_table[chassis]['entPhysicalDescr'] + ' Chass')
         self.logger.info('Finished Loading Modules')
 
-    def _get_module_attributes(self):
+    def _get_module_attributes(self, module_list=None):
         """Set attributes for all discovered modules
 
+        :param module_list: modules to load attributes for, all modules by default
         :return:
         """
 
+        if module_list is None:
+            module_list = self.module_list
         self.logger.info('Start loading Modules')
-        for module in self.module_list:
+        self.snmp.prefetch('ENTITY-MIB', ['entPhysicalSoftwareRev', 'entPhysicalSerialNum'], module_list)
+        for module in module_list:
             module_id = self.relative_path[module]
             module_index = self._get_resource_id(module)
             module_details_map = {
@@ -417,15 +1034,21 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
                 if parent_index in self.power_supply_list:
                     self.power_supply_list.remove(power_port)
 
-    def _get_power_ports(self):
+    def _get_power_ports(self, entity_indexes=None):
         """Get attributes for power ports provided in self.power_supply_list
 
+        :param entity_indexes: load only power ports from provided elements
         :return:
         """
 
         self.logger.info('Load Power Ports:')
         self._filter_power_port_list()
+        self.snmp.prefetch('ENTITY-MIB', ['entPhysicalModelName', 'entPhysicalDescr', 'entPhysicalHardwareRev',
+                                          'entPhysicalSerialNum'],
+                           [port for port in self.power_supply_list if entity_indexes is None or port in entity_indexes])
         for port in self.power_supply_list:
+            if entity_indexes is not None and port not in entity_indexes:
+                continue
             port_id = self.entity_table[port]['entPhysicalParentRelPos']
             parent_index = int(self.entity_table[port]['entPhysicalContainedIn'])
             parent_id = int(self.entity_table[parent_index]['entPhysicalParentRelPos'])
@@ -454,6 +1077,7 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
         port_channel_dic = {index: port for index, port in self.if_table.iteritems() if
                             'channel' in port[self.IF_ENTITY] and '.' not in port[self.IF_ENTITY]}
         self.logger.info('Loading Port Channels:')
+        self.port_channel_members = self._get_port_channel_members_map()
         for key, value in port_channel_dic.iteritems():
             interface_model = value[self.IF_ENTITY]
             match_object = re.search(r'\d+$', interface_model)
@@ -471,6 +1095,22 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
             self.logger.info('Added ' + interface_model + ' Port Channel')
         self.logger.info('Load Port Channels completed.')
 
+    def _get_port_channel_members_map(self):
+        """Invert IEEE8023-LAG-MIB attachment table into aggregator ifIndex -> member ifIndexes map
+
+        :return: dict{aggregator ifIndex: [member ifIndex, ...]}
+        """
+
+        result = {}
+        for key, value in self.port_channel_ports.iteritems():
+            try:
+                aggregator_id = int(value.get('dot3adAggPortAttachedAggID', ''))
+            except ValueError:
+                continue
+            if aggregator_id > 0:
+                result.setdefault(aggregator_id, []).append(key)
+        return result
+
     def _get_associated_ports(self, item_id):
         """Get all ports associated with provided port channel
         :param item_id:
@@ -478,36 +1118,45 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
         """
 
         result = ''
-        for key, value in self.port_channel_ports.iteritems():
-            if str(item_id) in value['dot3adAggPortAttachedAggID']:
+        for key in sorted(self.port_channel_members.get(int(item_id), [])):
+            if key in self.if_table:
                 result += self.if_table[key][self.IF_ENTITY].replace('/', '-').replace(' ', '') + '; '
         return result.strip(' \t\n\r')
 
-    def _get_ports_attributes(self):
+    def _get_ports_attributes(self, port_list=None):
         """Get resource details and attributes for every port in self.port_list
 
+        :param port_list: ports to load attributes for, all ports by default
         :return:
         """
 
+        if port_list is None:
+            port_list = self.port_list
         self.logger.info('Load Ports:')
-        for port in self.port_list:
-            if_table_port_attr = {'ifType': 'str', 'ifPhysAddress': 'str', 'ifMtu': 'int', 'ifSpeed': 'int'}
-            if_table = self.if_table[self.port_mapping[port]].copy()
-            if_table.update(self.snmp.get_properties('IF-MIB', self.port_mapping[port], if_table_port_attr))
+        for port in port_list:
             interface_name = self.if_table[self.port_mapping[port]][self.IF_ENTITY].replace("'", '')
             if interface_name == '':
                 interface_name = self.entity_table[port]['entPhysicalName']
             if interface_name == '':
                 continue
-            interface_type = if_table[self.port_mapping[port]]['ifType'].replace('/', '').replace("'", '')
-            attribute_map = {'l2_protocol_type': interface_type,
-                             'mac': if_table[self.port_mapping[port]]['ifPhysAddress'],
-                             'mtu': if_table[self.port_mapping[port]]['ifMtu'],
-                             'bandwidth': if_table[self.port_mapping[port]]['ifSpeed'],
-                             'description': self.snmp.get_property('IF-MIB', 'ifAlias', self.port_mapping[port]),
-                             'adjacent': self._get_adjacent(self.port_mapping[port])}
-            attribute_map.update(self._get_interface_details(self.port_mapping[port]))
-            attribute_map.update(self._get_ip_interface_details(self.port_mapping[port]))
+            attribute_map = {}
+            if self._is_feature_enabled(PORT_DETAILS):
+                if_table_port_attr = {'ifType': 'str', 'ifPhysAddress': 'str', 'ifMtu': 'int', 'ifSpeed': 'int'}
+                if_table = self.if_table[self.port_mapping[port]].copy()
+                if_table.update(self.snmp.get_properties('IF-MIB', self.port_mapping[port], if_table_port_attr))
+                interface_type = if_table[self.port_mapping[port]]['ifType'].replace('/', '').replace("'", '')
+                attribute_map.update({'l2_protocol_type': interface_type,
+                                      'mac': if_table[self.port_mapping[port]]['ifPhysAddress'],
+                                      'mtu': if_table[self.port_mapping[port]]['ifMtu'],
+                                      'bandwidth': if_table[self.port_mapping[port]]['ifSpeed']})
+            if self._is_feature_enabled(PORT_DESCRIPTION):
+                attribute_map['description'] = self.snmp.get_property('IF-MIB', 'ifAlias', self.port_mapping[port])
+            if self._is_feature_enabled(ADJACENCY):
+                attribute_map['adjacent'] = self._get_adjacent(self.port_mapping[port])
+            if self._is_feature_enabled(DUPLEX) or self._is_feature_enabled(AUTO_NEGOTIATION):
+                attribute_map.update(self._get_interface_details(self.port_mapping[port]))
+            if self._is_feature_enabled(IP_ADDRESSES):
+                attribute_map.update(self._get_ip_interface_details(self.port_mapping[port]))
             port_object = Port(name=interface_name, relative_path=self.relative_path[port], **attribute_map)
             self._add_resource(port_object)
             self.logger.info('Added ' + interface_name + ' Port')
@@ -579,12 +1228,13 @@ class CiscoGenericSNMPAutoload(AutoloadOperationsInterface):
         """
 
         interface_details = {'duplex': 'Full', 'auto_negotiation': 'False'}
-        try:
-            auto_negotiation = self.snmp.get(('MAU-MIB', 'ifMauAutoNegAdminStatus', port_index, 1)).values()[0]
-            if 'enabled' in auto_negotiation.lower():
-                interface_details['auto_negotiation'] = 'True'
-        except Exception as e:
-            self.logger.error('Failed to load auto negotiation property for interface {0}'.format(e.message))
+        if self._is_feature_enabled(AUTO_NEGOTIATION):
+            try:
+                auto_negotiation = self.snmp.get(('MAU-MIB', 'ifMauAutoNegAdminStatus', port_index, 1)).values()[0]
+                if 'enabled' in auto_negotiation.lower():
+                    interface_details['auto_negotiation'] = 'True'
+            except Exception as e:
+                self.logger.error('Failed to load auto negotiation property for interface {0}'.format(e.message))
         for key, value in self.duplex_table.iteritems():
             if 'dot3StatsIndex' in value.keys() and value['dot3StatsIndex'] == str(port_index):
                 interface_duplex = self.snmp.get_property('EtherLike-MIB', 'dot3StatsDuplexStatus', key)
@@ -0,0 +1,105 @@
+import re
+from collections import namedtuple
+
+StackInventory = namedtuple('StackInventory', ['chassis', 'modules', 'ports', 'power_supplies'])
+StackModule = namedtuple('StackModule', ['index', 'slot', 'model', 'serial_number', 'version'])
+StackPort = namedtuple('StackPort', ['module_index', 'port_index', 'if_index', 'name'])
+StackPowerSupply = namedtuple('StackPowerSupply', ['index', 'model', 'status'])
+
+
+class CiscoStackInventory(object):
+    """Device structure of CatOS switches read from CISCO-STACK-MIB.
+
+    moduleTable and portTable are walked with a few bulk requests and already describe chassis -> module -> port
+    hierarchy, so per entity ENTITY-MIB requests aren't needed. Power supplies are read from chassisPsNType
+    and chassisPsNStatus scalars.
+    """
+
+    SNMP_MIB = 'CISCO-STACK-MIB'
+    POWER_SUPPLY_COUNT = 3
+    NO_POWER_SUPPLY_TYPES = ['', 'none', 'other']
+    NO_SUCH_VALUE_PATTERN = r'^No Such (Object|Instance)'
+
+    def __init__(self, snmp, logger):
+        """
+        :param snmp: CachedSnmpHandler object
+        :param logger: logger
+        """
+
+        self.snmp = snmp
+        self.logger = logger
+
+    def load(self):
+        """Read chassis, modules, ports and power supplies
+
+        :rtype: StackInventory
+        """
+
+        chassis = self._get_chassis()
+        modules = self._get_modules()
+        self.logger.info('moduleTable loaded, {0} modules found'.format(len(modules)))
+        module_indexes = set(module.index for module in modules)
+        ports = [port for port in self._get_ports() if port.module_index in module_indexes]
+        self.logger.info('portTable loaded, {0} ports found'.format(len(ports)))
+        power_supplies = self._get_power_supplies()
+        self.logger.info('Power supplies loaded, {0} power supplies found'.format(len(power_supplies)))
+        return StackInventory(chassis, modules, ports, power_supplies)
+
+    def _get_chassis(self):
+        self.snmp.prefetch(self.SNMP_MIB, ['chassisModel', 'chassisSerialNumberString', 'chassisSysType'], [0])
+        chassis_model = self.snmp.get_property(self.SNMP_MIB, 'chassisModel', 0)
+        if not chassis_model:
+            chassis_model = self.snmp.get_property(self.SNMP_MIB, 'chassisSysType', 0)
+        return {'chassis_model': chassis_model,
+                'serial_number': self.snmp.get_property(self.SNMP_MIB, 'chassisSerialNumberString', 0)}
+
+    def _get_modules(self):
+        result = []
+        for row in self.snmp.get_table(self.SNMP_MIB, 'moduleTable').values():
+            index = self._to_int(row.get('suffix'))
+            if not index:
+                continue
+            slot = self._to_int(row.get('moduleSlotNum')) or index
+            result.append(StackModule(index=index, slot=slot,
+                                      model=row.get('moduleModel') or row.get('moduleType', ''),
+                                      serial_number=row.get('moduleSerialNumberString') or
+                                      row.get('moduleSerialNumber', ''),
+                                      version=row.get('moduleSwVersion', '')))
+        return sorted(result, key=lambda module: module.slot)
+
+    def _get_ports(self):
+        result = []
+        for row in self.snmp.get_table(self.SNMP_MIB, 'portTable').values():
+            suffix = str(row.get('suffix', '')).split('.')
+            if len(suffix) != 2:
+                continue
+            if_index = self._to_int(row.get('portIfIndex'))
+            if not if_index:
+                continue
+            result.append(StackPort(module_index=int(suffix[0]), port_index=int(suffix[1]), if_index=if_index,
+                                    name=row.get('portName', '')))
+        return sorted(result, key=lambda port: (port.module_index, port.port_index))
+
+    def _get_power_supplies(self):
+        """Read chassisPs1Type - chassisPs3Type scalars, slots with 'none' or 'other' type
+        and scalars not supported by the chassis are skipped
+        """
+
+        indexes = range(1, self.POWER_SUPPLY_COUNT + 1)
+        property_names = ['chassisPs{0}{1}'.format(index, name) for index in indexes for name in ('Type', 'Status')]
+        self.snmp.prefetch(self.SNMP_MIB, property_names, [0])
+        result = []
+        for index in indexes:
+            model = self.snmp.get_property(self.SNMP_MIB, 'chassisPs{0}Type'.format(index), 0).strip("'")
+            if model.lower() in self.NO_POWER_SUPPLY_TYPES or re.search(self.NO_SUCH_VALUE_PATTERN, model):
+                continue
+            status = self.snmp.get_property(self.SNMP_MIB, 'chassisPs{0}Status'.format(index), 0).strip("'")
+            result.append(StackPowerSupply(index=index, model=model, status=status))
+        return result
+
+    @staticmethod
+    def _to_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
@@ -0,0 +1,240 @@
+import json
+import os
+import re
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from cloudshell.networking.cisco.autoload.cached_snmp_handler import CachedSnmpHandler
+from cloudshell.networking.cisco.autoload.snmp_transport_policy import AdaptiveSnmpTransportPolicy
+from cloudshell.networking.cisco.autoload.snmp_rate_governor import SnmpRateGovernor
+
+NeighborRecord = namedtuple('NeighborRecord', ['local_device', 'local_port', 'remote_device', 'remote_port',
+                                               'protocol'])
+
+CONFIRMED_LINK = 'confirmed'
+UNCONFIRMED_LINK = 'unconfirmed'
+EXTERNAL_LINK = 'external'
+MISMATCHED_LINK = 'mismatch'
+
+INTERFACE_TYPES = ['ethernet', 'fastethernet', 'gigabitethernet', 'twogigabitethernet', 'fivegigabitethernet',
+                   'tengigabitethernet', 'twentyfivegige', 'fortygigabitethernet', 'hundredgige', 'port-channel',
+                   'vlan', 'loopback', 'tunnel', 'mgmt', 'serial']
+
+INTERFACE_TYPE_ABBREVIATIONS = {'fa': 'fastethernet', 'gi': 'gigabitethernet', 'ge': 'gigabitethernet',
+                                'tw': 'twogigabitethernet', 'fi': 'fivegigabitethernet', 'te': 'tengigabitethernet',
+                                'twe': 'twentyfivegige', 'fo': 'fortygigabitethernet', 'hu': 'hundredgige',
+                                'et': 'ethernet', 'eth': 'ethernet', 'po': 'port-channel', 'vl': 'vlan',
+                                'lo': 'loopback', 'tu': 'tunnel', 'se': 'serial'}
+
+
+def normalize_device_name(device_name):
+    """Build comparable device identifier from sysName, CDP device id or LLDP system name:
+    serial number suffix and domain name are removed, i.e. 'Switch1.lab.local(FOC1234X0AB)' -> 'switch1'
+
+    :param device_name: device name
+    :rtype: str
+    """
+
+    name = re.sub(r'\(.*\)$', '', device_name.strip(' \t\n\r"\'')).strip().lower()
+    if not re.match(r'^[\d.]+$', name):
+        name = name.split('.')[0]
+    return name
+
+
+def normalize_port_name(port_name):
+    """Build comparable port identifier with full lower case interface type,
+    i.e. 'Gi1/0/1', 'GigabitEthernet 1/0/1' -> 'gigabitethernet1/0/1'
+
+    :param port_name: interface name or abbreviation
+    :rtype: str
+    """
+
+    name = re.sub(r'\s+', '', port_name.strip(' \t\n\r"\'')).lower()
+    match = re.match(r'^(?P<type>[a-z][a-z\-]*)(?P<id>\d[\d/.:]*)$', name)
+    if not match:
+        return name
+    interface_type = match.group('type')
+    if interface_type not in INTERFACE_TYPES:
+        if interface_type in INTERFACE_TYPE_ABBREVIATIONS:
+            interface_type = INTERFACE_TYPE_ABBREVIATIONS[interface_type]
+        else:
+            candidates = [full_type for full_type in INTERFACE_TYPES if full_type.startswith(interface_type)]
+            if len(candidates) == 1:
+                interface_type = candidates[0]
+    return interface_type + match.group('id')
+
+
+class TopologyGraph(object):
+    """Link graph resolved from neighbor records collected from many devices"""
+
+    def __init__(self, devices, records, errors=None):
+        """
+        :param devices: list of normalized names of the collected devices
+        :param records: list of NeighborRecord
+        :param errors: dict{device id: error message} for devices, which neighbors weren't collected
+        """
+
+        self.devices = sorted(devices)
+        self.records = records
+        self.errors = errors or {}
+        self.links = self._build_links()
+
+    def _build_links(self):
+        """Join records seen from both link sides using hash index by local endpoint,
+        every record is looked up once, no per port scans of other devices tables.
+
+        :return: list of dict{'endpoints': ((device, port), (device, port)), 'protocols': [...], 'status': str}
+        """
+
+        collected_devices = set(self.devices)
+        by_local_endpoint = {}
+        for record in self.records:
+            by_local_endpoint.setdefault((record.local_device, record.local_port), set()).add(
+                (record.remote_device, record.remote_port))
+
+        links = {}
+        for record in self.records:
+            local_endpoint = (record.local_device, record.local_port)
+            remote_endpoint = (record.remote_device, record.remote_port)
+            key = tuple(sorted([local_endpoint, remote_endpoint]))
+            link = links.setdefault(key, {'endpoints': key, 'protocols': set(), 'status': None})
+            link['protocols'].add(record.protocol)
+
+            reverse = by_local_endpoint.get(remote_endpoint)
+            if reverse and local_endpoint in reverse:
+                status = CONFIRMED_LINK
+            elif reverse:
+                status = MISMATCHED_LINK
+            elif record.remote_device in collected_devices:
+                status = UNCONFIRMED_LINK
+            else:
+                status = EXTERNAL_LINK
+            if link['status'] != CONFIRMED_LINK:
+                link['status'] = status
+
+        result = []
+        for key in sorted(links):
+            link = links[key]
+            link['protocols'] = sorted(link['protocols'])
+            result.append(link)
+        return result
+
+    def get_links(self, status=None):
+        """Get links, optionally filtered by status: 'confirmed', 'unconfirmed', 'external' or 'mismatch'"""
+
+        return [link for link in self.links if status is None or link['status'] == status]
+
+    def to_dict(self):
+        return {'devices': self.devices,
+                'errors': self.errors,
+                'links': [{'a': {'device': link['endpoints'][0][0], 'port': link['endpoints'][0][1]},
+                           'b': {'device': link['endpoints'][1][0], 'port': link['endpoints'][1][1]},
+                           'protocols': link['protocols'],
+                           'status': link['status']} for link in self.links]}
+
+    def to_json(self, file_path=None):
+        """Export graph to json
+
+        :param file_path: optional file to write json to
+        :return: json string
+        """
+
+        data = json.dumps(self.to_dict(), indent=2, sort_keys=True)
+        if file_path:
+            with open(file_path, 'w') as json_file:
+                json_file.write(data)
+        return data
+
+
+class CiscoTopologyBuilder(object):
+    """Collect CDP and LLDP neighbor tables from many devices concurrently and resolve them into link graph"""
+
+    DEFAULT_THREADS_COUNT = 20
+
+    def __init__(self, snmp_handlers, logger, threads_count=None):
+        """
+        :param snmp_handlers: dict{device id: QualiSnmp object}
+        :param logger: logger
+        :param threads_count: count of devices polled in parallel
+        """
+
+        self.snmp_handlers = snmp_handlers
+        self.logger = logger
+        self.threads_count = threads_count or self.DEFAULT_THREADS_COUNT
+
+    def build(self):
+        """Collect neighbors from all devices and build link graph
+
+        :rtype: TopologyGraph
+        """
+
+        devices = []
+        records = []
+        errors = {}
+        device_ids = sorted(self.snmp_handlers)
+        pool = ThreadPool(max(1, min(self.threads_count, len(device_ids))))
+        try:
+            results = pool.map(self._collect_safe, device_ids)
+        finally:
+            pool.close()
+            pool.join()
+
+        for device_id, (device_name, device_records, error) in zip(device_ids, results):
+            if error:
+                errors[device_id] = error
+                continue
+            devices.append(device_name)
+            records.extend(device_records)
+        self.logger.info('Topology collected from {0} devices, {1} failed, {2} neighbor records'.format(
+            len(devices), len(errors), len(records)))
+        return TopologyGraph(devices, records, errors)
+
+    def _collect_safe(self, device_id):
+        try:
+            device_name, records = self.collect_neighbors(self.snmp_handlers[device_id])
+            return device_name, records, None
+        except Exception as e:
+            self.logger.error('Failed to collect neighbors from {0}: {1}'.format(device_id, e))
+            return None, None, str(e)
+
+    def collect_neighbors(self, snmp_handler):
+        """Read CDP and LLDP neighbors of single device
+
+        :param snmp_handler: QualiSnmp object
+        :return: normalized device name, list of NeighborRecord
+        """
+
+        device_id = getattr(getattr(snmp_handler, 'target', None), 'transportAddr', None) or id(snmp_handler)
+        snmp = CachedSnmpHandler(snmp_handler, transport_policy=AdaptiveSnmpTransportPolicy(),
+                                 rate_governor=SnmpRateGovernor(device_id))
+        snmp.update_mib_sources(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'mibs')))
+        snmp.set_platform(snmp.get_property('SNMPv2-MIB', 'sysObjectID', 0))
+        device_name = normalize_device_name(snmp.get_property('SNMPv2-MIB', 'sysName', 0))
+        if not device_name:
+            raise Exception(self.__class__.__name__, 'Failed to read sysName')
+
+        if_table = snmp.get_table('IF-MIB', 'ifDescr')
+        port_names = {str(index): row.get('ifDescr', '') for index, row in if_table.iteritems()}
+        records = []
+
+        for index, row in snmp.get_table('CISCO-CDP-MIB', 'cdpCacheTable').iteritems():
+            local_port = port_names.get(row.get('suffix', str(index)).split('.')[0])
+            if local_port and row.get('cdpCacheDeviceId') and row.get('cdpCacheDevicePort'):
+                records.append(NeighborRecord(device_name, normalize_port_name(local_port),
+                                              normalize_device_name(row['cdpCacheDeviceId']),
+                                              normalize_port_name(row['cdpCacheDevicePort']), 'cdp'))
+
+        local_ports = {}
+        for index, row in snmp.get_table('LLDP-MIB', 'lldpLocPortTable').iteritems():
+            local_ports[row.get('suffix', str(index))] = row.get('lldpLocPortDesc') or row.get('lldpLocPortId', '')
+        for index, row in snmp.get_table('LLDP-MIB', 'lldpRemTable').iteritems():
+            suffix = row.get('suffix', str(index)).split('.')
+            local_port = local_ports.get(suffix[1]) if len(suffix) > 2 else None
+            remote_port = row.get('lldpRemPortId', '')
+            if not re.match(r'^[A-Za-z][A-Za-z\-\s]*\d', remote_port):
+                remote_port = row.get('lldpRemPortDesc', '')
+            if local_port and row.get('lldpRemSysName') and remote_port:
+                records.append(NeighborRecord(device_name, normalize_port_name(local_port),
+                                              normalize_device_name(row['lldpRemSysName']),
+                                              normalize_port_name(remote_port), 'lldp'))
+        return device_name, records
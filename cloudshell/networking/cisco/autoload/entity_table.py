@@ -0,0 +1,177 @@
+from cloudshell.snmp.quali_snmp import QualiMibTable
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+class EntityTableView(object):
+    """Lightweight read only view of the selected EntityTable rows, rows are not copied"""
+
+    def __init__(self, table, indexes):
+        """
+        :param table: EntityTable object
+        :param indexes: list of selected row indexes in view order
+        """
+
+        self._table = table
+        self._indexes = indexes
+
+    def keys(self):
+        return list(self._indexes)
+
+    def values(self):
+        return [self._table[index] for index in self._indexes]
+
+    def items(self):
+        return [(index, self._table[index]) for index in self._indexes]
+
+    def iteritems(self):
+        for index in self._indexes:
+            yield index, self._table[index]
+
+    def __iter__(self):
+        return iter(self._indexes)
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __contains__(self, index):
+        return index in self._indexes
+
+    def __getitem__(self, index):
+        if index not in self._indexes:
+            raise KeyError(index)
+        return self._table[index]
+
+    def filter_by_column(self, name, *values):
+        selected = set(self._table.filter_by_column(name, *values))
+        return EntityTableView(self._table, [index for index in self._indexes if index in selected])
+
+    def sort_by_column(self, name):
+        column = self._table.get_column_name(name)
+        return EntityTableView(self._table, sorted(self._indexes,
+                                                   key=lambda index: _to_int(self._table[index].get(column))))
+
+
+class EntityTable(QualiMibTable):
+    """entPhysicalTable with lazily built secondary indexes on ContainedIn, Class and VendorType columns.
+
+    filter_by_column and sort_by_column return EntityTableView objects instead of table copies,
+    filtered and sorted index lists are cached until the table is changed.
+    Rows have to be changed with set_value, so the indexes are invalidated.
+    """
+
+    INDEXED_COLUMNS = ('ContainedIn', 'Class', 'VendorType')
+
+    def __init__(self, *args, **kwargs):
+        super(EntityTable, self).__init__('entPhysicalTable', *args, **kwargs)
+        self._indexes = {}
+
+    def _invalidate(self):
+        self._indexes = {}
+
+    def get_column_name(self, name):
+        return self._prefix + name
+
+    def set_value(self, index, name, value):
+        """Change single cell value
+
+        :param index: row index
+        :param name: full column name, i.e. 'entPhysicalContainedIn'
+        :param value: new value
+        """
+
+        self[index][name] = value
+        self._invalidate()
+
+    def _get_column_index(self, name):
+        """Get {str(value): [row indexes]} index of the column, build it on first use"""
+
+        key = ('column', name)
+        if key not in self._indexes:
+            column = self.get_column_name(name)
+            column_index = {}
+            for index, row in dict.iteritems(self):
+                if column in row:
+                    column_index.setdefault(str(row[column]), []).append(index)
+            self._indexes[key] = column_index
+        return self._indexes[key]
+
+    def filter_by_column(self, name, *values):
+        """Get rows with one of requested values in requested column,
+        indexed columns are looked up, others are scanned
+
+        :param name: column name without table prefix, i.e. 'ContainedIn'
+        :param values: list of requested values
+        :rtype: EntityTableView
+        """
+
+        if name in self.INDEXED_COLUMNS:
+            column_index = self._get_column_index(name)
+            indexes = []
+            for value in values:
+                indexes.extend(column_index.get(str(value), []))
+            if len(values) > 1:
+                indexes = sorted(set(indexes))
+        else:
+            column = self.get_column_name(name)
+            str_values = [str(value) for value in values]
+            indexes = sorted(index for index, row in dict.iteritems(self) if str(row.get(column)) in str_values)
+        return EntityTableView(self, indexes)
+
+    def sort_by_column(self, name):
+        """Get all rows sorted by numeric value of requested column, sorted order is cached
+
+        :param name: column name without table prefix, i.e. 'ParentRelPos'
+        :rtype: EntityTableView
+        """
+
+        key = ('sorted', name)
+        if key not in self._indexes:
+            self._indexes[key] = EntityTableView(self, sorted(self.keys())).sort_by_column(name).keys()
+        return EntityTableView(self, self._indexes[key])
+
+    def get_children(self, parent_index):
+        """Get rows contained in provided element sorted by ParentRelPos
+
+        :param parent_index: entity index of the parent element
+        :rtype: EntityTableView
+        """
+
+        key = ('children', str(parent_index))
+        if key not in self._indexes:
+            self._indexes[key] = self.filter_by_column('ContainedIn', parent_index).sort_by_column(
+                'ParentRelPos').keys()
+        return EntityTableView(self, self._indexes[key])
+
+    def __setitem__(self, key, value):
+        super(EntityTable, self).__setitem__(key, value)
+        self._invalidate()
+
+    def __delitem__(self, key):
+        super(EntityTable, self).__delitem__(key)
+        self._invalidate()
+
+    def update(self, *args, **kwargs):
+        super(EntityTable, self).update(*args, **kwargs)
+        self._invalidate()
+
+    def pop(self, *args):
+        self._invalidate()
+        return super(EntityTable, self).pop(*args)
+
+    def popitem(self):
+        self._invalidate()
+        return super(EntityTable, self).popitem()
+
+    def setdefault(self, key, default=None):
+        self._invalidate()
+        return super(EntityTable, self).setdefault(key, default)
+
+    def clear(self):
+        super(EntityTable, self).clear()
+        self._invalidate()
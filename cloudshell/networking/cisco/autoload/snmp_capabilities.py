@@ -0,0 +1,96 @@
+import time
+from threading import Lock
+
+from cloudshell.networking.cisco.local_storage import get_local_storage_path, load_json, save_json
+
+
+class SnmpCapabilityCache(object):
+    """Per platform (sysObjectID) record of MIB tables and objects, which are not implemented by the agent.
+
+    Records are learned during autoload from 'noSuchObject' responses and persisted locally, empty tables
+    (i.e. no CDP neighbors) aren't recorded, as they are implemented by the agent.
+    Unsupported table or object is probed again once REPROBE_INTERVAL is passed.
+    Single instance can be shared between autoloads running in parallel threads.
+    """
+
+    CACHE_FILE_NAME = 'snmp_capabilities.json'
+    REPROBE_INTERVAL = 24 * 60 * 60
+
+    _FILE_LOCK = Lock()
+
+    def __init__(self, file_path=None, reprobe_interval=None):
+        self._file_path = file_path
+        self.reprobe_interval = reprobe_interval or self.REPROBE_INTERVAL
+        self._platforms = None
+        self._changes = {}
+        self._lock = Lock()
+
+    @property
+    def file_path(self):
+        if not self._file_path:
+            self._file_path = get_local_storage_path(self.CACHE_FILE_NAME)
+        return self._file_path
+
+    @property
+    def platforms(self):
+        """Unsupported objects per platform: {platform_id: {'MIB::object': detection timestamp}}"""
+
+        if self._platforms is None:
+            with self._lock, self._FILE_LOCK:
+                if self._platforms is None:
+                    self._platforms = load_json(self.file_path, {})
+        return self._platforms
+
+    @staticmethod
+    def _get_key(snmp_module_name, object_name):
+        return '{0}::{1}'.format(snmp_module_name, object_name)
+
+    def is_supported(self, platform_id, snmp_module_name, object_name):
+        """Check whether table or object should be requested from the device
+
+        :param platform_id: platform identifier, i.e. sysObjectID
+        :param snmp_module_name: MIB name
+        :param object_name: table or object name
+        :return: False if object is known as unsupported and it's time to re-probe hasn't come yet
+        """
+
+        if not platform_id:
+            return True
+        detected_time = self.platforms.get(platform_id, {}).get(self._get_key(snmp_module_name, object_name))
+        return detected_time is None or time.time() - detected_time > self.reprobe_interval
+
+    def set_unsupported(self, platform_id, snmp_module_name, object_name):
+        if not platform_id:
+            return
+        key = self._get_key(snmp_module_name, object_name)
+        detected_time = time.time()
+        platforms = self.platforms
+        with self._lock:
+            platforms.setdefault(platform_id, {})[key] = detected_time
+            self._changes[(platform_id, key)] = detected_time
+
+    def set_supported(self, platform_id, snmp_module_name, object_name):
+        if not platform_id:
+            return
+        key = self._get_key(snmp_module_name, object_name)
+        platforms = self.platforms
+        with self._lock:
+            if key in platforms.get(platform_id, {}):
+                del platforms[platform_id][key]
+                self._changes[(platform_id, key)] = None
+
+    def save(self):
+        """Merge changes learned by this instance into the local file"""
+
+        with self._lock, self._FILE_LOCK:
+            if not self._changes:
+                return
+            platforms = load_json(self.file_path, {})
+            for (platform_id, key), detected_time in self._changes.iteritems():
+                if detected_time is None:
+                    platforms.get(platform_id, {}).pop(key, None)
+                else:
+                    platforms.setdefault(platform_id, {})[key] = detected_time
+            save_json(self.file_path, platforms)
+            self._platforms = platforms
+            self._changes = {}
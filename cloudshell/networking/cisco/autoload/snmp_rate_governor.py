@@ -0,0 +1,106 @@
+import time
+from threading import Lock
+
+
+class TokenBucket(object):
+    """Token bucket rate limiter, requests reserve tokens in advance, so concurrent callers are served in order"""
+
+    def __init__(self, rate, capacity=None):
+        """
+        :param rate: tokens added per second
+        :param capacity: max count of tokens collected while idle, allowed burst size
+        """
+
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._timestamp = time.time()
+        self._lock = Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._timestamp) * self.rate)
+        self._timestamp = now
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.time())
+            self.rate = float(rate)
+
+    def reserve(self):
+        """Take one token
+
+        :return: seconds to wait before the request is allowed
+        """
+
+        with self._lock:
+            self._refill(time.time())
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+
+class SnmpRateGovernor(object):
+    """Limit rate of snmp requests sent to single device and by whole driver process.
+
+    Device limit is shared by all autoloads of the same device in the process. It is decreased multiplicatively
+    on request timeouts, which usually mean dropped requests on busy control plane, and restored additively
+    on successful responses.
+    """
+
+    DEFAULT_DEVICE_RATE = 100
+    DEFAULT_GLOBAL_RATE = 1000
+    BACKOFF_FACTOR = 0.5
+    RECOVERY_STEP = 0.05
+    MIN_RATE_FACTOR = 0.05
+
+    _DEVICE_BUCKETS = {}
+    _GLOBAL_BUCKET = None
+    _BUCKETS_LOCK = Lock()
+
+    def __init__(self, device_id, device_rate=None, global_rate=None):
+        """
+        :param device_id: device identifier, i.e. snmp agent address
+        :param device_rate: max requests per second to the device
+        :param global_rate: max requests per second to all devices
+        """
+
+        self.device_id = device_id
+        self.device_rate = float(device_rate or self.DEFAULT_DEVICE_RATE)
+        global_rate = float(global_rate or self.DEFAULT_GLOBAL_RATE)
+        with self._BUCKETS_LOCK:
+            if SnmpRateGovernor._GLOBAL_BUCKET is None:
+                SnmpRateGovernor._GLOBAL_BUCKET = TokenBucket(global_rate)
+            elif SnmpRateGovernor._GLOBAL_BUCKET.capacity != global_rate:
+                SnmpRateGovernor._GLOBAL_BUCKET.capacity = global_rate
+                SnmpRateGovernor._GLOBAL_BUCKET.set_rate(global_rate)
+            if device_id not in self._DEVICE_BUCKETS:
+                self._DEVICE_BUCKETS[device_id] = TokenBucket(self.device_rate)
+            self._device_bucket = self._DEVICE_BUCKETS[device_id]
+        if self._device_bucket.capacity != self.device_rate:
+            self._device_bucket.capacity = self.device_rate
+            self._device_bucket.set_rate(min(self._device_bucket.rate, self.device_rate))
+
+    @property
+    def current_device_rate(self):
+        return self._device_bucket.rate
+
+    def acquire(self):
+        """Block until the next request to the device is allowed by both limits"""
+
+        delay = max(self._GLOBAL_BUCKET.reserve(), self._device_bucket.reserve())
+        if delay > 0:
+            time.sleep(delay)
+
+    def record_timeout(self):
+        """Back off after the request timed out"""
+
+        self._device_bucket.set_rate(max(self.device_rate * self.MIN_RATE_FACTOR,
+                                         self._device_bucket.rate * self.BACKOFF_FACTOR))
+
+    def record_success(self):
+        """Restore device rate after successful response"""
+
+        if self._device_bucket.rate < self.device_rate:
+            self._device_bucket.set_rate(min(self.device_rate,
+                                             self._device_bucket.rate + self.device_rate * self.RECOVERY_STEP))
@@ -0,0 +1,130 @@
+from threading import Lock
+
+
+class AdaptiveSnmpTransportPolicy(object):
+    """Tune GETBULK max-repetitions, GET PDU varbinds count and request timeout during the autoload,
+    based on measured round trip time and response size.
+
+    Tuned values are remembered per platform (sysObjectID) for the lifetime of the driver process,
+    so next autoload of the same platform starts with already tuned values.
+    """
+
+    MIN_MAX_REPETITIONS = 5
+    MAX_MAX_REPETITIONS = 200
+    DEFAULT_MAX_REPETITIONS = 25
+
+    MIN_VARBINDS = 1
+    MAX_VARBINDS = 60
+    DEFAULT_VARBINDS = 10
+
+    MIN_TIMEOUT = 1.0
+    MAX_TIMEOUT = 10.0
+    DEFAULT_TIMEOUT = 2.0
+    TIMEOUT_STEP = 0.5
+    # Timed out requests are retried by the snmp handler with extended timeout,
+    # so pysnmp doesn't retry them itself, otherwise single unresponsive request stalls for minutes
+    TRANSPORT_RETRIES = 0
+
+    # PDU size grows while responses arrive faster than TARGET_RTT and shrinks when they are twice slower
+    TARGET_RTT = 0.5
+    RTT_TIMEOUT_FACTOR = 4
+    RTT_SMOOTHING = 0.25
+
+    _TUNED_SETTINGS = {}
+    _TUNED_SETTINGS_LOCK = Lock()
+
+    def __init__(self, platform_id=None):
+        self.max_repetitions = self.DEFAULT_MAX_REPETITIONS
+        self.max_varbinds = self.DEFAULT_VARBINDS
+        self.timeout = self.DEFAULT_TIMEOUT
+        self.varbind_size = 0
+        self._repetitions_limit = self.MAX_MAX_REPETITIONS
+        self.platform_id = None
+        self._smoothed_rtt = None
+        if platform_id:
+            self.set_platform(platform_id)
+
+    def set_platform(self, platform_id):
+        """Set platform identifier and load values tuned for it during previous autoloads
+
+        :param platform_id: platform identifier, i.e. sysObjectID
+        """
+
+        self.platform_id = platform_id
+        with self._TUNED_SETTINGS_LOCK:
+            settings = self._TUNED_SETTINGS.get(platform_id)
+        if settings:
+            self.max_repetitions = settings['max_repetitions']
+            self.max_varbinds = settings['max_varbinds']
+            self.timeout = settings['timeout']
+
+    def get_settings(self):
+        return {'max_repetitions': self.max_repetitions,
+                'max_varbinds': self.max_varbinds,
+                'timeout': self.timeout}
+
+    def _remember(self):
+        if self.platform_id:
+            with self._TUNED_SETTINGS_LOCK:
+                self._TUNED_SETTINGS[self.platform_id] = self.get_settings()
+
+    def _update_timeout(self, rtt):
+        if self._smoothed_rtt is None:
+            self._smoothed_rtt = rtt
+        else:
+            self._smoothed_rtt += self.RTT_SMOOTHING * (rtt - self._smoothed_rtt)
+        timeout = self._smoothed_rtt * self.RTT_TIMEOUT_FACTOR
+        timeout = round(timeout / self.TIMEOUT_STEP) * self.TIMEOUT_STEP
+        self.timeout = min(self.MAX_TIMEOUT, max(self.MIN_TIMEOUT, timeout))
+
+    def record_bulk_response(self, rtt, requested_count, received_count, response_size=0, end_of_table=False):
+        """Adjust GETBULK max-repetitions and timeout after successful response
+
+        :param rtt: request round trip time in seconds
+        :param requested_count: max-repetitions value sent in the request
+        :param received_count: count of rows received in the response
+        :param response_size: approximate size of received varbinds in bytes
+        :param end_of_table: True if the response reached the end of the walked table
+        """
+
+        self._update_timeout(rtt)
+        if received_count and response_size:
+            self.varbind_size = response_size // received_count
+        if received_count < requested_count and not end_of_table:
+            # Agent trimmed the response to fit its max message size, never ask for more rows than that
+            self._repetitions_limit = max(self.MIN_MAX_REPETITIONS, received_count)
+            self.max_repetitions = self._repetitions_limit
+        elif rtt < self.TARGET_RTT and not end_of_table:
+            self.max_repetitions = min(self._repetitions_limit, self.max_repetitions * 2)
+        elif rtt > self.TARGET_RTT * 2:
+            self.max_repetitions = max(self.MIN_MAX_REPETITIONS, self.max_repetitions // 2)
+        self._remember()
+
+    def record_get_response(self, rtt, varbinds_count):
+        """Adjust GET PDU varbinds count and timeout after successful response
+
+        :param rtt: request round trip time in seconds
+        :param varbinds_count: count of varbinds sent in the request
+        """
+
+        self._update_timeout(rtt)
+        if rtt < self.TARGET_RTT and varbinds_count >= self.max_varbinds:
+            self.max_varbinds = min(self.MAX_VARBINDS, self.max_varbinds * 2)
+        elif rtt > self.TARGET_RTT * 2:
+            self.max_varbinds = max(self.MIN_VARBINDS, self.max_varbinds // 2)
+        self._remember()
+
+    def record_too_big(self):
+        """Shrink GET PDU after 'tooBig' response from the agent"""
+
+        self.max_varbinds = max(self.MIN_VARBINDS, self.max_varbinds // 2)
+        self._remember()
+
+    def record_timeout(self):
+        """Shrink PDUs and extend timeout after request timed out"""
+
+        self.max_repetitions = max(self.MIN_MAX_REPETITIONS, self.max_repetitions // 2)
+        self.max_varbinds = max(self.MIN_VARBINDS, self.max_varbinds // 2)
+        self.timeout = min(self.MAX_TIMEOUT, self.timeout * 2)
+        self._smoothed_rtt = None
+        self._remember()
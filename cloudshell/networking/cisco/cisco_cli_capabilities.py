@@ -0,0 +1,129 @@
+import re
+import time
+from threading import Lock
+
+from cloudshell.shell.core.context_utils import get_attribute_by_name
+from cloudshell.networking.cisco.local_storage import get_local_storage_path, load_json, save_json
+
+
+def get_platform_id(resource_name):
+    """Get platform identifier from device model and OS version resource attributes
+
+    :param resource_name: resource name, it's used if model and OS version aren't known
+    :return: platform identifier, i.e. 'WS-C3750X-48/15.0(2)SE'
+    """
+
+    try:
+        model = get_attribute_by_name('Model') or ''
+        os_version = get_attribute_by_name('OS Version') or ''
+    except Exception:
+        model = os_version = ''
+    if model or os_version:
+        return '{0}/{1}'.format(model, os_version)
+    return resource_name
+
+
+def get_interface_type(interface_name):
+    """Get interface type from interface name
+
+    :param interface_name: interface name, i.e. GigabitEthernet0/1
+    :return: interface type, i.e. gigabitethernet
+    """
+
+    match = re.search(r'^[A-Za-z\-]+', interface_name.strip())
+    if match:
+        return match.group().lower()
+    return ''
+
+
+class CliCapabilityCache(object):
+    """Per platform record of cli capabilities, which are detected with probe commands, i.e. 'switchport mode ?'.
+
+    Probe results are persisted locally, so probe runs once per platform and interface type,
+    not once per request. Capability is probed again once REPROBE_INTERVAL is passed.
+    """
+
+    CACHE_FILE_NAME = 'cli_capabilities.json'
+    REPROBE_INTERVAL = 7 * 24 * 60 * 60
+
+    _FILE_LOCK = Lock()
+
+    def __init__(self, platform_id, logger, file_path=None, reprobe_interval=None):
+        """
+        :param platform_id: platform identifier, i.e. model and OS version
+        :param logger: logger
+        :param file_path: custom path to the cache file
+        :param reprobe_interval: seconds the probe result is valid for
+        """
+
+        self.platform_id = platform_id
+        self.logger = logger
+        self._file_path = file_path
+        self.reprobe_interval = reprobe_interval or self.REPROBE_INTERVAL
+        self._capabilities = None
+
+    @property
+    def file_path(self):
+        if not self._file_path:
+            self._file_path = get_local_storage_path(self.CACHE_FILE_NAME)
+        return self._file_path
+
+    @property
+    def capabilities(self):
+        """Probe results of the platform: {capability key: [value, detection timestamp]}"""
+
+        if self._capabilities is None:
+            with self._FILE_LOCK:
+                self._capabilities = load_json(self.file_path, {}).get(self.platform_id, {})
+        return self._capabilities
+
+    @staticmethod
+    def _get_key(capability, interface_type=None):
+        if interface_type:
+            return '{0}::{1}'.format(capability, interface_type)
+        return capability
+
+    def get(self, capability, interface_type=None):
+        """Get stored probe result
+
+        :param capability: capability name, i.e. 'qnq'
+        :param interface_type: interface type, if capability depends on it
+        :return: probe result or None if capability wasn't probed yet or it's time to re-probe
+        """
+
+        record = self.capabilities.get(self._get_key(capability, interface_type))
+        if not record or time.time() - record[1] > self.reprobe_interval:
+            return None
+        return record[0]
+
+    def set(self, capability, value, interface_type=None):
+        """Store probe result and merge it into the local file"""
+
+        key = self._get_key(capability, interface_type)
+        record = [value, time.time()]
+        self.capabilities[key] = record
+        with self._FILE_LOCK:
+            platforms = load_json(self.file_path, {})
+            platforms.setdefault(self.platform_id, {})[key] = record
+            try:
+                save_json(self.file_path, platforms)
+            except (IOError, OSError) as e:
+                self.logger.error('Failed to save cli capabilities: {0}'.format(e))
+
+    def get_or_probe(self, capability, probe, interface_type=None):
+        """Get stored probe result, run probe if there is no valid one
+
+        :param capability: capability name, i.e. 'qnq'
+        :param probe: function returning True if capability is supported
+        :param interface_type: interface type, if capability depends on it
+        :rtype: bool
+        """
+
+        value = self.get(capability, interface_type)
+        if value is None:
+            value = bool(probe())
+            self.logger.info('Capability {0} of {1} is {2}'.format(self._get_key(capability, interface_type),
+                                                                    self.platform_id,
+                                                                    'supported' if value else 'not supported'))
+            self.set(capability, value, interface_type)
+        return value
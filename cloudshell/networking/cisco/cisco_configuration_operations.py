@@ -1,7 +1,5 @@
 import time
-from collections import OrderedDict
 
-from cloudshell.configuration.cloudshell_cli_binding_keys import CLI_SERVICE
 from cloudshell.configuration.cloudshell_shell_core_binding_keys import LOGGER, API
 import inject
 import re
@@ -11,6 +9,10 @@ from cloudshell.networking.operations.interfaces.configuration_operations_interf
     ConfigurationOperationsInterface
 from cloudshell.networking.operations.interfaces.firmware_operations_interface import FirmwareOperationsInterface
 from cloudshell.shell.core.context_utils import get_resource_name
+from cloudshell.networking.cisco.cli_session_pool import get_cli, releases_cli_session
+from cloudshell.networking.cisco.cisco_running_config import RunningConfigService
+from cloudshell.networking.cisco.cisco_cli_capabilities import CliCapabilityCache, get_platform_id
+from cloudshell.networking.cisco.cisco_expected_map import MergedExpectedMap, send_line
 
 
 def _get_time_stamp():
@@ -22,10 +24,25 @@ def _get_time_stamp():
 
 
 class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOperationsInterface):
+    CONFIGURE_REPLACE_EXPECTED_MAP = MergedExpectedMap([('[\[\(][Yy]es/[Nn]o[\)\]]|\[confirm\]', send_line('yes')),
+                                                        ('\(y\/n\)', send_line('y')),
+                                                        ('[\[\(][Nn]o[\)\]]', send_line('y')),
+                                                        ('[\[\(][Yy]es[\)\]]', send_line('y')),
+                                                        ('[\[\(][Yy]/[Nn][\)\]]', send_line('y')),
+                                                        ('overwritte', send_line('yes'))])
+    RELOAD_EXPECTED_MAP = MergedExpectedMap([('[\[\(][Yy]es/[Nn]o[\)\]]|\[confirm\]', send_line('yes')),
+                                             ('\(y\/n\)|continue', send_line('y')),
+                                             ('reload', send_line('')),
+                                             ('[\[\(][Yy]/[Nn][\)\]]', send_line('y'))])
+    SAVE_EXPECTED_MAP = MergedExpectedMap([('\?', send_line(''))])
+    DELETE_EXPECTED_MAP = MergedExpectedMap([('\?|[confirm]', send_line(''))])
+
     def __init__(self, cli=None, logger=None, api=None, resource_name=None):
         self._logger = logger
         self._api = api
         self._cli = cli
+        self._running_config = None
+        self._cli_capabilities = None
         try:
             self.resource_name = resource_name or get_resource_name()
         except Exception:
@@ -50,9 +67,32 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
     @property
     def cli(self):
         if self._cli is None:
-            self._cli = inject.instance(CLI_SERVICE)
+            self._cli = get_cli(self.resource_name, self.logger)
         return self._cli
 
+    @property
+    def cli_capabilities(self):
+        """Cached cli capabilities of the device platform
+
+        :rtype: CliCapabilityCache
+        """
+
+        if self._cli_capabilities is None:
+            self._cli_capabilities = CliCapabilityCache(get_platform_id(self.resource_name), self.logger)
+        return self._cli_capabilities
+
+    @property
+    def running_config(self):
+        """Running-config snapshot of the device
+
+        :rtype: RunningConfigService
+        """
+
+        if self._running_config is None:
+            self._running_config = RunningConfigService(self.cli, self.resource_name, self.logger)
+        return self._running_config
+
+    @releases_cli_session
     def copy(self, source_file='', destination_file='', vrf=None, timeout=600, retries=5):
         """Copy file from device to tftp or vice versa, as well as copying inside devices filesystem
 
@@ -81,13 +121,14 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
         if vrf:
             copy_command_str += ' vrf {0}'.format(vrf)
 
-        expected_map = OrderedDict()
+        expected_map = []
         if host:
-            expected_map[host] = lambda session: session.send_line('')
-        expected_map[r'{0}|\s+[Vv][Rr][Ff]\s+|\[confirm\]|\?'.format(filename)] = lambda session: session.send_line('')
-        expected_map['\(y/n\)'] = lambda session: session.send_line('y')
-        expected_map['\([Yy]es/[Nn]o\)'] = lambda session: session.send_line('yes')
-        expected_map['bytes'] = lambda session: session.send_line('')
+            expected_map.append((host, send_line('')))
+        expected_map.append((r'{0}|\s+[Vv][Rr][Ff]\s+|\[confirm\]|\?'.format(filename), send_line('')))
+        expected_map.append(('\(y/n\)', send_line('y')))
+        expected_map.append(('\([Yy]es/[Nn]o\)', send_line('yes')))
+        expected_map.append(('bytes', send_line('')))
+        expected_map = MergedExpectedMap(expected_map)
 
         output = self.cli.send_command(command=copy_command_str, expected_map=expected_map, timeout=60)
         output += self.cli.send_command('')
@@ -118,6 +159,7 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
 
         return is_success, message
 
+    @releases_cli_session
     def configure_replace(self, source_filename, timeout=30, vrf=None):
         """Replace config on target device with specified one
 
@@ -128,15 +170,9 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
         if not source_filename:
             raise Exception('Cisco IOS', "No source filename provided for config replace method!")
         command = 'configure replace ' + source_filename
-        expected_map = {
-            '[\[\(][Yy]es/[Nn]o[\)\]]|\[confirm\]': lambda session: session.send_line('yes'),
-            '\(y\/n\)': lambda session: session.send_line('y'),
-            '[\[\(][Nn]o[\)\]]': lambda session: session.send_line('y'),
-            '[\[\(][Yy]es[\)\]]': lambda session: session.send_line('y'),
-            '[\[\(][Yy]/[Nn][\)\]]': lambda session: session.send_line('y'),
-            'overwritte': lambda session: session.send_line('yes')
-        }
-        output = self.cli.send_command(command=command, expected_map=expected_map, timeout=timeout)
+        output = self.cli.send_command(command=command, expected_map=self.CONFIGURE_REPLACE_EXPECTED_MAP,
+                                       timeout=timeout)
+        self.running_config.invalidate()
         match_error = re.search(r'[Ee]rror:', output)
 
         if match_error is not None:
@@ -145,6 +181,7 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
 
             raise Exception('Cisco IOS', 'Configure replace completed with error: ' + error_str)
 
+    @releases_cli_session
     def reload(self, sleep_timeout=60, retries=15):
         """Reload device
 
@@ -152,14 +189,10 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
         :param retries: amount of retires to get response from device after it will be rebooted
         """
 
-        expected_map = {'[\[\(][Yy]es/[Nn]o[\)\]]|\[confirm\]': lambda session: session.send_line('yes'),
-                        '\(y\/n\)|continue': lambda session: session.send_line('y'),
-                        'reload': lambda session: session.send_line(''),
-                        '[\[\(][Yy]/[Nn][\)\]]': lambda session: session.send_line('y')
-                        }
+        self.running_config.invalidate()
         try:
             self.logger.info('Send \'reload\' to device...')
-            self.cli.send_command(command='reload', expected_map=expected_map, timeout=3)
+            self.cli.send_command(command='reload', expected_map=self.RELOAD_EXPECTED_MAP, timeout=3)
 
         except Exception as e:
             session_type = self.cli.get_session_type()
@@ -195,6 +228,7 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
 
         return is_reloaded
 
+    @releases_cli_session
     def update_firmware(self, remote_host, file_path, size_of_firmware=200000000):
         """Update firmware version on device by loading provided image, performs following steps:
 
@@ -225,9 +259,9 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
             raise Exception('Cisco IOS', "Failed to download firmware from " + remote_host +
                             file_path + "!\n" + is_downloaded[1])
 
+        boot_lines = self.running_config.get_snapshot().get_boot_lines()
         self.cli.send_command(command='configure terminal', expected_str='(config)#')
-        self._remove_old_boot_system_config()
-        output = self.cli.send_command('do show run | include boot')
+        self._remove_old_boot_system_config(boot_lines)
 
         is_boot_firmware = False
         firmware_full_name = firmware_obj.get_name() + \
@@ -239,6 +273,7 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
             self.cli.send_command(command='config-reg 0x2102', expected_str='(config)#')
 
             output = self.cli.send_command('do show run | include boot')
+            self.running_config.invalidate()
 
             retries -= 1
             is_boot_firmware = output.find(firmware_full_name) != -1
@@ -248,7 +283,7 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
 
         self.cli.send_command(command='exit')
         output = self.cli.send_command(command='copy run start',
-                                       expected_map={'\?': lambda session: session.send_line('')})
+                                       expected_map=self.SAVE_EXPECTED_MAP)
         is_reloaded = self.reload()
         output_version = self.cli.send_command(command='show version | include image file')
 
@@ -273,6 +308,7 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
             raise Exception(e.message)
         return result
 
+    @releases_cli_session
     def save_configuration(self, destination_host, source_filename, vrf=None):
         """Backup 'startup-config' or 'running-config' from device to provided file_system [ftp|tftp]
         Also possible to backup config to localhost
@@ -318,6 +354,7 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
             self.logger.info('Save configuration failed with errors: {0}'.format(is_uploaded[1]))
             raise Exception(is_uploaded[1])
 
+    @releases_cli_session
     def restore_configuration(self, source_file, config_type, restore_method='override', vrf=None):
         """Restore configuration on device from provided configuration file
         Restore configuration from local file system or ftp/tftp server into 'running-config' or 'startup-config'.
@@ -347,7 +384,7 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
 
         if (restore_method.lower() == 'override') and (destination_filename == 'startup-config'):
             self.cli.send_command(command='del ' + destination_filename,
-                                  expected_map={'\?|[confirm]': lambda session: session.send_line('')})
+                                  expected_map=self.DELETE_EXPECTED_MAP)
 
             is_uploaded = self.copy(source_file=source_file, destination_file=destination_filename, vrf=vrf)
         elif (restore_method.lower() == 'override') and (destination_filename == 'running-config'):
@@ -360,6 +397,8 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
         else:
             is_uploaded = self.copy(source_file=source_file, destination_file=destination_filename, vrf=vrf)
 
+        if destination_filename == 'running-config':
+            self.running_config.invalidate()
         if is_uploaded[0] is False:
             raise Exception('Cisco OS', is_uploaded[1])
 
@@ -371,28 +410,30 @@ class CiscoConfigurationOperations(ConfigurationOperationsInterface, FirmwareOpe
             raise Exception('Cisco OS', is_downloaded[1])
 
     def _check_replace_command(self):
-        """Checks whether replace command exist on device or not
+        """Checks whether replace command exist on device or not, result is cached per platform
         """
 
+        return self.cli_capabilities.get_or_probe('configure_replace', self._probe_replace_command)
+
+    def _probe_replace_command(self):
         output = self.cli.send_command('configure replace')
         if re.search(r'invalid (input|command)', output.lower()):
             return False
         return True
 
-    def _remove_old_boot_system_config(self):
+    def _remove_old_boot_system_config(self, boot_lines=None):
         """Clear boot system parameters in current configuration
+
+        :param boot_lines: boot lines of running-config, running-config snapshot is used if not provided
         """
 
-        data = self.cli.send_command('do show run | include boot')
+        if boot_lines is None:
+            boot_lines = self.running_config.get_snapshot().get_boot_lines()
         start_marker_str = 'boot-start-marker'
-        index_begin = data.find(start_marker_str)
-        index_end = data.find('boot-end-marker')
-
-        if index_begin == -1 or index_end == -1:
+        if start_marker_str not in boot_lines or 'boot-end-marker' not in boot_lines:
             return
 
-        data = data[index_begin + len(start_marker_str):index_end]
-        data_list = data.split('\n')
+        data_list = boot_lines[boot_lines.index(start_marker_str) + 1:boot_lines.index('boot-end-marker')]
 
         for line in data_list:
             if line.find('boot system') != -1:
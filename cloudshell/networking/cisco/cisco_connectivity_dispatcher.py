@@ -0,0 +1,125 @@
+import traceback
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+from threading import Lock
+
+import jsonpickle
+from cloudshell.core.action_result import ActionResult
+from cloudshell.core.driver_response import DriverResponse
+from cloudshell.core.driver_response_root import DriverResponseRoot
+from cloudshell.networking.core.connectivity_request_helper import ConnectivityRequestDeserializer
+
+
+class CiscoConnectivityDispatcher(object):
+    """Apply connectivity changes of many devices concurrently.
+
+    Actions are grouped by device, every device is configured in separate thread with it's own
+    connectivity operations object and cli session. Actions of the same device are never applied in parallel,
+    count of devices configured at the same time is limited by threads count.
+    """
+
+    DEFAULT_THREADS_COUNT = 10
+
+    _DEVICE_LOCKS = {}
+    _DEVICE_LOCKS_LOCK = Lock()
+
+    def __init__(self, operations_factory, logger, threads_count=None):
+        """
+        :param operations_factory: function, which receives device id and returns CiscoConnectivityOperations
+            object configured for the device
+        :param logger: logger
+        :param threads_count: max count of devices configured concurrently
+        """
+
+        self.operations_factory = operations_factory
+        self.logger = logger
+        self.threads_count = threads_count or self.DEFAULT_THREADS_COUNT
+
+    @staticmethod
+    def get_device_id(action):
+        """Get device id of the action target, i.e. '192.168.1.1' for '192.168.1.1/0/23' full address"""
+
+        return action.actionTarget.fullAddress.split('/')[0]
+
+    @classmethod
+    def _get_device_lock(cls, device_id):
+        with cls._DEVICE_LOCKS_LOCK:
+            if device_id not in cls._DEVICE_LOCKS:
+                cls._DEVICE_LOCKS[device_id] = Lock()
+            return cls._DEVICE_LOCKS[device_id]
+
+    def apply_connectivity_changes(self, request):
+        """Handle apply connectivity changes request json with actions of many devices
+
+        :param request: json with all required action to configure or remove vlans from certain port
+        :return Serialized DriverResponseRoot to json
+        :rtype json
+        """
+
+        if request is None or request == '':
+            raise Exception(self.__class__.__name__, 'request is None or empty')
+
+        holder = ConnectivityRequestDeserializer(jsonpickle.decode(request))
+
+        if not holder or not hasattr(holder, 'driverRequest'):
+            raise Exception(self.__class__.__name__, 'Deserialized request is None or empty')
+
+        driver_response = DriverResponse()
+        driver_response.actionResults = self.apply_actions(holder.driverRequest.actions)
+        driver_response_root = DriverResponseRoot()
+        driver_response_root.driverResponse = driver_response
+        return str(jsonpickle.encode(driver_response_root, unpicklable=False)).replace('[true]', 'true')
+
+    def apply_actions(self, actions):
+        """Apply actions of all devices, every device in it's own thread
+
+        :param actions: list of request actions
+        :return: list of ActionResult objects in order of the actions
+        """
+
+        device_actions = OrderedDict()
+        for action in actions:
+            if action.type in ('setVlan', 'removeVlan'):
+                device_actions.setdefault(self.get_device_id(action), []).append(action)
+        if not device_actions:
+            return []
+
+        pool = ThreadPool(max(1, min(self.threads_count, len(device_actions))))
+        try:
+            device_results = pool.map(self._apply_device_actions, device_actions.items())
+        finally:
+            pool.close()
+            pool.join()
+
+        results_by_id = {}
+        for results in device_results:
+            for action_result in results:
+                results_by_id[action_result.actionId] = action_result
+        return [results_by_id[action.actionId] for action in actions if action.actionId in results_by_id]
+
+    def _apply_device_actions(self, device_item):
+        device_id, actions = device_item
+        with self._get_device_lock(device_id):
+            operations = None
+            try:
+                self.logger.info('Apply {0} connectivity actions to {1}'.format(len(actions), device_id))
+                operations = self.operations_factory(device_id)
+                return operations.apply_vlan_actions(actions)
+            except Exception as e:
+                self.logger.error('Connectivity changes of {0} failed: {1}'.format(device_id, traceback.format_exc()))
+                return [self._get_error_result(action, e) for action in actions]
+            finally:
+                cli = getattr(operations, '_cli', None)
+                if hasattr(cli, 'release'):
+                    cli.release()
+
+    @staticmethod
+    def _get_error_result(action, error):
+        action_result = ActionResult()
+        action_result.type = action.type
+        action_result.actionId = action.actionId
+        action_result.infoMessage = None
+        action_result.errorMessage = ', '.join(map(str, error.args))
+        action_result.success = False
+        action_result.updatedInterface = action.actionTarget.fullName
+        return action_result
@@ -1,26 +1,56 @@
-from cloudshell.configuration.cloudshell_cli_binding_keys import CLI_SERVICE
 from cloudshell.configuration.cloudshell_shell_core_binding_keys import LOGGER, API
+from cloudshell.configuration.cloudshell_snmp_binding_keys import SNMP_HANDLER
 import inject
+import jsonpickle
+import traceback
 from collections import OrderedDict
 import re
 
 from cloudshell.networking.networking_utils import *
 from cloudshell.networking.operations.connectivity_operations import ConnectivityOperations
+from cloudshell.networking.core.connectivity_request_helper import ConnectivityRequestDeserializer
+from cloudshell.core.action_result import ActionResult
+from cloudshell.core.driver_response import DriverResponse
+from cloudshell.core.driver_response_root import DriverResponseRoot
 from cloudshell.networking.cisco.command_templates.ethernet import ETHERNET_COMMANDS_TEMPLATES
 from cloudshell.networking.cisco.command_templates.vlan import VLAN_COMMANDS_TEMPLATES
 from cloudshell.networking.cisco.command_templates.cisco_interface import ENTER_INTERFACE_CONF_MODE
-from cloudshell.cli.command_template.command_template_service import add_templates, get_commands_list
+from cloudshell.networking.cisco.command_templates.template_registry import VLAN_CONFIGURATION_TEMPLATES
+from cloudshell.networking.cisco.cisco_expected_map import MergedExpectedMap, send_line
+from cloudshell.networking.cisco.cisco_cli_capabilities import CliCapabilityCache, get_platform_id, get_interface_type
+from cloudshell.networking.cisco.cisco_port_name_index import PortNameIndex
+from cloudshell.networking.cisco.cisco_running_config import RunningConfigService, get_switchport_state
+from cloudshell.networking.cisco.cisco_vlan_range import VlanRange
+from cloudshell.networking.cisco.cisco_vlan_inventory import CiscoVlanInventory
+from cloudshell.cli.command_template.command_template_service import add_templates
 from cloudshell.shell.core.context_utils import get_resource_name
+from cloudshell.networking.cisco.cli_session_pool import get_cli, releases_cli_session
 
 
 class CiscoConnectivityOperations(ConnectivityOperations):
-    def __init__(self, cli=None, logger=None, api=None, resource_name=None):
+    VLAN_EXPECTED_MAP = MergedExpectedMap([('[\[\(][Yy]es/[Nn]o[\)\]]|\[confirm\]', send_line('yes')),
+                                           ('[\[\(][Yy]/[Nn][\)\]]', send_line('y'))])
+    DEFAULT_MAX_LINE_LENGTH = 200
+    # vlan range actions and actions used for the rest of the range, if it doesn't fit into single line
+    VLAN_RANGE_ACTIONS = {'configure_vlan': 'configure_vlan',
+                          'trunk_allow_vlan': 'trunk_add_vlan',
+                          'trunk_add_vlan': 'trunk_add_vlan',
+                          'trunk_remove_vlan': 'trunk_remove_vlan'}
+    _SWITCHPORT_COMMAND_REQUIRED = {}
+    _templates_loaded = False
+
+    def __init__(self, cli=None, logger=None, api=None, resource_name=None, snmp_handler=None):
         ConnectivityOperations.__init__(self)
         self._cli = cli
         self._logger = logger
         self._api = api
+        self._snmp_handler = snmp_handler
+        self._vlan_inventory = None
+        self._port_name_index = None
+        self._running_config = None
+        self._cli_capabilities = None
         try:
-            self.resource_name = get_resource_name()
+            self.resource_name = resource_name or get_resource_name()
         except Exception:
             raise Exception('CiscoHandlerBase', 'Failed to get ResourceName.')
 
@@ -43,9 +73,67 @@ class CiscoConnectivityOperations(ConnectivityOperations):
     @property
     def cli(self):
         if self._cli is None:
-            self._cli = inject.instance(CLI_SERVICE)
+            self._cli = get_cli(self.resource_name, self.logger)
         return self._cli
 
+    @property
+    def port_name_index(self):
+        """Cached index of the resource ports full addresses
+
+        :rtype: PortNameIndex
+        """
+
+        if self._port_name_index is None:
+            self._port_name_index = PortNameIndex(self.api, self.resource_name, self.logger)
+        return self._port_name_index
+
+    @property
+    def cli_capabilities(self):
+        """Cached cli capabilities of the device platform
+
+        :rtype: CliCapabilityCache
+        """
+
+        if self._cli_capabilities is None:
+            self._cli_capabilities = CliCapabilityCache(get_platform_id(self.resource_name), self.logger)
+        return self._cli_capabilities
+
+    @property
+    def running_config(self):
+        """Running-config snapshot of the device
+
+        :rtype: RunningConfigService
+        """
+
+        if self._running_config is None:
+            self._running_config = RunningConfigService(self.cli, self.resource_name, self.logger)
+        return self._running_config
+
+    @property
+    def vlan_inventory(self):
+        """Cached inventory of the vlans existing on the device
+
+        :rtype: CiscoVlanInventory
+        """
+
+        if self._vlan_inventory is None:
+            self._vlan_inventory = CiscoVlanInventory(self._snmp_handler, self.resource_name, self.logger)
+        return self._vlan_inventory
+
+    def _get_vlans_to_create(self, vlan_range):
+        """Get vlans from provided range, which have to be created, all of them if vlan inventory can't be read
+
+        :param vlan_range: vlan range, i.e. '10,20,30-32'
+        :return: vlan range string
+        """
+
+        try:
+            return self.vlan_inventory.get_missing_vlans(vlan_range)
+        except Exception as e:
+            self.logger.error('Failed to read vlan inventory: {0}'.format(e))
+            return vlan_range
+
+    @releases_cli_session
     def send_config_command_list(self, command_list, expected_map=None):
         """Send list of config commands
 
@@ -58,30 +146,15 @@ class CiscoConnectivityOperations(ConnectivityOperations):
         self.cli.exit_configuration_mode()
         return result
 
-    def _get_resource_full_name(self, port_resource_address, resource_details_map):
-        """Recursively search for port name on the resource
-
-        :param port_resource_address: port resource address
-        :param resource_details_map: full device resource structure
-        :return: full port resource name (Cisco2950/Chassis 0/FastEthernet0-23)
-        :rtype: string
-        """
-
-        result = None
-        for port in resource_details_map.ChildResources:
-            if port.FullAddress in port_resource_address and port.FullAddress == port_resource_address:
-                return port.Name
-            if port.FullAddress in port_resource_address and port.FullAddress != port_resource_address:
-                result = self._get_resource_full_name(port_resource_address, port)
-            if result is not None:
-                return result
-        return result
-
     def _does_interface_support_qnq(self, interface_name):
-        """Validate whether qnq is supported for certain port
+        """Validate whether qnq is supported for certain port, result is cached per platform and interface type
 
         """
 
+        return self.cli_capabilities.get_or_probe('qnq', lambda: self._probe_qnq(interface_name),
+                                                  get_interface_type(interface_name))
+
+    def _probe_qnq(self, interface_name):
         result = False
         self.cli.send_config_command('interface {0}'.format(interface_name))
         output = self.cli.send_config_command('switchport mode ?')
@@ -90,16 +163,224 @@ class CiscoConnectivityOperations(ConnectivityOperations):
         self.cli.exit_configuration_mode()
         return result
 
-    @staticmethod
-    def _load_vlan_command_templates():
-        """Load all required Commandtemplates to configure valn on certain port
+    @classmethod
+    def _load_vlan_command_templates(cls):
+        """Load all required Commandtemplates to configure valn on certain port into command template service,
+        vlan configuration itself uses precompiled VLAN_CONFIGURATION_TEMPLATES
 
         """
 
+        if cls._templates_loaded:
+            return
         add_templates(ETHERNET_COMMANDS_TEMPLATES)
         add_templates(VLAN_COMMANDS_TEMPLATES)
         add_templates(ENTER_INTERFACE_CONF_MODE)
+        cls._templates_loaded = True
+
+    @releases_cli_session
+    def apply_connectivity_changes(self, request):
+        """Handle apply connectivity changes request json, all vlan actions of the request are applied in batch
+
+        :param request: json with all required action to configure or remove vlans from certain port
+        :return Serialized DriverResponseRoot to json
+        :rtype json
+        """
+
+        if request is None or request == '':
+            raise Exception('ConnectivityOperations', 'request is None or empty')
+
+        holder = ConnectivityRequestDeserializer(jsonpickle.decode(request))
+
+        if not holder or not hasattr(holder, 'driverRequest'):
+            raise Exception('ConnectivityOperations', 'Deserialized request is None or empty')
+
+        driver_response = DriverResponse()
+        driver_response.actionResults = self.apply_vlan_actions(holder.driverRequest.actions)
+        driver_response_root = DriverResponseRoot()
+        driver_response_root.driverResponse = driver_response
+        return self.set_command_result(driver_response_root).replace('[true]', 'true')
+
+    @releases_cli_session
+    def apply_vlan_actions(self, actions):
+        """Apply many setVlan and removeVlan actions at once: port names are resolved with cached port name index,
+        all vlans are created with single 'vlan' command and all interfaces are configured
+        in single configuration mode session. Trunk vlans added to the same port are merged,
+        otherwise the last action of the port defines it's configuration and previous ones are reported as not applied.
+
+        :param actions: list of request actions
+        :return: list of ActionResult objects
+        """
+
+        results = []
+        port_actions = OrderedDict()
+        for action in actions:
+            self._validate_request_action(action)
+            if action.type not in ('setVlan', 'removeVlan'):
+                continue
+            action_result = ActionResult()
+            action_result.type = action.type
+            action_result.actionId = action.actionId
+            action_result.errorMessage = None
+            action_result.infoMessage = None
+            action_result.updatedInterface = action.actionTarget.fullName
+            results.append(action_result)
+            try:
+                vlan_action = self._get_vlan_action(action)
+                self.validate_vlan_methods_incoming_parameters(vlan_action['vlan_range'], vlan_action['port'],
+                                                               vlan_action['port_mode'])
+                vlan_action['vlans'] = VlanRange.parse(vlan_action['vlan_range'])
+            except Exception as e:
+                self._set_action_error(action_result, e)
+                continue
+            port_actions.setdefault(vlan_action['port'], []).append((vlan_action, action_result))
+        if not port_actions:
+            return results
+
+        vlans = VlanRange()
+        for port in port_actions.keys():
+            for vlan_action, action_result in port_actions[port]:
+                if vlan_action['type'] == 'setVlan':
+                    vlans |= vlan_action['vlans']
+        try:
+            self._create_vlans(str(vlans))
+        except Exception as e:
+            self.logger.error('Vlan creation failed: {0}'.format(traceback.format_exc()))
+            for port in port_actions.keys():
+                for vlan_action, action_result in port_actions[port]:
+                    if vlan_action['type'] == 'setVlan':
+                        self._set_action_error(action_result, e)
+                port_actions[port] = [item for item in port_actions[port] if item[0]['type'] != 'setVlan']
+
+        if self._is_incremental_vlan_configuration() and len(port_actions) > 1:
+            # interfaces of the batch are looked up in running-config read once
+            self.running_config.get_snapshot()
+        interface_configs = []
+        for port, vlan_actions in port_actions.iteritems():
+            if not vlan_actions:
+                continue
+            port_action, merged_indexes = self._merge_port_actions([vlan_action for vlan_action, action_result
+                                                                    in vlan_actions])
+            overriding_action_id = vlan_actions[merged_indexes[-1]][1].actionId
+            conflicting_indexes = self._get_conflicting_action_indexes(
+                [vlan_action for vlan_action, action_result in vlan_actions], merged_indexes)
+            for index in conflicting_indexes:
+                self._set_action_error(vlan_actions[index][1], Exception(
+                    'ConnectivityOperations', 'Action is overridden by action {0} of the same port, '
+                                              'it was not applied'.format(overriding_action_id)))
+            vlan_actions = [item for index, item in enumerate(vlan_actions) if index not in conflicting_indexes]
+            action_results = [action_result for vlan_action, action_result in vlan_actions]
+            try:
+                port_name = self.get_port_name(port)
+                remove_vlan_range = None
+                if port_action['type'] == 'setVlan':
+                    interface_config_actions = self._get_interface_config_actions(
+                        port_name, port_action['vlan_range'], port_action['port_mode'], port_action['qnq'])
+                else:
+                    interface_config_actions = OrderedDict([('configure_interface', port_name)])
+                    remove_vlan_range = self._get_remove_vlan_range(port_action['vlan_range'],
+                                                                    port_action['port_mode'])
+                interface_configs.append((self._get_interface_commands(interface_config_actions, remove_vlan_range),
+                                          vlan_actions))
+            except Exception as e:
+                self.logger.error('Vlan configuration failed: {0}'.format(traceback.format_exc()))
+                for action_result in action_results:
+                    self._set_action_error(action_result, e)
+
+        config_mode = False
+        try:
+            for commands_list, vlan_actions in interface_configs:
+                try:
+                    if commands_list:
+                        config_mode = True
+                        output = self.cli.send_command_list(commands_list, expected_map=self.VLAN_EXPECTED_MAP)
+                        self._check_vlan_configuration_output(output)
+                        self.running_config.apply_commands(commands_list)
+                except Exception as e:
+                    self.logger.error('Vlan configuration failed: {0}'.format(traceback.format_exc()))
+                    self.running_config.invalidate_interface(commands_list[0].split(' ', 1)[-1])
+                    for vlan_action, action_result in vlan_actions:
+                        self._set_action_error(action_result, e)
+                    continue
+                for vlan_action, action_result in vlan_actions:
+                    if vlan_action['type'] == 'setVlan':
+                        action_result.infoMessage = 'Vlan Configuration Completed.'
+                    else:
+                        action_result.infoMessage = 'Remove Vlan Completed.'
+        finally:
+            if config_mode:
+                self.cli.exit_configuration_mode()
+        return results
+
+    @staticmethod
+    def _get_vlan_action(action):
+        """Get vlan action parameters from request action
+
+        :return: dict{'type', 'vlan_range', 'port', 'port_mode', 'qnq', 'ctag'}
+        """
+
+        qnq = False
+        ctag = ''
+        for attribute in getattr(action.connectionParams, 'vlanServiceAttributes', []):
+            if attribute.attributeName.lower() == 'qnq':
+                qnq = attribute.attributeValue.lower() == 'true'
+            elif attribute.attributeName.lower() == 'ctag':
+                ctag = attribute.attributeValue
+        return {'type': action.type,
+                'vlan_range': action.connectionParams.vlanId,
+                'port': action.actionTarget.fullAddress,
+                'port_mode': action.connectionParams.mode.lower(),
+                'qnq': qnq,
+                'ctag': ctag}
+
+    @staticmethod
+    def _merge_port_actions(vlan_actions):
+        """Merge vlan actions of the same port into single resulting action, trunk vlans added to the port are merged,
+        otherwise the action overrides previous ones
+
+        :param vlan_actions: list of vlan action dicts in request order
+        :return: tuple (vlan action dict, list of indexes of the actions it's made of)
+        """
+
+        result = None
+        merged_indexes = []
+        for index, vlan_action in enumerate(vlan_actions):
+            if result and result['type'] == vlan_action['type'] == 'setVlan' and \
+                    'trunk' in result['port_mode'] and 'trunk' in vlan_action['port_mode'] and \
+                    result['qnq'] == vlan_action['qnq'] and result['vlans'] and vlan_action['vlans']:
+                vlans = result['vlans'] | vlan_action['vlans']
+                result = dict(result, vlan_range=str(vlans), vlans=vlans)
+                merged_indexes.append(index)
+            else:
+                result = dict(vlan_action)
+                merged_indexes = [index]
+        return result, merged_indexes
+
+    @staticmethod
+    def _get_conflicting_action_indexes(vlan_actions, merged_indexes):
+        """Find actions of the same port, which are superseded by the resulting action and conflict with it.
+        Resulting action redefines switchport configuration of the port, so superseded removeVlan action
+        and setVlan action followed by removeVlan one are completed by it, i.e. removeVlan followed by setVlan.
+        setVlan action followed only by other setVlan actions, which it's not merged with, is a conflict.
+
+        :param vlan_actions: list of vlan action dicts in request order
+        :param merged_indexes: indexes of the actions the resulting action is made of
+        :return: list of indexes
+        """
 
+        result = []
+        for index, vlan_action in enumerate(vlan_actions):
+            if index in merged_indexes or vlan_action['type'] != 'setVlan':
+                continue
+            if all(following_action['type'] == 'setVlan' for following_action in vlan_actions[index + 1:]):
+                result.append(index)
+        return result
+
+    @staticmethod
+    def _set_action_error(action_result, error):
+        action_result.errorMessage = ', '.join(map(str, error.args))
+        action_result.success = False
+
+    @releases_cli_session
     def add_vlan(self, vlan_range, port, port_mode, qnq, ctag):
         """Configure specified vlan range in specified switchport mode on provided port
 
@@ -113,24 +394,53 @@ class CiscoConnectivityOperations(ConnectivityOperations):
         :rtype: string
         """
 
-        config = inject.instance('config')
-        supported_os = config.SUPPORTED_OS
-        self._load_vlan_command_templates()
         self.validate_vlan_methods_incoming_parameters(vlan_range, port, port_mode)
         port_name = self.get_port_name(port)
         self.logger.info('Start vlan configuration: vlan {0}; interface {1}.'.format(vlan_range, port_name))
+        self._create_vlans(vlan_range)
+
+        interface_config_actions = self._get_interface_config_actions(port_name, vlan_range, port_mode, qnq)
+        self.configure_vlan_on_interface(interface_config_actions)
+        result = self.running_config.read_interface_config(port_name)
+        self.logger.info('Vlan configuration completed: \n{0}'.format(result))
+
+        return 'Vlan Configuration Completed.'
+
+    def _create_vlans(self, vlan_range):
+        """Create vlans from provided range, which don't exist on the device yet or aren't active
+
+        :param vlan_range: vlan range, i.e. '10,20,30-32'
+        """
+
+        vlans_to_create = self._get_vlans_to_create(vlan_range)
+        if not vlans_to_create:
+            self.logger.info('Vlan {0} already exists and is active, vlan creation skipped'.format(vlan_range))
+            return
         vlan_config_actions = OrderedDict()
-        interface_config_actions = OrderedDict()
-        vlan_config_actions['configure_vlan'] = vlan_range
+        vlan_config_actions['configure_vlan'] = vlans_to_create
         vlan_config_actions['state_active'] = []
         vlan_config_actions['no_shutdown'] = []
 
         self.configure_vlan(vlan_config_actions)
         self.cli.exit_configuration_mode()
+        if self._vlan_inventory:
+            self._vlan_inventory.set_active(vlans_to_create)
 
+    def _get_interface_config_actions(self, port_name, vlan_range, port_mode, qnq):
+        """Build interface configuration actions for provided switchport mode
+
+        :param port_name: interface name
+        :param vlan_range: vlan range
+        :param port_mode: 'trunk' or 'access'
+        :param qnq: configure dot1q-tunnel
+        :rtype: OrderedDict
+        """
+
+        config = inject.instance('config')
+        interface_config_actions = OrderedDict()
         interface_config_actions['configure_interface'] = port_name
         interface_config_actions['no_shutdown'] = []
-        if supported_os and re.search(r"({0})".format("|".join(supported_os)), "NXOS"):
+        if self._is_switchport_command_required(config.SUPPORTED_OS):
             interface_config_actions['switchport'] = []
         if 'trunk' in port_mode and vlan_range == '':
             interface_config_actions['switchport_mode_trunk'] = []
@@ -146,13 +456,21 @@ class CiscoConnectivityOperations(ConnectivityOperations):
             if not self._does_interface_support_qnq(port_name):
                 raise Exception('interface does not support QnQ')
             interface_config_actions['qnq'] = []
+        return interface_config_actions
 
-        self.configure_vlan_on_interface(interface_config_actions)
-        result = self.cli.send_command('show running-config interface {0}'.format(port_name))
-        self.logger.info('Vlan configuration completed: \n{0}'.format(result))
+    @classmethod
+    def _is_switchport_command_required(cls, supported_os):
+        """Check whether interface has to be switched to layer 2 with 'switchport' command, i.e. on NX-OS
 
-        return 'Vlan Configuration Completed.'
+        :param supported_os: list of supported os regexes from driver config
+        """
+
+        key = tuple(supported_os or [])
+        if key not in cls._SWITCHPORT_COMMAND_REQUIRED:
+            cls._SWITCHPORT_COMMAND_REQUIRED[key] = bool(key and re.search(r"({0})".format("|".join(key)), "NXOS"))
+        return cls._SWITCHPORT_COMMAND_REQUIRED[key]
 
+    @releases_cli_session
     def remove_vlan(self, vlan_range, port, port_mode):
         """
         Remove vlan from port
@@ -164,14 +482,14 @@ class CiscoConnectivityOperations(ConnectivityOperations):
         :rtype: string
         """
 
-        self._load_vlan_command_templates()
         self.validate_vlan_methods_incoming_parameters(vlan_range, port, port_mode)
 
         port_name = self.get_port_name(port)
         self.logger.info('Remove Vlan {0} from interface {1}'.format(vlan_range, port_name))
         interface_config_actions = OrderedDict()
         interface_config_actions['configure_interface'] = port_name
-        self.configure_vlan_on_interface(interface_config_actions)
+        self.configure_vlan_on_interface(interface_config_actions,
+                                         self._get_remove_vlan_range(vlan_range, port_mode))
         self.logger.info('Vlan configuration removed from the interface {0}'.format(port_name))
 
         return 'Remove Vlan Completed.'
@@ -204,8 +522,7 @@ class CiscoConnectivityOperations(ConnectivityOperations):
         :rtype: string
         """
 
-        port_resource_map = self.api.GetResourceDetails(self.resource_name)
-        temp_port_full_name = self._get_resource_full_name(port, port_resource_map)
+        temp_port_full_name = self.port_name_index.get_resource_name(port)
         if not temp_port_full_name:
             err_msg = 'Failed to get port name.'
             self.logger.error(err_msg)
@@ -218,18 +535,72 @@ class CiscoConnectivityOperations(ConnectivityOperations):
         self.logger.info('Interface name validation OK, portname = {0}'.format(temp_port_name))
         return temp_port_name
 
-    def configure_vlan_on_interface(self, commands_dict):
+    def configure_vlan_on_interface(self, commands_dict, remove_vlan_range=None):
         """Configure vlan on specified interface/s
 
         :param commands_dict: dictionary of parameters
+        :param remove_vlan_range: trunk vlans to remove, if only interface is provided in commands_dict
         :return: success message
         :rtype: string
         """
 
-        commands_list = get_commands_list(commands_dict)
+        commands_list = self._get_interface_commands(commands_dict, remove_vlan_range)
+        if not commands_list:
+            self.logger.info('Interface {0} is already configured'.format(commands_dict['configure_interface']))
+            return 'Vlan configuration completed.'
+        try:
+            output = self.send_config_command_list(commands_list, expected_map=self.VLAN_EXPECTED_MAP)
+            self._check_vlan_configuration_output(output)
+        except Exception:
+            self.running_config.invalidate_interface(commands_dict['configure_interface'])
+            raise
+        self.running_config.apply_commands(commands_list)
+
+        return 'Vlan configuration completed.'
+
+    def _is_incremental_vlan_configuration(self):
+        """Incremental mode is enabled with VLAN_INCREMENTAL_CONFIGURATION = True in config,
+        by default switchport configuration of the interface is removed and configured again,
+        i.e. removeVlan of trunk port clears it's switchport configuration
+        """
+
+        config = inject.instance('config')
+        return getattr(config, 'VLAN_INCREMENTAL_CONFIGURATION', False) is True
+
+    @staticmethod
+    def _get_remove_vlan_range(vlan_range, port_mode):
+        """Get vlans, which can be removed from trunk without removing the whole interface configuration"""
+
+        if 'trunk' in port_mode and vlan_range:
+            return vlan_range
+        return None
 
-        current_config = self.cli.send_command(
-            'show running-config interface {0}'.format(commands_dict['configure_interface']))
+    def _get_interface_commands(self, commands_dict, remove_vlan_range=None):
+        """Build interface configuration commands, current switchport configuration of the interface
+        read from the device is removed, if it can't be changed incrementally using running-config snapshot
+
+        :param commands_dict: dictionary of parameters
+        :param remove_vlan_range: trunk vlans to remove, if only interface is provided in commands_dict
+        :return: list of commands, empty list if interface is already configured
+        """
+
+        interface_name = commands_dict['configure_interface']
+        current_config = None
+        if self._is_incremental_vlan_configuration():
+            commands_list = self._get_incremental_interface_commands(
+                commands_dict, self.running_config.get_interface_config(interface_name), remove_vlan_range)
+            if commands_list == []:
+                # the snapshot may miss changes made by others, nothing is skipped without checking the device
+                current_config = self.running_config.read_interface_config(interface_name)
+                commands_list = self._get_incremental_interface_commands(commands_dict, current_config,
+                                                                         remove_vlan_range)
+            if commands_list is not None:
+                return commands_list
+
+        if current_config is None:
+            # switchport lines to remove are taken from the device, the snapshot may miss changes made by others
+            current_config = self.running_config.read_interface_config(interface_name)
+        commands_list = self._get_commands_list(commands_dict)
 
         for line in current_config.splitlines():
             if re.search(r'^\s*switchport\s+', line):
@@ -237,11 +608,108 @@ class CiscoConnectivityOperations(ConnectivityOperations):
                 if not line_to_remove:
                     line_to_remove = line
                 commands_list.insert(1, 'no {0}'.format(line_to_remove.strip(' ')))
+        return commands_list
+
+    def _get_incremental_interface_commands(self, commands_dict, current_config, remove_vlan_range=None):
+        """Build commands changing only the difference between current and requested switchport configuration,
+        switchport mode has to be the same, trunk vlans are changed with 'allowed vlan add/remove'
+
+        :param commands_dict: dictionary of parameters
+        :param current_config: current interface configuration
+        :param remove_vlan_range: trunk vlans to remove, if only interface is provided in commands_dict
+        :return: list of commands, empty list if nothing has to be changed,
+        None if configuration can't be changed incrementally
+        """
 
-        expected_map = {'[\[\(][Yy]es/[Nn]o[\)\]]|\[confirm\]': lambda session: session.send_line('yes'),
-                        '[\[\(][Yy]/[Nn][\)\]]': lambda session: session.send_line('y')}
-        output = self.send_config_command_list(commands_list, expected_map=expected_map)
+        state = get_switchport_state(current_config)
+        config_actions = OrderedDict([('configure_interface', commands_dict['configure_interface'])])
+        if 'qnq' in commands_dict:
+            return None
+        if state['shutdown'] and 'no_shutdown' in commands_dict:
+            config_actions['no_shutdown'] = []
+
+        if len(commands_dict) == 1:
+            if state['mode'] != 'trunk' or not remove_vlan_range:
+                return None
+            current_vlans = state['trunk_vlans']
+            if current_vlans is None:
+                current_vlans = VlanRange.all()
+            vlans_to_remove = current_vlans & VlanRange.parse(remove_vlan_range)
+            if vlans_to_remove == current_vlans:
+                return None
+            if vlans_to_remove:
+                config_actions['trunk_remove_vlan'] = [str(vlans_to_remove)]
+        elif 'switchport_mode_trunk' in commands_dict:
+            if state['mode'] != 'trunk':
+                return None
+            if 'trunk_allow_vlan' not in commands_dict:
+                if state['trunk_vlans'] is not None:
+                    config_actions['no_trunk_allow_vlan'] = []
+            elif state['trunk_vlans'] is None:
+                config_actions['trunk_allow_vlan'] = commands_dict['trunk_allow_vlan']
+            else:
+                requested_vlans = VlanRange.parse(commands_dict['trunk_allow_vlan'][0])
+                if requested_vlans - state['trunk_vlans']:
+                    config_actions['trunk_add_vlan'] = [str(requested_vlans - state['trunk_vlans'])]
+                if state['trunk_vlans'] - requested_vlans:
+                    config_actions['trunk_remove_vlan'] = [str(state['trunk_vlans'] - requested_vlans)]
+        elif 'access_allow_vlan' in commands_dict:
+            if state['mode'] != 'access':
+                return None
+            if state['access_vlan'] != int(commands_dict['access_allow_vlan'][0]):
+                config_actions['access_allow_vlan'] = commands_dict['access_allow_vlan']
+        else:
+            return None
+
+        if len(config_actions) == 1:
+            return []
+        return self._get_commands_list(config_actions)
+
+    def _get_max_line_length(self):
+        config = inject.instance('config')
+        max_line_length = getattr(config, 'CLI_MAX_LINE_LENGTH', None)
+        if isinstance(max_line_length, int) and max_line_length > 0:
+            return max_line_length
+        return self.DEFAULT_MAX_LINE_LENGTH
+
+    def _split_vlan_range(self, action, vlan_range):
+        """Split vlan range into the least count of parts, commands of which fit into cli line
+
+        :param action: vlan range action, i.e. 'trunk_allow_vlan'
+        :param vlan_range: vlan range, i.e. '10,20,30-32'
+        :return: list of vlan range strings
+        """
+
+        command_length = max(len(VLAN_CONFIGURATION_TEMPLATES.render(name, ['1'])) - 1
+                             for name in (action, self.VLAN_RANGE_ACTIONS[action]))
+        return VlanRange.parse(vlan_range).split(self._get_max_line_length() - command_length)
 
+    def _get_commands_list(self, config_actions):
+        """Build list of commands, vlan ranges are coalesced and split into several commands
+        if they don't fit into cli line, commands following 'configure_vlan' are repeated for each part of the range
+
+        :param config_actions: dictionary of parameters
+        :return: list of commands
+        """
+
+        config_actions = list(config_actions.items())
+        commands_list = []
+        for index, (action, value) in enumerate(config_actions):
+            vlan_range = value[0] if isinstance(value, list) and value else value
+            if action not in self.VLAN_RANGE_ACTIONS or not vlan_range:
+                commands_list.append(VLAN_CONFIGURATION_TEMPLATES.render(action, value))
+                continue
+            for range_index, vlan_range_part in enumerate(self._split_vlan_range(action, vlan_range)):
+                part_action = action if range_index == 0 else self.VLAN_RANGE_ACTIONS[action]
+                commands_list.append(VLAN_CONFIGURATION_TEMPLATES.render(part_action, [vlan_range_part]))
+                if action == 'configure_vlan':
+                    commands_list.extend(self._get_commands_list(OrderedDict(config_actions[index + 1:])))
+            if action == 'configure_vlan':
+                break
+        return commands_list
+
+    @staticmethod
+    def _check_vlan_configuration_output(output):
         if re.search(r'[Cc]ommand rejected.*', output):
             error = 'Command rejected'
             for line in output.splitlines():
@@ -249,8 +717,6 @@ class CiscoConnectivityOperations(ConnectivityOperations):
                     error = line.strip(' \t\n\r')
             raise Exception('Cisco OS', 'Vlan configuration failed.\n{0}'.format(error))
 
-        return 'Vlan configuration completed.'
-
     def configure_vlan(self, ordered_parameters_dict):
         """Configure vlan
 
@@ -259,7 +725,8 @@ class CiscoConnectivityOperations(ConnectivityOperations):
         :rtype: string
         """
 
-        commands_list = get_commands_list(ordered_parameters_dict)
+        commands_list = self._get_commands_list(ordered_parameters_dict)
         self.send_config_command_list(commands_list)
+        self.running_config.apply_commands(commands_list)
 
         return 'Vlan configuration completed.'
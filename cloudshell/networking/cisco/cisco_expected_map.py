@@ -0,0 +1,53 @@
+from collections import OrderedDict
+from threading import Lock
+
+_SEND_LINE_ACTIONS = {}
+_SEND_LINE_ACTIONS_LOCK = Lock()
+
+
+def send_line(line):
+    """Get expected map action, which answers prompt with the line.
+
+    The same action object is returned for the same line, so MergedExpectedMap merges patterns answered equally.
+
+    :param line: answer, i.e. 'yes'
+    :return: function receiving session
+    """
+
+    try:
+        return _SEND_LINE_ACTIONS[line]
+    except KeyError:
+        pass
+    with _SEND_LINE_ACTIONS_LOCK:
+        if line not in _SEND_LINE_ACTIONS:
+            _SEND_LINE_ACTIONS[line] = lambda session: session.send_line(line)
+        return _SEND_LINE_ACTIONS[line]
+
+
+class MergedExpectedMap(OrderedDict):
+    """Expected map {pattern: action} with adjacent patterns of the same action merged into one pattern.
+
+    The cli searches every pattern of the map in the output on every read and runs the action of the first found one,
+    so merging leaves fewer searches per read and the cli picks the same action as before.
+    """
+
+    def __init__(self, expected_map=None):
+        """
+        :param expected_map: OrderedDict {pattern: action} or list of (pattern, action) tuples, order is priority
+        """
+
+        OrderedDict.__init__(self)
+        if hasattr(expected_map, 'items'):
+            expected_map = expected_map.items()
+
+        merged = []
+        for pattern, action in expected_map or []:
+            if merged and merged[-1][1] is action:
+                merged[-1][0].append(pattern)
+            else:
+                merged.append(([pattern], action))
+        for patterns, action in merged:
+            if len(patterns) == 1:
+                self[patterns[0]] = action
+            else:
+                self['|'.join('(?:{0})'.format(pattern) for pattern in patterns)] = action
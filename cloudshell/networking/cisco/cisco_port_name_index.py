@@ -0,0 +1,71 @@
+import time
+from threading import Lock
+
+
+class PortNameIndex(object):
+    """Index of the resource structure: child resource full address -> full resource name.
+
+    Resource details are downloaded from CloudShell once per resource and the index is shared by all
+    operations of the resource until it expires. Unknown address causes single reload, i.e. after autoload
+    added new ports.
+    """
+
+    DEFAULT_TTL = 600
+
+    _CACHE = {}
+    _CACHE_LOCK = Lock()
+
+    def __init__(self, api, resource_name, logger, ttl=None):
+        """
+        :param api: CloudShell api session
+        :param resource_name: name of the root resource
+        :param logger: logger
+        :param ttl: seconds the index is valid for
+        """
+
+        self._api = api
+        self.resource_name = resource_name
+        self.logger = logger
+        self.ttl = ttl or self.DEFAULT_TTL
+
+    def _build_index(self):
+        """Walk resource details tree once
+
+        :return: dict{full address: full resource name}
+        """
+
+        result = {}
+        resources = list(self._api.GetResourceDetails(self.resource_name).ChildResources)
+        while resources:
+            resource = resources.pop()
+            result[resource.FullAddress] = resource.Name
+            resources.extend(resource.ChildResources or [])
+        self.logger.info('Resource structure of {0} indexed, {1} resources found'.format(self.resource_name,
+                                                                                         len(result)))
+        return result
+
+    def _get_index(self, reload_index=False):
+        with self._CACHE_LOCK:
+            cached = self._CACHE.get(self.resource_name)
+            if cached and not reload_index and time.time() - cached[0] < self.ttl:
+                return cached[1]
+        index = self._build_index()
+        with self._CACHE_LOCK:
+            self._CACHE[self.resource_name] = (time.time(), index)
+        return index
+
+    def get_resource_name(self, full_address):
+        """Get full name of the child resource
+
+        :param full_address: resource full address, i.e. '192.168.1.1/0/34'
+        :return: full resource name, i.e. 'Cisco2950/Chassis 0/FastEthernet0-23', None if resource doesn't exist
+        """
+
+        index = self._get_index()
+        if full_address not in index:
+            index = self._get_index(reload_index=True)
+        return index.get(full_address)
+
+    def invalidate(self):
+        with self._CACHE_LOCK:
+            self._CACHE.pop(self.resource_name, None)
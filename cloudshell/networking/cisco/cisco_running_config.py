@@ -0,0 +1,471 @@
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from cloudshell.networking.cisco.cisco_vlan_range import VlanRange
+
+INTERFACE_HEADER = r'^interface\s+(\S.*)$'
+VLAN_HEADER = r'^vlan\s+(\d[\d,\-\s]*)$'
+TRUNK_VLAN_DELTA = r'^switchport\s+trunk\s+allowed\s+vlan\s+(add|remove|except)\s+(\S+)$'
+TRUNK_ALLOWED_VLAN = r'^switchport\s+trunk\s+allowed\s+vlan\s+(add\s+)?(\S+)$'
+
+
+def get_switchport_state(interface_config):
+    """Get switchport state from interface configuration
+
+    :param interface_config: interface configuration in 'show running-config interface' format
+    :return: dict{'mode', 'access_vlan', 'trunk_vlans', 'shutdown'}, trunk_vlans is VlanRange object
+    or None if all vlans are allowed
+    """
+
+    state = {'mode': None, 'access_vlan': None, 'trunk_vlans': None, 'shutdown': False}
+    for line in interface_config.splitlines():
+        line = line.strip()
+        match = re.search(r'^switchport\s+mode\s+(\S+)$', line)
+        if match:
+            state['mode'] = match.group(1)
+        match = re.search(r'^switchport\s+access\s+vlan\s+(\d+)$', line)
+        if match:
+            state['access_vlan'] = int(match.group(1))
+        match = re.search(TRUNK_ALLOWED_VLAN, line)
+        if match:
+            value = match.group(2)
+            if match.group(1) and state['trunk_vlans'] is not None:
+                state['trunk_vlans'] |= VlanRange.parse(value)
+            elif value == 'all':
+                state['trunk_vlans'] = None
+            else:
+                state['trunk_vlans'] = VlanRange.parse(value)
+        if line == 'shutdown':
+            state['shutdown'] = True
+    return state
+
+
+class RunningConfig(object):
+    """Running-config parsed into sections: top level lines with their indented sub-commands.
+
+    Interfaces, vlans, boot lines and archive section are indexed, config commands sent to the device
+    are applied to the parsed sections, so the config doesn't have to be read again after each change.
+    Sections changed by commands, which can't be reproduced, are marked as stale and have to be read again.
+    """
+
+    SKIP_LINES = r'^(Building configuration|Current configuration|Last configuration change|' \
+                 r'NVRAM config last updated|end$|[^\s#>]+[#>])'
+    SINGLE_VALUE_COMMANDS = ['switchport mode', 'switchport access vlan', 'switchport trunk native vlan',
+                             'switchport trunk encapsulation', 'description', 'ip address', 'channel-group',
+                             'name', 'state', 'mtu', 'speed', 'duplex']
+    FLAG_COMMANDS = ['shutdown', 'switchport']
+    GLOBAL_SINGLE_VALUE_COMMANDS = ['hostname', 'config-register']
+    GLOBAL_COMMANDS = ['boot']
+
+    def __init__(self):
+        self._sections = OrderedDict()
+        self._interfaces = {}
+        self._stale_sections = set()
+        self.stale = False
+
+    @classmethod
+    def parse(cls, text):
+        """Parse 'show running-config' output
+
+        :param text: running-config
+        :rtype: RunningConfig
+        """
+
+        config = cls()
+        header = None
+        banner_delimiter = None
+        for line in text.splitlines():
+            line = line.rstrip()
+            if banner_delimiter:
+                config._sections[header].append(line)
+                if banner_delimiter in line:
+                    banner_delimiter = None
+                continue
+            if not line.strip() or line.strip().startswith('!'):
+                continue
+            if line[0].isspace() and header is not None:
+                config._sections[header].append(line)
+                continue
+            if re.search(cls.SKIP_LINES, line):
+                header = None
+                continue
+            header = line.strip()
+            config._add_section(header)
+            banner_match = re.search(r'^banner\s+\S+\s+(\^C|\S)(.*)$', header)
+            if banner_match and banner_match.group(1) not in banner_match.group(2):
+                banner_delimiter = banner_match.group(1)
+        return config
+
+    @staticmethod
+    def _get_interface_key(interface_name):
+        return re.sub(r'\s+', '', interface_name).lower()
+
+    def _add_section(self, header):
+        if header not in self._sections:
+            self._sections[header] = []
+        match = re.search(INTERFACE_HEADER, header, re.IGNORECASE)
+        if match:
+            self._interfaces[self._get_interface_key(match.group(1))] = header
+        return header
+
+    def _remove_section(self, header):
+        self._sections.pop(header, None)
+        self._stale_sections.discard(header)
+        match = re.search(INTERFACE_HEADER, header, re.IGNORECASE)
+        if match:
+            self._interfaces.pop(self._get_interface_key(match.group(1)), None)
+
+    @property
+    def headers(self):
+        return list(self._sections.keys())
+
+    def get_section(self, header):
+        """Get sub-commands of the section
+
+        :param header: section top level line, i.e. 'archive'
+        :return: list of lines or None if section doesn't exist
+        """
+
+        if header not in self._sections:
+            return None
+        return list(self._sections[header])
+
+    def get_interface_header(self, interface_name):
+        return self._interfaces.get(self._get_interface_key(interface_name))
+
+    def has_interface(self, interface_name):
+        return self.get_interface_header(interface_name) is not None
+
+    def is_stale_interface(self, interface_name):
+        header = self.get_interface_header(interface_name)
+        return header is None or header in self._stale_sections
+
+    def get_interface(self, interface_name):
+        """Get interface configuration in the same format as 'show running-config interface' shows it
+
+        :param interface_name: interface name, i.e. GigabitEthernet0/1
+        :return: interface configuration or None if interface isn't found
+        """
+
+        header = self.get_interface_header(interface_name)
+        if header is None:
+            return None
+        return '\n'.join([header] + self._sections[header])
+
+    def get_vlan_ids(self):
+        """Get vlans defined in 'vlan' sections
+
+        :return: sorted list of vlan ids
+        """
+
+        vlans = VlanRange()
+        for header, header_vlans in self._get_vlan_headers():
+            vlans |= header_vlans
+        return list(vlans)
+
+    def _get_vlan_headers(self):
+        """Get 'vlan' sections headers with vlans they define
+
+        :return: list of tuples (header, VlanRange object)
+        """
+
+        result = []
+        for header in self._sections:
+            match = re.search(VLAN_HEADER, header)
+            if match:
+                result.append((header, VlanRange.parse(match.group(1))))
+        return result
+
+    def get_boot_lines(self):
+        return [header for header in self._sections if header.startswith('boot')]
+
+    def get_archive(self):
+        return self.get_section('archive')
+
+    def include(self, pattern):
+        """Get lines matching pattern, as 'show running-config | include' does
+
+        :param pattern: regex
+        :return: list of lines
+        """
+
+        result = []
+        for header, lines in self._sections.iteritems():
+            result.extend(line for line in [header] + lines if re.search(pattern, line))
+        return result
+
+    def update(self, text, interface_name=None):
+        """Replace sections with sections parsed from partial config output,
+        i.e. from 'show running-config interface' output
+
+        :param text: partial running-config
+        :param interface_name: name the interface was requested with, it's used as alias of the parsed interface
+        """
+
+        partial_config = RunningConfig.parse(text)
+        for header in partial_config.headers:
+            self._add_section(header)
+            self._sections[header] = partial_config.get_section(header)
+            self._stale_sections.discard(header)
+        interface_headers = list(partial_config._interfaces.values())
+        if interface_name and len(interface_headers) == 1:
+            self._interfaces[self._get_interface_key(interface_name)] = interface_headers[0]
+
+    def invalidate_interface(self, interface_name):
+        header = self.get_interface_header(interface_name)
+        if header is not None:
+            self._stale_sections.add(header)
+
+    def apply_commands(self, commands):
+        """Apply config commands sent to the device
+
+        :param commands: list of config mode commands
+        """
+
+        context = []
+        for command in commands:
+            command = command.strip()
+            if not command or command.startswith('!') or command.startswith('do '):
+                continue
+            if command in ('end', 'exit') or re.search(r'^conf(igure)?\s+t', command):
+                context = []
+                continue
+            match = re.search(INTERFACE_HEADER, command, re.IGNORECASE)
+            if match:
+                header = self.get_interface_header(match.group(1))
+                if header is None:
+                    # interface may be missing in the snapshot because of different name format
+                    header = self._add_section(command)
+                    self._stale_sections.add(header)
+                context = [header]
+                continue
+            match = re.search(VLAN_HEADER, command)
+            if match:
+                context = self._get_vlan_context(VlanRange.parse(match.group(1)))
+                continue
+            if context:
+                for header in context:
+                    self._apply_section_command(header, command)
+            else:
+                self._apply_global_command(command)
+
+    def _get_vlan_context(self, vlans):
+        """Get 'vlan' sections containing provided vlans, section is added for vlans, which don't exist yet"""
+
+        context = []
+        missing_vlans = vlans
+        for header, header_vlans in self._get_vlan_headers():
+            if header_vlans & vlans:
+                context.append(header)
+                missing_vlans -= header_vlans
+        if missing_vlans:
+            context.append(self._add_section('vlan {0}'.format(missing_vlans)))
+        return context
+
+    @staticmethod
+    def _is_same_command(line, command):
+        return line == command or line.startswith(command + ' ')
+
+    @classmethod
+    def _get_single_value_command(cls, command, commands):
+        for prefix in commands:
+            if cls._is_same_command(command, prefix):
+                return prefix
+        return None
+
+    def _apply_section_command(self, header, command):
+        lines = self._sections[header]
+        if command.startswith('no '):
+            command = command[3:].strip()
+            self._sections[header] = [line for line in lines if not self._is_same_command(line.strip(), command)]
+            return
+
+        match = re.search(TRUNK_VLAN_DELTA, command)
+        if match:
+            self._apply_trunk_vlan_delta(header, match.group(1), match.group(2))
+            return
+
+        prefix = self._get_single_value_command(command, self.SINGLE_VALUE_COMMANDS)
+        if prefix is None and re.search(TRUNK_ALLOWED_VLAN, command):
+            prefix = 'switchport trunk allowed vlan'
+        if prefix:
+            lines = [line for line in lines if not self._is_same_command(line.strip(), prefix)]
+        elif command in [line.strip() for line in lines]:
+            return
+        elif command not in self.FLAG_COMMANDS:
+            self._stale_sections.add(header)
+        self._sections[header] = lines + [' ' + command]
+
+    def _get_trunk_vlans(self, header):
+        """Get vlans allowed on trunk, all vlans are allowed if there is no 'allowed vlan' line
+
+        :rtype: VlanRange
+        """
+
+        trunk_vlans = get_switchport_state('\n'.join(self._sections[header]))['trunk_vlans']
+        if trunk_vlans is None:
+            return VlanRange.all()
+        return trunk_vlans
+
+    def _apply_trunk_vlan_delta(self, header, operation, vlan_range):
+        if operation == 'add':
+            trunk_vlans = self._get_trunk_vlans(header) | VlanRange.parse(vlan_range)
+        elif operation == 'remove':
+            trunk_vlans = self._get_trunk_vlans(header) - VlanRange.parse(vlan_range)
+        else:
+            trunk_vlans = VlanRange.all() - VlanRange.parse(vlan_range)
+        lines = [line for line in self._sections[header] if not re.search(TRUNK_ALLOWED_VLAN, line.strip())]
+        lines.append(' switchport trunk allowed vlan {0}'.format(trunk_vlans or 'none'))
+        self._sections[header] = lines
+
+    def _apply_global_command(self, command):
+        if command.startswith('no '):
+            command = command[3:].strip()
+            match = re.search(VLAN_HEADER, command)
+            if match:
+                self._remove_vlans(VlanRange.parse(match.group(1)))
+                return
+            for header in self.headers:
+                if self._is_same_command(header, command):
+                    self._remove_section(header)
+            return
+
+        prefix = self._get_single_value_command(command, self.GLOBAL_SINGLE_VALUE_COMMANDS)
+        if prefix:
+            for header in self.headers:
+                if self._is_same_command(header, prefix):
+                    self._remove_section(header)
+        elif not self._get_single_value_command(command, self.GLOBAL_COMMANDS):
+            # command may enter configuration sub-mode, following commands can't be placed correctly
+            self.stale = True
+        self._add_section(command)
+
+    def _remove_vlans(self, vlans):
+        for header, header_vlans in self._get_vlan_headers():
+            remaining_vlans = header_vlans - vlans
+            if remaining_vlans == header_vlans:
+                continue
+            lines = self._sections[header]
+            self._remove_section(header)
+            if remaining_vlans:
+                self._sections['vlan {0}'.format(remaining_vlans)] = lines
+
+
+class RunningConfigService(object):
+    """Running-config snapshot of the device, shared by all operations of the device.
+
+    Full running-config is read once and kept until it expires, commands sent to the device are applied
+    to the snapshot, so interface, boot and other sections are looked up without sending 'show' commands.
+    """
+
+    DEFAULT_TTL = 120
+    SHOW_COMMAND = 'show running-config'
+
+    _CACHE = {}
+    _CACHE_LOCK = Lock()
+
+    def __init__(self, cli, device_id, logger, ttl=None):
+        """
+        :param cli: cli service object
+        :param device_id: unique device identifier, i.e. resource name
+        :param logger: logger
+        :param ttl: seconds the snapshot is valid for
+        """
+
+        self._cli = cli
+        self.device_id = device_id
+        self.logger = logger
+        self.ttl = ttl or self.DEFAULT_TTL
+
+    def _get_cached(self):
+        cached = self._CACHE.get(self.device_id)
+        if cached and not cached[1].stale and time.time() - cached[0] < self.ttl:
+            return cached[1]
+        return None
+
+    def get_snapshot(self):
+        """Get running-config snapshot, it's read from the device if there is no valid one
+
+        :rtype: RunningConfig
+        """
+
+        with self._CACHE_LOCK:
+            snapshot = self._get_cached()
+        if snapshot is not None:
+            return snapshot
+        snapshot = RunningConfig.parse(self._cli.send_command(self.SHOW_COMMAND))
+        self.logger.info('Running-config of {0} loaded, {1} sections found'.format(self.device_id,
+                                                                                    len(snapshot.headers)))
+        with self._CACHE_LOCK:
+            self._CACHE[self.device_id] = (time.time(), snapshot)
+        return snapshot
+
+    def get_interface_config(self, interface_name):
+        """Get interface configuration from the snapshot, only the interface is read from the device
+        if there is no valid snapshot or the interface is missing in it or changed in unknown way
+
+        :param interface_name: interface name, i.e. GigabitEthernet0/1
+        :return: interface configuration in 'show running-config interface' format
+        """
+
+        with self._CACHE_LOCK:
+            snapshot = self._get_cached()
+            if snapshot is not None and not snapshot.is_stale_interface(interface_name):
+                return snapshot.get_interface(interface_name)
+        return self._read_interface_config(snapshot, interface_name)
+
+    def read_interface_config(self, interface_name):
+        """Read interface configuration from the device, the snapshot is updated with it.
+        It's used when the result must not depend on changes made by others since the snapshot was read.
+
+        :param interface_name: interface name, i.e. GigabitEthernet0/1
+        :return: interface configuration in 'show running-config interface' format
+        """
+
+        with self._CACHE_LOCK:
+            snapshot = self._get_cached()
+        return self._read_interface_config(snapshot, interface_name)
+
+    def _read_interface_config(self, snapshot, interface_name):
+        output = self._cli.send_command('{0} interface {1}'.format(self.SHOW_COMMAND, interface_name))
+        with self._CACHE_LOCK:
+            if snapshot is None:
+                snapshot = RunningConfig()
+            snapshot.update(output, interface_name)
+            return snapshot.get_interface(interface_name) or output
+
+    def include(self, pattern):
+        """Get running-config lines matching pattern
+
+        :param pattern: regex
+        :return: list of lines
+        """
+
+        snapshot = self.get_snapshot()
+        with self._CACHE_LOCK:
+            return snapshot.include(pattern)
+
+    def apply_commands(self, commands):
+        """Apply config commands sent to the device to the snapshot, nothing is done if there is no snapshot
+
+        :param commands: list of config mode commands
+        """
+
+        with self._CACHE_LOCK:
+            snapshot = self._get_cached()
+            if snapshot is not None:
+                snapshot.apply_commands(commands)
+
+    def invalidate_interface(self, interface_name):
+        """Read interface configuration from the device next time, i.e. after failed configuration"""
+
+        with self._CACHE_LOCK:
+            snapshot = self._get_cached()
+            if snapshot is not None:
+                snapshot.invalidate_interface(interface_name)
+
+    def invalidate(self):
+        with self._CACHE_LOCK:
+            self._CACHE.pop(self.device_id, None)
@@ -1,10 +1,10 @@
-from cloudshell.configuration.cloudshell_cli_binding_keys import CLI_SERVICE
 from cloudshell.configuration.cloudshell_shell_core_binding_keys import LOGGER, API
 from cloudshell.configuration.cloudshell_snmp_binding_keys import SNMP_HANDLER
 import inject
 
 from cloudshell.networking.operations.interfaces.send_command_interface import SendCommandInterface
 from cloudshell.shell.core.context_utils import get_resource_name
+from cloudshell.networking.cisco.cli_session_pool import get_cli, releases_cli_session
 
 
 class CiscoSendCommandOperations(SendCommandInterface):
@@ -47,9 +47,10 @@ class CiscoSendCommandOperations(SendCommandInterface):
     @property
     def cli(self):
         if self._cli is None:
-            self._cli = inject.instance(CLI_SERVICE)
+            self._cli = get_cli(self.resource_name, self.logger)
         return self._cli
 
+    @releases_cli_session
     def send_command(self, command, expected_str=None, expected_map=None, timeout=None, retries=None,
                      is_need_default_prompt=True, session=None):
         """Send command using cli service
@@ -76,6 +77,7 @@ class CiscoSendCommandOperations(SendCommandInterface):
                                              is_need_default_prompt=is_need_default_prompt)
         return response
 
+    @releases_cli_session
     def send_config_command(self, command, expected_str=None, expected_map=None, timeout=None, retries=None,
                             is_need_default_prompt=True):
         """Send list of config commands to the session
@@ -86,8 +88,9 @@ class CiscoSendCommandOperations(SendCommandInterface):
         :rtype: string
         """
 
-        return self.cli.send_config_command(command, expected_str, expected_map, timeout, retries,
-                                            is_need_default_prompt)
+        return self.cli.send_config_command(command, expected_str=expected_str, expected_map=expected_map,
+                                            timeout=timeout, retries=retries,
+                                            is_need_default_prompt=is_need_default_prompt)
 
 
 
@@ -0,0 +1,127 @@
+import os
+import time
+from threading import Lock
+
+import inject
+from cloudshell.configuration.cloudshell_snmp_binding_keys import SNMP_HANDLER
+from cloudshell.networking.cisco.autoload.cached_snmp_handler import CachedSnmpHandler
+from cloudshell.networking.cisco.autoload.snmp_transport_policy import AdaptiveSnmpTransportPolicy
+from cloudshell.networking.cisco.cisco_vlan_range import VlanRange
+
+ACTIVE_VLAN_STATE = 'operational'
+
+
+def parse_vlan_range(vlan_range):
+    """Expand vlan range string into vlan ids
+
+    :param vlan_range: vlan range, i.e. '10,20,30-32'
+    :return: sorted list of vlan ids, i.e. [10, 20, 30, 31, 32]
+    """
+
+    return list(VlanRange.parse(vlan_range))
+
+
+class CiscoVlanInventory(object):
+    """Vlans existing on the device, read from CISCO-VTP-MIB vtpVlanTable with single table walk.
+
+    Vlan states are cached per device for a short time, so back to back connectivity requests
+    don't walk the table again and don't recreate vlans, which are already active.
+    Failed snmp read is remembered per device as well, so unreachable snmp agent isn't tested by every request.
+    """
+
+    DEFAULT_TTL = 30
+    DEFAULT_FAILURE_TTL = 300
+    SNMP_MIB = 'CISCO-VTP-MIB'
+
+    _CACHE = {}
+    _FAILURES = {}
+    _CACHE_LOCK = Lock()
+
+    def __init__(self, snmp_handler, device_id, logger, ttl=None, failure_ttl=None):
+        """
+        :param snmp_handler: QualiSnmp object, injected snmp handler is created on first read if None
+        :param device_id: unique device identifier, i.e. resource name
+        :param logger: logger
+        :param ttl: seconds the read vlan states are valid for
+        :param failure_ttl: seconds snmp isn't used after failed read
+        """
+
+        self._snmp_handler = snmp_handler
+        self.device_id = device_id
+        self.logger = logger
+        self.ttl = ttl or self.DEFAULT_TTL
+        self.failure_ttl = failure_ttl or self.DEFAULT_FAILURE_TTL
+
+    @property
+    def snmp_handler(self):
+        if self._snmp_handler is None:
+            self._snmp_handler = inject.instance(SNMP_HANDLER)
+        return self._snmp_handler
+
+    def _load_vlans(self):
+        """Walk vtpVlanState column
+
+        :return: dict{vlan id: vlan state}
+        """
+
+        snmp = CachedSnmpHandler(self.snmp_handler, transport_policy=AdaptiveSnmpTransportPolicy())
+        snmp.update_mib_sources(os.path.abspath(os.path.join(os.path.dirname(__file__), 'mibs')))
+        result = {}
+        for index, row in snmp.get_table(self.SNMP_MIB, 'vtpVlanState').iteritems():
+            vlan_id = str(row.get('suffix', index)).split('.')[-1]
+            if vlan_id.isdigit():
+                result[int(vlan_id)] = row.get('vtpVlanState', '')
+        self.logger.info('Vlan inventory loaded, {0} vlans found'.format(len(result)))
+        return result
+
+    def get_vlans(self):
+        """Get states of the device vlans, cached states are used until they expire
+
+        :return: dict{vlan id: vlan state}
+        """
+
+        with self._CACHE_LOCK:
+            cached = self._CACHE.get(self.device_id)
+            if cached and time.time() - cached[0] < self.ttl:
+                return dict(cached[1])
+            failed_at = self._FAILURES.get(self.device_id)
+            if failed_at and time.time() - failed_at < self.failure_ttl:
+                raise Exception('CiscoVlanInventory', 'Snmp read failed {0} sec. ago, it\'s not retried yet'.format(
+                    int(time.time() - failed_at)))
+        try:
+            vlans = self._load_vlans()
+        except Exception:
+            with self._CACHE_LOCK:
+                self._FAILURES[self.device_id] = time.time()
+            raise
+        with self._CACHE_LOCK:
+            self._CACHE[self.device_id] = (time.time(), vlans)
+            self._FAILURES.pop(self.device_id, None)
+        return dict(vlans)
+
+    def get_missing_vlans(self, vlan_range):
+        """Get vlans from provided range, which don't exist on the device or aren't active
+
+        :param vlan_range: vlan range, i.e. '10,20,30-32'
+        :return: vlan range of missing vlans, empty string if all vlans are active
+        """
+
+        active_vlans = VlanRange.from_ids(vlan_id for vlan_id, state in self.get_vlans().iteritems()
+                                          if state == ACTIVE_VLAN_STATE)
+        return str(VlanRange.parse(vlan_range) - active_vlans)
+
+    def set_active(self, vlan_range):
+        """Mark vlans as active in cached inventory, i.e. after they were created
+
+        :param vlan_range: vlan range, i.e. '10,20,30-32'
+        """
+
+        with self._CACHE_LOCK:
+            cached = self._CACHE.get(self.device_id)
+            if cached:
+                for vlan_id in parse_vlan_range(vlan_range):
+                    cached[1][vlan_id] = ACTIVE_VLAN_STATE
+
+    def invalidate(self):
+        with self._CACHE_LOCK:
+            self._CACHE.pop(self.device_id, None)
@@ -0,0 +1,146 @@
+MIN_VLAN_ID = 1
+MAX_VLAN_ID = 4094
+
+
+class VlanRange(object):
+    """Set of vlan ids kept as sorted non overlapping intervals.
+
+    Union, difference and intersection are calculated on intervals, so large ranges like '1-4094'
+    aren't expanded into single vlan ids.
+    """
+
+    def __init__(self, intervals=None):
+        """
+        :param intervals: list of (first vlan id, last vlan id) tuples, they may overlap and be unsorted
+        """
+
+        self._intervals = []
+        for start, end in sorted(intervals or []):
+            if start > end:
+                continue
+            if self._intervals and start <= self._intervals[-1][1] + 1:
+                if end > self._intervals[-1][1]:
+                    self._intervals[-1] = (self._intervals[-1][0], end)
+            else:
+                self._intervals.append((start, end))
+
+    @classmethod
+    def parse(cls, vlan_range):
+        """Parse vlan range string, reversed ranges and vlan ids out of 1-4094 are rejected
+
+        :param vlan_range: vlan range, i.e. '10,20,30-32', 'all' or 'none'
+        :rtype: VlanRange
+        """
+
+        vlan_range = vlan_range.replace(' ', '')
+        if vlan_range.lower() == 'all':
+            return cls.all()
+        if vlan_range.lower() == 'none':
+            return cls()
+        intervals = []
+        for vlan in vlan_range.split(','):
+            if not vlan:
+                continue
+            try:
+                if '-' in vlan:
+                    start, end = vlan.split('-', 1)
+                    start, end = int(start), int(end)
+                else:
+                    start = end = int(vlan)
+            except ValueError:
+                raise Exception('VlanRange', 'Wrong vlan range \'{0}\': \'{1}\' is not a vlan id or range'.format(
+                    vlan_range, vlan))
+            if start > end:
+                raise Exception('VlanRange', 'Wrong vlan range \'{0}\': \'{1}\' is reversed'.format(vlan_range, vlan))
+            if start < MIN_VLAN_ID or end > MAX_VLAN_ID:
+                raise Exception('VlanRange', 'Wrong vlan range \'{0}\': vlan ids must be in {1}-{2}'.format(
+                    vlan_range, MIN_VLAN_ID, MAX_VLAN_ID))
+            intervals.append((start, end))
+        return cls(intervals)
+
+    @classmethod
+    def from_ids(cls, vlan_ids):
+        return cls([(vlan_id, vlan_id) for vlan_id in vlan_ids])
+
+    @classmethod
+    def all(cls):
+        return cls([(MIN_VLAN_ID, MAX_VLAN_ID)])
+
+    @property
+    def intervals(self):
+        return list(self._intervals)
+
+    def union(self, other):
+        return VlanRange(self._intervals + other.intervals)
+
+    def difference(self, other):
+        result = []
+        other_intervals = other.intervals
+        index = 0
+        for start, end in self._intervals:
+            while index < len(other_intervals) and other_intervals[index][1] < start:
+                index += 1
+            current = start
+            position = index
+            while position < len(other_intervals) and other_intervals[position][0] <= end:
+                other_start, other_end = other_intervals[position]
+                if other_start > current:
+                    result.append((current, other_start - 1))
+                current = max(current, other_end + 1)
+                position += 1
+            if current <= end:
+                result.append((current, end))
+        return VlanRange(result)
+
+    def intersection(self, other):
+        return self.difference(self.difference(other))
+
+    __or__ = union
+    __sub__ = difference
+    __and__ = intersection
+
+    def __contains__(self, vlan_id):
+        return any(start <= vlan_id <= end for start, end in self._intervals)
+
+    def __iter__(self):
+        for start, end in self._intervals:
+            for vlan_id in range(start, end + 1):
+                yield vlan_id
+
+    def __len__(self):
+        return sum(end - start + 1 for start, end in self._intervals)
+
+    def __nonzero__(self):
+        return bool(self._intervals)
+
+    __bool__ = __nonzero__
+
+    def __eq__(self, other):
+        return isinstance(other, VlanRange) and self._intervals == other.intervals
+
+    def __ne__(self, other):
+        return not self == other
+
+    def _get_tokens(self):
+        return [str(start) if start == end else '{0}-{1}'.format(start, end) for start, end in self._intervals]
+
+    def __str__(self):
+        return ','.join(self._get_tokens())
+
+    def __repr__(self):
+        return 'VlanRange({0!r})'.format(str(self))
+
+    def split(self, max_length):
+        """Split compressed vlan range into the least count of vlan range strings not longer than max_length
+
+        :param max_length: max length of single vlan range string
+        :return: list of vlan range strings
+        """
+
+        result = []
+        for token in self._get_tokens():
+            if result and len(result[-1]) + len(token) + 1 <= max_length:
+                result[-1] = '{0},{1}'.format(result[-1], token)
+            else:
+                result.append(token)
+        return result
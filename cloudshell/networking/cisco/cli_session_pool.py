@@ -0,0 +1,405 @@
+import time
+from functools import wraps
+from threading import Condition, Lock, Thread
+
+import inject
+from cloudshell.configuration.cloudshell_cli_binding_keys import CLI_SERVICE, CONNECTION_MANAGER
+
+
+class SessionFactoryError(Exception):
+    """Connection manager of installed cloudshell-cli can't open sessions outside of it's own pool"""
+
+
+def _get_connection_manager_factory():
+    """Get session factory of cloudshell-cli connection manager, it isn't public api of cloudshell-cli,
+    so None is returned if installed version doesn't provide it
+
+    :return: function receiving logger or None
+    """
+
+    try:
+        connection_manager = inject.instance(CONNECTION_MANAGER)
+    except Exception:
+        return None
+    create_session = getattr(connection_manager, '_create_session_by_connection_type', None)
+    if not callable(create_session):
+        return None
+    return create_session
+
+
+def _create_cli_session(logger):
+    """Open new connected session, login, enable mode and DEFAULT_ACTIONS are done by session connect"""
+
+    create_session = _get_connection_manager_factory()
+    if create_session is None:
+        raise SessionFactoryError('CliSessionPool', 'Connection manager doesn\'t support creation of pooled sessions')
+    return create_session(logger)
+
+
+class CliSessionPool(object):
+    """Pool of authenticated and bootstrapped cli sessions of single device.
+
+    Sessions are reused by following requests, idle sessions are checked with keepalive
+    and closed after idle timeout by background maintenance thread.
+    Sessions can be pre-warmed in background, so the next request doesn't wait for login.
+    """
+
+    DEFAULT_MAX_SESSIONS = 2
+    DEFAULT_IDLE_TIMEOUT = 300
+    DEFAULT_KEEPALIVE_INTERVAL = 60
+    DEFAULT_ACQUIRE_TIMEOUT = 120
+    DEFAULT_KEEPALIVE_PROMPT = r'.*[>#]\s*$'
+
+    _POOLS = {}
+    _POOLS_LOCK = Lock()
+
+    def __init__(self, device_id, logger, session_factory=None, max_sessions=None, idle_timeout=None,
+                 keepalive_interval=None, keepalive_prompt=None):
+        """
+        :param device_id: unique device identifier, i.e. resource name
+        :param logger: logger
+        :param session_factory: function creating new connected session, receives logger
+        :param max_sessions: max count of opened sessions
+        :param idle_timeout: idle session is closed after this count of seconds
+        :param keepalive_interval: idle session is checked with empty command after this count of seconds
+        :param keepalive_prompt: prompt expected in response to keepalive
+        """
+
+        self.device_id = device_id
+        self.logger = logger
+        self._session_factory = session_factory or _create_cli_session
+        self.max_sessions = max_sessions or self.DEFAULT_MAX_SESSIONS
+        self.idle_timeout = idle_timeout or self.DEFAULT_IDLE_TIMEOUT
+        self.keepalive_interval = keepalive_interval or self.DEFAULT_KEEPALIVE_INTERVAL
+        self.keepalive_prompt = keepalive_prompt or self.DEFAULT_KEEPALIVE_PROMPT
+        self._condition = Condition()
+        self._idle_sessions = []
+        self._sessions_count = 0
+        self._warming_count = 0
+        self._maintenance_thread = None
+
+    @classmethod
+    def get_pool(cls, device_id, logger, prewarm_count=0, **kwargs):
+        """Get pool of the device, pool is created on first request and shared by all requests to the device
+
+        :param device_id: unique device identifier, i.e. resource name
+        :param logger: logger
+        :param prewarm_count: count of sessions opened in background once the pool is created
+        :rtype: CliSessionPool
+        """
+
+        created = False
+        with cls._POOLS_LOCK:
+            if device_id not in cls._POOLS:
+                cls._POOLS[device_id] = cls(device_id, logger, **kwargs)
+                created = True
+            pool = cls._POOLS[device_id]
+        pool.logger = logger
+        if created and prewarm_count:
+            pool.prewarm(prewarm_count)
+        return pool
+
+    @property
+    def idle_count(self):
+        with self._condition:
+            return len(self._idle_sessions)
+
+    @property
+    def sessions_count(self):
+        with self._condition:
+            return self._sessions_count
+
+    def acquire(self, timeout=None):
+        """Take idle session from the pool or open new one
+
+        :param timeout: max seconds to wait for available session
+        :return: session
+        """
+
+        timeout = timeout or self.DEFAULT_ACQUIRE_TIMEOUT
+        deadline = time.time() + timeout
+        while True:
+            session = None
+            last_used = None
+            with self._condition:
+                while not self._idle_sessions:
+                    if not self._warming_count and self._sessions_count < self.max_sessions:
+                        self._sessions_count += 1
+                        break
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise Exception(self.__class__.__name__,
+                                        'Failed to get cli session after {0} sec., timeout expired'.format(timeout))
+                    self._condition.wait(remaining)
+                if self._idle_sessions:
+                    session, last_used = self._idle_sessions.pop()
+
+            if session is None:
+                return self._open_session()
+            if time.time() - last_used < self.keepalive_interval or self._is_alive(session):
+                return session
+            self.discard(session)
+
+    def release(self, session, check=False):
+        """Return session to the pool
+
+        :param session: session taken with acquire
+        :param check: check the session with keepalive before it's returned, i.e. after command failure
+        """
+
+        if check and not self._is_alive(session):
+            self.discard(session)
+            return
+        with self._condition:
+            self._idle_sessions.append((session, time.time()))
+            self._condition.notify()
+
+    def discard(self, session):
+        """Close session taken with acquire instead of returning it to the pool"""
+
+        self._close(session)
+        with self._condition:
+            self._sessions_count -= 1
+            self._condition.notify()
+
+    def prewarm(self, count=1):
+        """Open sessions in background until at least provided count of sessions exist
+
+        :param count: required count of opened sessions
+        """
+
+        with self._condition:
+            missing = min(count, self.max_sessions) - self._sessions_count
+            if missing <= 0:
+                return
+            self._sessions_count += missing
+            self._warming_count += missing
+        for _ in range(missing):
+            thread = Thread(target=self._warm_session, name='cli-prewarm-{0}'.format(self.device_id))
+            thread.daemon = True
+            thread.start()
+
+    def close_all(self):
+        """Close all idle sessions"""
+
+        with self._condition:
+            idle_sessions = self._idle_sessions
+            self._idle_sessions = []
+        for session, last_used in idle_sessions:
+            self.discard(session)
+
+    def _warm_session(self):
+        try:
+            session = self._create_session()
+        except Exception as e:
+            self.logger.error('Failed to pre-warm cli session to {0}: {1}'.format(self.device_id, e))
+            with self._condition:
+                self._warming_count -= 1
+                self._sessions_count -= 1
+                self._condition.notify_all()
+            return
+        with self._condition:
+            self._warming_count -= 1
+            self._idle_sessions.append((session, time.time()))
+            self._condition.notify_all()
+
+    def _open_session(self):
+        """Open new session for the slot already reserved in sessions count"""
+
+        try:
+            return self._create_session()
+        except Exception:
+            with self._condition:
+                self._sessions_count -= 1
+                self._condition.notify()
+            raise
+
+    def _create_session(self):
+        session = self._session_factory(self.logger)
+        self.logger.info('Cli session to {0} opened'.format(self.device_id))
+        self._start_maintenance()
+        return session
+
+    def _is_alive(self, session):
+        try:
+            session.hardware_expect('', re_string=self.keepalive_prompt)
+            return True
+        except Exception as e:
+            self.logger.info('Cli session to {0} is dead: {1}'.format(self.device_id, e))
+            return False
+
+    def _close(self, session):
+        try:
+            session.disconnect()
+        except Exception as e:
+            self.logger.debug('Failed to close cli session: {0}'.format(e))
+
+    def _start_maintenance(self):
+        with self._condition:
+            if self._maintenance_thread and self._maintenance_thread.is_alive():
+                return
+            self._maintenance_thread = Thread(target=self._maintain, name='cli-pool-{0}'.format(self.device_id))
+            self._maintenance_thread.daemon = True
+            self._maintenance_thread.start()
+
+    def _maintain(self):
+        """Close expired idle sessions and keep the rest alive, stop once the pool is empty"""
+
+        while True:
+            time.sleep(max(0, min(self.keepalive_interval, self.idle_timeout)))
+            now = time.time()
+            with self._condition:
+                if not self._sessions_count:
+                    self._maintenance_thread = None
+                    return
+                expired = [item for item in self._idle_sessions if now - item[1] >= self.idle_timeout]
+                to_check = [item for item in self._idle_sessions if item not in expired and
+                            now - item[1] >= self.keepalive_interval]
+                self._idle_sessions = [item for item in self._idle_sessions
+                                       if item not in expired and item not in to_check]
+            for session, last_used in expired:
+                self.logger.info('Idle cli session to {0} closed'.format(self.device_id))
+                self.discard(session)
+            for session, last_used in to_check:
+                self.release(session, check=True)
+
+
+class SessionBoundCli(object):
+    """CliService wrapper, which sends all commands to the single session taken from the session pool.
+
+    Session is taken on first command and returned to the pool with release,
+    or when the wrapper is released by it's owner.
+    """
+
+    def __init__(self, cli_service, pool):
+        """
+        :param cli_service: CliService object
+        :param pool: CliSessionPool object
+        """
+
+        self._cli_service = cli_service
+        self._pool = pool
+        self._session = None
+        self._failed = False
+        self._depth = 0
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = self._pool.acquire()
+            self._failed = False
+        return self._session
+
+    def _call(self, method, *args, **kwargs):
+        if kwargs.get('session') is None:
+            try:
+                kwargs['session'] = self.session
+            except SessionFactoryError as e:
+                self._pool.logger.warning('Cli session pool isn\'t used: {0}'.format(e))
+                kwargs.pop('session', None)
+                return method(*args, **kwargs)
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            self._failed = True
+            raise
+
+    def send_command(self, command, expected_str=None, expected_map=None, error_map=None, **optional_args):
+        return self._call(self._cli_service.send_command, command, expected_str=expected_str,
+                          expected_map=expected_map, error_map=error_map, **optional_args)
+
+    def send_config_command(self, command, expected_str=None, expected_map=None, error_map=None, **optional_args):
+        return self._call(self._cli_service.send_config_command, command, expected_str=expected_str,
+                          expected_map=expected_map, error_map=error_map, **optional_args)
+
+    def send_command_list(self, commands_list, send_command_func=None, expected_map=None, error_map=None,
+                          **optional_args):
+        return self._cli_service.send_command_list(commands_list,
+                                                   send_command_func=send_command_func or self.send_config_command,
+                                                   expected_map=expected_map, error_map=error_map, **optional_args)
+
+    def exit_configuration_mode(self, **optional_args):
+        return self._call(self._cli_service.exit_configuration_mode, **optional_args)
+
+    def commit(self, expected_map=None):
+        self.send_config_command(self._cli_service._commit_command, expected_map=expected_map)
+
+    def rollback(self, expected_map=None):
+        self.send_config_command(self._cli_service._rollback_command, expected_map=expected_map)
+
+    def get_session_type(self):
+        try:
+            return self.session.session_type
+        except SessionFactoryError:
+            return self._cli_service.get_session_type()
+
+    def destroy_threaded_session(self):
+        """Close bound session, next command opens new one"""
+
+        if self._session is not None:
+            session, self._session = self._session, None
+            self._pool.discard(session)
+
+    def release(self):
+        """Return bound session to the pool"""
+
+        if self._session is not None:
+            session, self._session = self._session, None
+            self._pool.release(session, check=self._failed)
+
+    def __enter__(self):
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._depth -= 1
+        if not self._depth:
+            self.release()
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
+
+
+def releases_cli_session(method):
+    """Decorator of public operations, session taken by the operations cli is returned to the pool
+    once the operation is done. Operations called by other operations keep the session till the outer one is done.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cli = self.cli
+        if not isinstance(cli, SessionBoundCli):
+            return method(self, *args, **kwargs)
+        with cli:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def get_cli(device_id, logger):
+    """Get cli bound to pooled session of the device,
+    if CLI_SESSION_POOL_SIZE is set to 0 in config, cli service with thread session is returned
+
+    :param device_id: unique device identifier, i.e. resource name
+    :param logger: logger
+    :return: SessionBoundCli or CliService object
+    """
+
+    try:
+        config = inject.instance('config')
+    except Exception:
+        config = None
+    pool_size = getattr(config, 'CLI_SESSION_POOL_SIZE', CliSessionPool.DEFAULT_MAX_SESSIONS)
+    if not pool_size:
+        return inject.instance(CLI_SERVICE)
+    if _get_connection_manager_factory() is None:
+        logger.warning('Installed cloudshell-cli doesn\'t support pooled sessions, thread session is used')
+        return inject.instance(CLI_SERVICE)
+    pool = CliSessionPool.get_pool(device_id, logger, max_sessions=pool_size,
+                                   prewarm_count=getattr(config, 'CLI_SESSION_PREWARM_COUNT', 1),
+                                   idle_timeout=getattr(config, 'CLI_SESSION_IDLE_TIMEOUT', None),
+                                   keepalive_interval=getattr(config, 'CLI_SESSION_KEEPALIVE_INTERVAL', None),
+                                   keepalive_prompt=getattr(config, 'DEFAULT_PROMPT', None))
+    return SessionBoundCli(inject.instance(CLI_SERVICE), pool)
@@ -15,8 +15,11 @@ ETHERNET_COMMANDS_TEMPLATES = {
     'exit': CommandTemplate('exit'),
     'trunk_allow_vlan': CommandTemplate('switchport trunk allowed vlan {0}',
                                         validateVlanRange, 'Wrong vlan number(s)!'),
+    'trunk_add_vlan': CommandTemplate('switchport trunk allowed vlan add {0}',
+                                      validateVlanRange, 'Wrong vlan number(s)!'),
     'trunk_remove_vlan': CommandTemplate('switchport trunk allowed vlan remove {0}',
                                          validateVlanRange, 'Wrong vlan number!'),
+    'no_trunk_allow_vlan': CommandTemplate('no switchport trunk allowed vlan'),
     'access_allow_vlan': CommandTemplate('switchport access vlan {0}',
                                          validateVlanNumber, 'Wrong vlan number!'),
     'access_remove_vlan': CommandTemplate('no switchport access vlan {0}',
@@ -0,0 +1,118 @@
+import re
+from threading import Lock
+
+from cloudshell.cli.command_template.command_template import CommandTemplate
+from cloudshell.cli.command_template.command_template_validator import get_validate_list
+from cloudshell.networking.cisco.command_templates.cisco_interface import ENTER_INTERFACE_CONF_MODE
+from cloudshell.networking.cisco.command_templates.ethernet import ETHERNET_COMMANDS_TEMPLATES
+from cloudshell.networking.cisco.command_templates.vlan import VLAN_COMMANDS_TEMPLATES
+
+
+class CompiledCommandTemplate(object):
+    """CommandTemplate with argument regexes compiled once"""
+
+    def __init__(self, command_template):
+        """
+        :param command_template: CommandTemplate object
+        """
+
+        self.command_template = command_template
+        self._validators = []
+        for validator in command_template.get_re_string_list():
+            if hasattr(validator, '__call__'):
+                self._validators.append(validator)
+            else:
+                self._validators.append(re.compile(validator).match)
+
+    def render(self, arguments):
+        """Validate arguments and build command, same validation as get_validate_list does
+
+        :param arguments: list of template arguments
+        :return: command string
+        """
+
+        if len(arguments) != len(self._validators):
+            raise Exception('get_validate_list:', self.command_template.get_error_by_index(-1))
+        for index, argument in enumerate(arguments):
+            if not self._validators[index](argument):
+                raise Exception('get_validate_list:', self.command_template.get_error_by_index(index))
+        return self.command_template.get_command(*arguments)
+
+
+class CommandTemplateRegistry(object):
+    """Command templates compiled once, rendered commands are memoized by template name and arguments,
+    so repeated commands aren't validated again.
+    """
+
+    MAX_CACHED_COMMANDS = 10000
+
+    def __init__(self, *templates_maps):
+        """
+        :param templates_maps: dicts {template name: CommandTemplate object}
+        """
+
+        self._templates = {}
+        self._commands = {}
+        self._lock = Lock()
+        for templates in templates_maps:
+            self.add_templates(templates)
+
+    def add_templates(self, templates):
+        """Compile and register templates
+
+        :param templates: dict {template name: CommandTemplate object}
+        """
+
+        compiled_templates = dict((name, CompiledCommandTemplate(command_template))
+                                  for name, command_template in templates.items())
+        with self._lock:
+            self._templates.update(compiled_templates)
+            self._commands.clear()
+
+    def __contains__(self, name):
+        return name in self._templates
+
+    def render(self, name, arguments):
+        """Build command from registered template
+
+        :param name: template name, i.e. 'configure_interface'
+        :param arguments: template argument or list of arguments
+        :return: command string
+        """
+
+        if name not in self._templates:
+            raise Exception('get_commands_list: ', 'Command template \'{0}\' is not registered'.format(name))
+        if not isinstance(arguments, list):
+            arguments = [arguments]
+        key = (name, tuple(arguments))
+        try:
+            return self._commands[key]
+        except KeyError:
+            pass
+        except TypeError:
+            return self._templates[name].render(arguments)
+        command = self._templates[name].render(arguments)
+        with self._lock:
+            if len(self._commands) >= self.MAX_CACHED_COMMANDS:
+                self._commands.clear()
+            self._commands[key] = command
+        return command
+
+    def get_commands_list(self, command_map):
+        """Generate list of commands, same as get_commands_list of command template service does
+
+        :param command_map: dict {template name or CommandTemplate object: arguments}
+        :return: list of commands
+        """
+
+        commands_list = []
+        for name, arguments in command_map.items():
+            if isinstance(name, CommandTemplate):
+                commands_list.append(get_validate_list(name, arguments))
+            else:
+                commands_list.append(self.render(name, arguments))
+        return commands_list
+
+
+VLAN_CONFIGURATION_TEMPLATES = CommandTemplateRegistry(ETHERNET_COMMANDS_TEMPLATES, VLAN_COMMANDS_TEMPLATES,
+                                                       ENTER_INTERFACE_CONF_MODE)
@@ -0,0 +1,147 @@
+import getpass
+import json
+import os
+import pickle
+import stat
+import tempfile
+
+
+def _get_user_name():
+    try:
+        return getpass.getuser()
+    except Exception:
+        return str(os.getuid())
+
+
+LOCAL_STORAGE_FOLDER = os.path.join(tempfile.gettempdir(), 'cloudshell-networking-cisco-{0}'.format(
+    _get_user_name()))
+
+
+def get_local_storage_path(file_name, storage_folder=None):
+    """Get full path to the file in driver's local storage folder, create the folder if needed.
+    Folder is created accessible only by the current user, as stored autoload state is unpickled,
+    folder which can be modified by other users isn't used.
+
+    :param file_name: file name, i.e. 'snmp_capabilities.json'
+    :param storage_folder: optional custom storage folder
+    :return: full file path
+    :rtype: str
+    """
+
+    storage_folder = storage_folder or LOCAL_STORAGE_FOLDER
+    if not os.path.isdir(storage_folder):
+        try:
+            os.makedirs(storage_folder, 0o700)
+        except OSError:
+            if not os.path.isdir(storage_folder):
+                raise
+    if not _is_private(storage_folder):
+        raise Exception('LocalStorage', 'Storage folder {0} is not private to the current user, '
+                                        'it\'s not used'.format(storage_folder))
+    return os.path.join(storage_folder, file_name)
+
+
+def _is_private(path):
+    """Check that file or folder is owned by the current user and can't be modified by others.
+    Always True on Windows, where temp folder is located in user's profile.
+
+    :param path: full path
+    """
+
+    if os.name == 'nt':
+        return True
+    path_stat = os.lstat(path)
+    return not stat.S_ISLNK(path_stat.st_mode) and path_stat.st_uid == os.getuid() and \
+        not path_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def load_json(file_path, default=None):
+    """Read json data from file, return default value if file doesn't exist or is broken
+
+    :param file_path: full file path
+    :param default: value to return if file cannot be read
+    """
+
+    if not os.path.isfile(file_path):
+        return default
+    try:
+        with open(file_path, 'r') as json_file:
+            return json.load(json_file)
+    except (IOError, ValueError):
+        return default
+
+
+def save_json(file_path, data):
+    """Save data to json file, file is replaced only after data was completely written
+
+    :param file_path: full file path
+    :param data: json serializable data
+    """
+
+    _save_file(file_path, 'w', lambda json_file: json.dump(data, json_file, indent=2, sort_keys=True))
+
+
+def load_pickle(file_path, default=None):
+    """Read pickled data from file, return default value if file doesn't exist, is broken
+    or isn't private to the current user
+
+    :param file_path: full file path
+    :param default: value to return if file cannot be read
+    """
+
+    if not os.path.isfile(file_path) or not _is_private(file_path) or not _is_private(os.path.dirname(file_path)):
+        return default
+    try:
+        with open(file_path, 'rb') as pickle_file:
+            return pickle.load(pickle_file)
+    except Exception:
+        return default
+
+
+def save_pickle(file_path, data):
+    """Pickle data to file, file is replaced only after data was completely written
+
+    :param file_path: full file path
+    :param data: picklable data
+    """
+
+    _save_file(file_path, 'wb', lambda pickle_file: pickle.dump(data, pickle_file, pickle.HIGHEST_PROTOCOL))
+
+
+def remove_file(file_path):
+    """Remove file if exists
+
+    :param file_path: full file path
+    """
+
+    if os.path.isfile(file_path):
+        os.remove(file_path)
+
+
+def _save_file(file_path, mode, write):
+    """Write data to unique temp file next to the file and replace the file with it,
+    so threads saving the same file never write to the same temp file
+
+    :param file_path: full file path
+    :param mode: file open mode, 'w' or 'wb'
+    :param write: function receiving opened temp file
+    """
+
+    temp_file, temp_file_path = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(file_path) + '.',
+                                                 dir=os.path.dirname(file_path))
+    try:
+        with os.fdopen(temp_file, mode) as opened_file:
+            write(opened_file)
+        _replace_file(temp_file_path, file_path)
+    except Exception:
+        remove_file(temp_file_path)
+        raise
+
+
+def _replace_file(temp_file_path, file_path):
+    if os.name == 'nt':
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+    os.rename(temp_file_path, file_path)
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from mock import MagicMock
+from cloudshell.snmp.quali_snmp import QualiMibTable
+
+ENTITY_COLUMNS = ('entPhysicalContainedIn', 'entPhysicalParentRelPos', 'entPhysicalClass', 'entPhysicalVendorType',
+                  'entPhysicalDescr', 'entPhysicalName')
+
+
+def get_entity(contained_in, parent_rel_pos, entity_class, vendor_type, name, if_index=None):
+    values = (str(contained_in), str(parent_rel_pos), "'{0}'".format(entity_class), vendor_type, name, name)
+    return dict(list(zip(ENTITY_COLUMNS, values)) + [('if_index', if_index)])
+
+
+class SnmpDeviceMock(object):
+    """Snmp handler mock, which answers ENTITY-MIB and IF-MIB requests with provided entities and interfaces"""
+
+    def __init__(self, entities, interfaces, interface_columns=None):
+        """
+        :param entities: dict{entity index: row built with get_entity}
+        :param interfaces: dict{ifIndex: ifDescr}
+        :param interface_columns: dict{IF-MIB column: dict{ifIndex: value}}
+
+        table_rows, dict{column: dict{row index: value}}, answers walks of column rows under an index prefix
+        """
+
+        self.entities = entities
+        self.interfaces = interfaces
+        self.interface_columns = interface_columns or {}
+        self.handler = MagicMock()
+        self.handler.get_table = MagicMock(side_effect=self._get_table)
+        self.handler.get_property = MagicMock(side_effect=self._get_property)
+        self.handler.get = MagicMock(side_effect=self._get)
+        self.handler.walk = MagicMock(side_effect=self._walk)
+        self.table_rows = {}
+
+    def _get_table(self, snmp_module_name, table_name):
+        result = QualiMibTable(table_name)
+        if table_name == 'ifDescr':
+            for index, name in self.interfaces.iteritems():
+                result[index] = {'suffix': str(index), 'ifDescr': name}
+        elif table_name in self.interface_columns:
+            for index, value in self.interface_columns[table_name].iteritems():
+                result[index] = {'suffix': str(index), table_name: value}
+        elif table_name in ENTITY_COLUMNS:
+            for index, entity in self.entities.iteritems():
+                result[index] = {'suffix': str(index), table_name: entity[table_name]}
+        return result
+
+    def _walk(self, oid):
+        result = QualiMibTable(oid[1])
+        index = '.'.join(str(part) for part in oid[2:])
+        if oid[1] == 'entPhysicalChildIndex':
+            for child_index, entity in sorted(self.entities.iteritems()):
+                if entity['entPhysicalContainedIn'] == index:
+                    suffix = '{0}.{1}'.format(index, child_index)
+                    result[suffix] = {'suffix': suffix, 'entPhysicalChildIndex': str(child_index)}
+        for suffix, value in self.table_rows.get(oid[1], {}).iteritems():
+            if suffix == index or suffix.startswith(index + '.'):
+                result[suffix] = {'suffix': suffix, oid[1]: value}
+        return result
+
+    def _get_property(self, snmp_module_name, property_name, index, return_type='str'):
+        if property_name == 'ifDescr':
+            return self.interfaces.get(int(index), '')
+        if property_name in self.interface_columns:
+            return self.interface_columns[property_name].get(int(index), '')
+        return self.entities.get(int(index), {}).get(property_name, '')
+
+    def _get(self, oid):
+        if oid[1] == 'entAliasMappingIdentifier':
+            return OrderedDict([(oid[1], 'IF-MIB::ifIndex.{0}'.format(self.entities[oid[2]]['if_index']))])
+        return OrderedDict([(oid[1], 'Cisco IOS Software')])
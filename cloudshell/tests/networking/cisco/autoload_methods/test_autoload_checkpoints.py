@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.networking.cisco.autoload.autoload_state import AutoloadStateStorage
+from cloudshell.networking.cisco.autoload.cisco_generic_snmp_autoload import CiscoGenericSNMPAutoload
+from cloudshell.networking.cisco.autoload.snmp_capabilities import SnmpCapabilityCache
+from cloudshell.tests.networking.cisco.autoload_methods.snmp_device_mock import SnmpDeviceMock, get_entity
+
+
+class TestCiscoAutoloadCheckpoints(TestCase):
+    def setUp(self):
+        self.storage_folder = tempfile.mkdtemp()
+        self.device = SnmpDeviceMock(
+            entities={1: get_entity(0, -1, 'chassis', 'cevChassisCat3750', 'Chassis'),
+                      2: get_entity(1, 1, 'port', 'cevPortGe', 'GigabitEthernet1/0/1', 10),
+                      3: get_entity(1, 2, 'port', 'cevPortGe', 'GigabitEthernet1/0/2', 11)},
+            interfaces={10: 'GigabitEthernet1/0/1', 11: 'GigabitEthernet1/0/2'})
+        self.state_storage = AutoloadStateStorage('switch', storage_folder=self.storage_folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_folder)
+
+    def _get_handler(self, exhaust_after_chassis=False):
+        self.device.handler.reset_mock()
+        handler = CiscoGenericSNMPAutoload(snmp_handler=self.device.handler, logger=MagicMock(),
+                                           supported_os=['IOS'], autoload_profile='structure')
+        handler.capabilities = SnmpCapabilityCache(file_path=self.storage_folder + '/capabilities.json')
+        handler._state_storage = self.state_storage
+        if exhaust_after_chassis:
+            get_chassis_attributes = handler._get_chassis_attributes
+
+            def _get_chassis_attributes(chassis_list):
+                get_chassis_attributes(chassis_list)
+                handler.context.deadline = 0
+            handler._get_chassis_attributes = _get_chassis_attributes
+        return handler
+
+    @staticmethod
+    def _get_paths(details):
+        return sorted(resource.relative_address for resource in details.resources)
+
+    def test_exhausted_budget_returns_partial_results_and_next_run_resumes(self):
+        partial_details = self._get_handler(exhaust_after_chassis=True).discover(time_budget=600,
+                                                                                 partial_results=True)
+        self.assertEqual(self._get_paths(partial_details), ['0'])
+        self.assertEqual(self.state_storage.load_checkpoint()['context']['completed_phases'],
+                         ['tables', 'structure', 'chassis'])
+
+        details = self._get_handler().discover(time_budget=600)
+        self.assertEqual(self._get_paths(details), ['0', '0/1', '0/2'])
+        walked_tables = [call[0][1] for call in self.device.handler.get_table.call_args_list]
+        self.assertNotIn('entPhysicalParentRelPos', walked_tables)
+        self.assertFalse(os.path.exists(self.state_storage.checkpoint_file_path))
+
+    def test_exhausted_budget_raises_without_partial_results(self):
+        handler = self._get_handler(exhaust_after_chassis=True)
+        self.assertRaises(Exception, handler.discover, time_budget=600)
+        self.assertIsNotNone(self.state_storage.load_checkpoint())
+
+    def test_checkpoints_are_not_used_without_budget(self):
+        self._get_handler(exhaust_after_chassis=True).discover(time_budget=600, partial_results=True)
+        details = self._get_handler().discover()
+        self.assertEqual(self._get_paths(details), ['0', '0/1', '0/2'])
+        walked_tables = [call[0][1] for call in self.device.handler.get_table.call_args_list]
+        self.assertIn('entPhysicalParentRelPos', walked_tables)
+
+    def test_checkpoint_modifiable_by_other_users_is_not_loaded(self):
+        if os.name == 'nt':
+            return
+        self.state_storage.save_checkpoint({'time': 0})
+        self.assertIsNotNone(self.state_storage.load_checkpoint())
+        os.chmod(self.state_storage.checkpoint_file_path, 0o666)
+        self.assertIsNone(self.state_storage.load_checkpoint())
+
+        os.chmod(self.state_storage.checkpoint_file_path, 0o600)
+        os.chmod(self.storage_folder, 0o777)
+        self.assertRaisesRegexp(Exception, 'not private', self.state_storage.load_checkpoint)
+
+    def test_checkpoint_is_saved_by_parallel_threads(self):
+        errors = []
+
+        def save_checkpoint(index):
+            try:
+                for attempt in range(20):
+                    self.state_storage.save_checkpoint({'time': index, 'data': range(1000)})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=save_checkpoint, args=(index,)) for index in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.state_storage.load_checkpoint()['data'], range(1000))
+        self.assertEqual([file_name for file_name in os.listdir(self.storage_folder) if file_name.endswith('.tmp')],
+                         [])
@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+import time
+from threading import Thread
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.networking.cisco.autoload.autoload_state import AutoloadStateStorage
+from cloudshell.networking.cisco.autoload.cisco_generic_snmp_autoload import CiscoGenericSNMPAutoload
+from cloudshell.networking.cisco.autoload.snmp_capabilities import SnmpCapabilityCache
+from cloudshell.tests.networking.cisco.autoload_methods.snmp_device_mock import SnmpDeviceMock, get_entity
+
+
+class StatefulSnmpHandler(object):
+    """Snmp handler, which keeps response of the last request on the instance, like QualiSnmp does"""
+
+    def __init__(self, device):
+        self._device = device
+        self.logger = MagicMock()
+        self.var_binds = None
+
+    def _command(self, request, *args):
+        self.var_binds = request(*args)
+        time.sleep(0.001)
+        return self.var_binds
+
+    def get_table(self, snmp_module_name, table_name):
+        return self._command(self._device.handler.get_table, snmp_module_name, table_name)
+
+    def get_property(self, snmp_module_name, property_name, index, return_type='str'):
+        return self._command(self._device.handler.get_property, snmp_module_name, property_name, index)
+
+    def get(self, oid):
+        return self._command(self._device.handler.get, oid)
+
+    def load_mib(self, mib_list):
+        pass
+
+    def update_mib_sources(self, mib_folder_path):
+        pass
+
+
+class TestCiscoAutoloadContext(TestCase):
+    def setUp(self):
+        self.storage_folder = tempfile.mkdtemp()
+        self.device = SnmpDeviceMock(
+            entities={1: get_entity(0, -1, 'chassis', 'cevChassisCat3750', 'Chassis'),
+                      2: get_entity(1, 1, 'port', 'cevPortGe', 'GigabitEthernet1/0/1', 10),
+                      3: get_entity(1, 2, 'port', 'cevPortGe', 'GigabitEthernet1/0/2', 11)},
+            interfaces={10: 'GigabitEthernet1/0/1', 11: 'GigabitEthernet1/0/2'})
+        self.handler = CiscoGenericSNMPAutoload(snmp_handler=self.device.handler, logger=MagicMock(),
+                                                supported_os=['IOS'], autoload_profile='structure')
+        self.handler.capabilities = SnmpCapabilityCache(file_path=self.storage_folder + '/capabilities.json')
+        self.handler._state_storage = AutoloadStateStorage('switch', storage_folder=self.storage_folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_folder)
+
+    @staticmethod
+    def _get_paths(details):
+        return sorted(resource.relative_address for resource in details.resources)
+
+    def test_repeated_discovery_does_not_accumulate_results(self):
+        first_details = self.handler.discover()
+        second_details = self.handler.discover()
+        self.assertEqual(self._get_paths(first_details), ['0', '0/1', '0/2'])
+        self.assertEqual(self._get_paths(second_details), ['0', '0/1', '0/2'])
+        self.assertEqual(self.handler.port_list, [2, 3])
+
+    def test_parallel_discoveries_use_separate_contexts(self):
+        results = []
+        threads = [Thread(target=lambda: results.append(self.handler.discover())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([self._get_paths(details) for details in results], [['0', '0/1', '0/2']] * 4)
+
+    def test_parallel_discoveries_share_stateful_snmp_handler(self):
+        self.handler._snmp_handler = StatefulSnmpHandler(self.device)
+        results = []
+        threads = [Thread(target=lambda: results.append(self.handler.discover())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([self._get_paths(details) for details in results], [['0', '0/1', '0/2']] * 4)
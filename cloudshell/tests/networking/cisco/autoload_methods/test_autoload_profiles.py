@@ -0,0 +1,53 @@
+from unittest import TestCase
+from mock import MagicMock, patch
+from cloudshell.snmp.quali_snmp import QualiMibTable
+from cloudshell.networking.cisco.autoload.cisco_generic_snmp_autoload import CiscoGenericSNMPAutoload
+from cloudshell.networking.cisco.autoload.autoload_profiles import AUTOLOAD_PROFILES, DEFAULT_AUTOLOAD_PROFILE
+
+
+class TestCiscoAutoloadProfiles(TestCase):
+    def _get_handler(self, autoload_profile):
+        self.snmp = MagicMock()
+        self.snmp.get_table = MagicMock(side_effect=lambda mib, table: QualiMibTable(table))
+        self.logger = MagicMock()
+        handler = CiscoGenericSNMPAutoload(snmp_handler=self.snmp, logger=self.logger, supported_os=['IOS'],
+                                           autoload_profile=autoload_profile)
+        entity_table = QualiMibTable('entPhysicalTable')
+        entity_table[1] = {'entPhysicalClass': 'chassis'}
+        handler._get_entity_table = MagicMock(return_value=entity_table)
+        return handler
+
+    def _get_loaded_tables(self):
+        return [call[0][1] for call in self.snmp.get_table.call_args_list]
+
+    def test_structure_profile_skips_optional_tables(self):
+        handler = self._get_handler('structure')
+        handler._load_snmp_tables()
+        self.assertEqual(self._get_loaded_tables(), ['ifDescr'])
+        self.assertEqual(len(handler.cdp_table), 0)
+        self.assertEqual(len(handler.port_channel_ports), 0)
+
+    def test_standard_profile_skips_adjacency_and_duplex_tables(self):
+        handler = self._get_handler('standard')
+        handler._load_snmp_tables()
+        loaded_tables = self._get_loaded_tables()
+        self.assertIn('ipAddrTable', loaded_tables)
+        self.assertIn('dot3adAggPortAttachedAggID', loaded_tables)
+        self.assertNotIn('cdpCacheTable', loaded_tables)
+        self.assertNotIn('lldpRemTable', loaded_tables)
+        self.assertNotIn('dot3StatsIndex', loaded_tables)
+
+    def test_full_profile_loads_all_tables(self):
+        handler = self._get_handler('full')
+        handler._load_snmp_tables()
+        self.assertEqual(len(self._get_loaded_tables()), 9)
+
+    def test_unknown_profile_raises_exception(self):
+        handler = self._get_handler('fast')
+        self.assertRaises(Exception, handler._load_snmp_tables)
+
+    @patch('cloudshell.networking.cisco.autoload.cisco_generic_snmp_autoload.inject.instance',
+           MagicMock(side_effect=Exception('Injector is not configured')))
+    def test_default_profile_is_used_without_config(self):
+        handler = self._get_handler(None)
+        self.assertEqual(handler.profile_features, AUTOLOAD_PROFILES[DEFAULT_AUTOLOAD_PROFILE])
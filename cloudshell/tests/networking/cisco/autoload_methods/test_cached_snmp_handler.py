@@ -0,0 +1,153 @@
+from unittest import TestCase
+from collections import OrderedDict
+from mock import MagicMock
+from pysnmp.proto import errind
+from cloudshell.snmp.quali_snmp import QualiMibTable, QualiSnmp
+from cloudshell.networking.cisco.autoload.cached_snmp_handler import CachedSnmpHandler
+from cloudshell.networking.cisco.autoload.snmp_transport_policy import AdaptiveSnmpTransportPolicy
+
+
+class TransportTarget(object):
+    def __init__(self, transport_address, timeout=1, retries=5, tagList=''):
+        self.transportAddr = transport_address
+        self.timeout = timeout
+        self.retries = retries
+        self.tagList = tagList
+
+
+class TestCachedSnmpHandler(TestCase):
+    def _get_handler(self):
+        self.snmp = MagicMock()
+        self.snmp.get = MagicMock(side_effect=lambda *oids: OrderedDict([(oids[0][1], 'value of ' + oids[0][1])]))
+        self.snmp.get_property = MagicMock(return_value='property value ')
+        return CachedSnmpHandler(self.snmp)
+
+    def test_get_property_sends_request_once(self):
+        handler = self._get_handler()
+        self.assertEqual(handler.get_property('ENTITY-MIB', 'entPhysicalVendorType', 5), 'property value ')
+        self.assertEqual(handler.get_property('ENTITY-MIB', 'entPhysicalVendorType', '5'), 'property value')
+        self.assertEqual(self.snmp.get_property.call_count, 1)
+        self.assertEqual(handler.get_statistics(), {'hits': 1, 'misses': 1})
+
+    def test_get_serves_following_get_property(self):
+        handler = self._get_handler()
+        self.assertEqual(handler.get(('SNMPv2-MIB', 'sysDescr'))['sysDescr'], 'value of sysDescr')
+        self.assertEqual(handler.get_property('SNMPv2-MIB', 'sysDescr', 0), 'value of sysDescr')
+        self.assertEqual(handler.get(('SNMPv2-MIB', 'sysDescr', 0))['sysDescr'], 'value of sysDescr')
+        self.assertEqual(self.snmp.get.call_count, 1)
+        self.snmp.get_property.assert_not_called()
+
+    def test_table_walk_serves_point_requests(self):
+        handler = self._get_handler()
+        table = QualiMibTable('entPhysicalTable')
+        table[5] = {'suffix': '5', 'entPhysicalVendorType': 'cevContainerSlot'}
+        self.snmp.get_table = MagicMock(return_value=table)
+        handler.get_table('ENTITY-MIB', 'entPhysicalTable')
+        handler.get_table('ENTITY-MIB', 'entPhysicalTable')
+        self.assertEqual(handler.get_property('ENTITY-MIB', 'entPhysicalVendorType', 5), 'cevContainerSlot')
+        self.assertEqual(self.snmp.get_table.call_count, 1)
+        self.snmp.get_property.assert_not_called()
+
+    def test_int_return_type(self):
+        handler = self._get_handler()
+        self.snmp.get_property = MagicMock(return_value='1500')
+        self.assertEqual(handler.get_property('IF-MIB', 'ifMtu', 1, 'int'), 1500)
+        self.snmp.get_property = MagicMock(return_value='')
+        self.assertEqual(handler.get_property('IF-MIB', 'ifMtu', 2, 'int'), 0)
+
+    def test_load_mib_drops_mib_rendered_values(self):
+        handler = self._get_handler()
+        self.snmp.get_property = MagicMock(side_effect=['SNMPv2-SMI::enterprises.9.1.359', 'Switch',
+                                                        'CISCO-PRODUCTS-MIB::cat295024'])
+        handler.get_property('SNMPv2-MIB', 'sysObjectID', 0)
+        handler.get_property('SNMPv2-MIB', 'sysName', 0)
+        handler.load_mib(['CISCO-PRODUCTS-MIB'])
+        handler.load_mib(['CISCO-PRODUCTS-MIB'])
+        self.assertEqual(handler.get_property('SNMPv2-MIB', 'sysObjectID', 0), 'CISCO-PRODUCTS-MIB::cat295024')
+        self.assertEqual(handler.get_property('SNMPv2-MIB', 'sysName', 0), 'Switch')
+        self.assertEqual(self.snmp.load_mib.call_count, 1)
+        self.assertEqual(self.snmp.get_property.call_count, 3)
+
+    def _get_packed_get_handler(self, responses):
+        self.snmp = QualiSnmp.__new__(QualiSnmp)
+        self.snmp._logger = MagicMock()
+        self.snmp.security = MagicMock(mpModel=1)
+        self.snmp.target = MagicMock(timeout=AdaptiveSnmpTransportPolicy.DEFAULT_TIMEOUT)
+        self.snmp.cmd_gen = MagicMock()
+        self.snmp.cmd_gen.getCmd = MagicMock(side_effect=responses)
+        self.snmp.get_property = MagicMock(return_value='')
+        policy = AdaptiveSnmpTransportPolicy()
+        policy.max_varbinds = 4
+        return CachedSnmpHandler(self.snmp, transport_policy=policy)
+
+    @staticmethod
+    def _get_response(*values):
+        return None, 0, 0, [(MagicMock(), MagicMock(prettyPrint=MagicMock(return_value=value))) for value in values]
+
+    def test_prefetch_packs_properties_into_get_requests(self):
+        handler = self._get_packed_get_handler([self._get_response('WS-C6509', 'SN1', 'PWR-1', 'SN2'),
+                                                self._get_response('No Such Instance currently exists', 'SN3')])
+        handler.prefetch('ENTITY-MIB', ['entPhysicalModelName', 'entPhysicalSerialNum'], [1, 10, 11])
+        self.assertEqual(self.snmp.cmd_gen.getCmd.call_count, 2)
+        self.assertEqual(len(self.snmp.cmd_gen.getCmd.call_args_list[0][0]), 2 + 4)
+        self.assertEqual(handler.get_property('ENTITY-MIB', 'entPhysicalSerialNum', 10), 'SN2')
+        self.assertEqual(handler.get_property('ENTITY-MIB', 'entPhysicalModelName', 11), '')
+        self.assertEqual(handler.get_property('ENTITY-MIB', 'entPhysicalSerialNum', 11), 'SN3')
+        self.snmp.get_property.assert_not_called()
+
+    def test_prefetch_shrinks_pdu_on_too_big(self):
+        too_big = (None, MagicMock(prettyPrint=MagicMock(return_value='tooBig')), 0, [])
+        handler = self._get_packed_get_handler([too_big, self._get_response('SN1', 'SN2'),
+                                                self._get_response('SN3')])
+        handler.prefetch('ENTITY-MIB', ['entPhysicalSerialNum'], [1, 2, 3])
+        self.assertEqual([len(call[0]) - 2 for call in self.snmp.cmd_gen.getCmd.call_args_list], [3, 2, 1])
+        self.assertEqual(handler.get_property('ENTITY-MIB', 'entPhysicalSerialNum', 3), 'SN3')
+        self.snmp.get_property.assert_not_called()
+
+    def test_timed_out_request_is_retried_only_by_policy(self):
+        timeout = (errind.requestTimedOut, 0, 0, [])
+        handler = self._get_packed_get_handler([timeout, self._get_response('SN1')])
+        self.snmp.target = TransportTarget(('10.0.0.1', 161), timeout=AdaptiveSnmpTransportPolicy.DEFAULT_TIMEOUT)
+        handler.prefetch('ENTITY-MIB', ['entPhysicalSerialNum'], [1])
+
+        self.assertEqual(handler.get_property('ENTITY-MIB', 'entPhysicalSerialNum', 1), 'SN1')
+        targets = [call[0][1] for call in self.snmp.cmd_gen.getCmd.call_args_list]
+        self.assertEqual([target.retries for target in targets], [0, 0])
+        self.assertEqual([target.timeout for target in targets], [AdaptiveSnmpTransportPolicy.DEFAULT_TIMEOUT,
+                                                                  AdaptiveSnmpTransportPolicy.DEFAULT_TIMEOUT * 2])
+
+    def test_double_index_is_not_collapsed(self):
+        self.assertEqual(CachedSnmpHandler._get_table_index('3.1'), 3.1)
+        self.assertEqual(CachedSnmpHandler._get_table_index('3.10'), '3.10')
+
+    def test_plain_walk_indexes_rows_like_bulk_walk(self):
+        self.snmp = QualiSnmp.__new__(QualiSnmp)
+        self.snmp._logger = MagicMock()
+        self.snmp.security = MagicMock(mpModel=0)
+        self.snmp.target = MagicMock()
+        self.snmp.mib_viewer = MagicMock()
+        self.snmp.mib_viewer.getNodeLocation = MagicMock(side_effect=lambda name: ('CISCO-STACK-MIB', 'portName',
+                                                                                   name))
+        self.snmp.cmd_gen = MagicMock()
+        self.snmp.cmd_gen.nextCmd = MagicMock(return_value=(
+            None, 0, 0, [[(suffix, MagicMock(prettyPrint=MagicMock(return_value='port ' + suffix)))]
+                         for suffix in ('1.1', '1.10', '2')]))
+        handler = CachedSnmpHandler(self.snmp, transport_policy=AdaptiveSnmpTransportPolicy())
+
+        table = handler.get_table('CISCO-STACK-MIB', 'portName')
+        self.assertEqual(sorted(table.keys()), sorted([CachedSnmpHandler._get_table_index(suffix)
+                                                       for suffix in ('1.1', '1.10', '2')]))
+        self.assertEqual(table['1.10']['portName'], 'port 1.10')
+        self.assertEqual(table[1.1]['portName'], 'port 1.1')
+
+    def test_table_rows_are_walked_under_index_and_cached(self):
+        handler = self._get_handler()
+        self.snmp.walk = MagicMock(return_value=QualiMibTable('entPhysicalChildIndex', {
+            '5.7': {'suffix': '5.7', 'entPhysicalChildIndex': '7'}}))
+
+        rows = handler.get_table_rows('ENTITY-MIB', 'entPhysicalChildIndex', 5)
+        self.assertEqual(rows['5.7']['entPhysicalChildIndex'], '7')
+        self.assertIs(handler.get_table_rows('ENTITY-MIB', 'entPhysicalChildIndex', 5), rows)
+        self.snmp.walk.assert_called_once_with(('ENTITY-MIB', 'entPhysicalChildIndex', '5'))
+        self.assertEqual(handler.get_property('ENTITY-MIB', 'entPhysicalChildIndex', '5.7'), '7')
+        self.snmp.get_property.assert_not_called()
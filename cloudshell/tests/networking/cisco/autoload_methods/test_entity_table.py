@@ -0,0 +1,40 @@
+import pickle
+from unittest import TestCase
+from cloudshell.networking.cisco.autoload.entity_table import EntityTable
+
+
+class TestEntityTable(TestCase):
+    def _get_table(self):
+        table = EntityTable()
+        table[1] = {'entPhysicalContainedIn': '0', 'entPhysicalParentRelPos': '-1', 'entPhysicalClass': 'chassis'}
+        table[2] = {'entPhysicalContainedIn': '1', 'entPhysicalParentRelPos': '10', 'entPhysicalClass': 'container'}
+        table[3] = {'entPhysicalContainedIn': '1', 'entPhysicalParentRelPos': '2', 'entPhysicalClass': 'container'}
+        table[4] = {'entPhysicalContainedIn': '3', 'entPhysicalParentRelPos': '1', 'entPhysicalClass': 'module'}
+        return table
+
+    def test_filter_returns_sorted_view_of_rows(self):
+        table = self._get_table()
+        containers = table.filter_by_column('Class', 'container').sort_by_column('ParentRelPos')
+        self.assertEqual(containers.keys(), [3, 2])
+        self.assertIs(containers[3], table[3])
+        self.assertEqual(table.get_children(1).keys(), [3, 2])
+        self.assertEqual(table.filter_by_column('ContainedIn', 1, 3).keys(), [2, 3, 4])
+
+    def test_indexes_are_invalidated_on_change(self):
+        table = self._get_table()
+        self.assertEqual(table.get_children(3).keys(), [4])
+        table.set_value(4, 'entPhysicalContainedIn', 2)
+        self.assertEqual(table.get_children(3).keys(), [])
+        self.assertEqual(table.get_children(2).keys(), [4])
+        table.pop(4)
+        self.assertEqual(table.get_children(2).keys(), [])
+        table.update({5: {'entPhysicalContainedIn': '2', 'entPhysicalParentRelPos': '1'}})
+        self.assertEqual(table.get_children(2).keys(), [5])
+
+    def test_table_can_be_pickled(self):
+        table = self._get_table()
+        table.get_children(1)
+        restored_table = pickle.loads(pickle.dumps(table, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(restored_table.get_children(1).keys(), [3, 2])
+        restored_table.set_value(4, 'entPhysicalContainedIn', '1')
+        self.assertEqual(restored_table.get_children(1).keys(), [4, 3, 2])
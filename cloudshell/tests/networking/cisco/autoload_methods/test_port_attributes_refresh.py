@@ -0,0 +1,54 @@
+import shutil
+import tempfile
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.networking.cisco.autoload.autoload_state import AutoloadStateStorage
+from cloudshell.networking.cisco.autoload.cisco_generic_snmp_autoload import CiscoGenericSNMPAutoload
+from cloudshell.networking.cisco.autoload.snmp_capabilities import SnmpCapabilityCache
+from cloudshell.tests.networking.cisco.autoload_methods.snmp_device_mock import SnmpDeviceMock, get_entity
+
+
+class TestCiscoAutoloadPortAttributesRefresh(TestCase):
+    def setUp(self):
+        self.storage_folder = tempfile.mkdtemp()
+        self.device = SnmpDeviceMock(
+            entities={1: get_entity(0, -1, 'chassis', 'cevChassisCat3750', 'Chassis'),
+                      2: get_entity(1, 1, 'port', 'cevPortGe', 'GigabitEthernet1/0/1', 10),
+                      3: get_entity(1, 2, 'port', 'cevPortGe', 'GigabitEthernet1/0/2', 11)},
+            interfaces={10: 'GigabitEthernet1/0/1', 11: 'GigabitEthernet1/0/2'},
+            interface_columns={'ifAlias': {10: 'uplink', 11: ''}, 'ifMtu': {10: '1500', 11: '1500'}})
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_folder)
+
+    def _get_handler(self):
+        self.device.handler.reset_mock()
+        handler = CiscoGenericSNMPAutoload(snmp_handler=self.device.handler, logger=MagicMock(),
+                                           supported_os=['IOS'], autoload_profile='standard')
+        handler.capabilities = SnmpCapabilityCache(file_path=self.storage_folder + '/capabilities.json')
+        handler._state_storage = AutoloadStateStorage('switch', storage_folder=self.storage_folder)
+        return handler
+
+    @staticmethod
+    def _get_attributes(details, attribute_name):
+        return {attribute.relative_address: attribute.attribute_value for attribute in details.attributes
+                if attribute.attribute_name == attribute_name}
+
+    def test_refresh_reads_changed_attributes_without_entity_table(self):
+        self._get_handler().discover()
+        self.device.interface_columns['ifAlias'][11] = 'server'
+        self.device.interface_columns['ifMtu'][10] = '9000'
+
+        details = self._get_handler().refresh_port_attributes()
+
+        self.assertEqual(details.resources, [])
+        self.assertEqual(self._get_attributes(details, 'Port Description'), {'0/1': 'uplink', '0/2': 'server'})
+        self.assertEqual(self._get_attributes(details, 'MTU'), {'0/1': 9000, '0/2': 1500})
+        walked_tables = [call[0][1] for call in self.device.handler.get_table.call_args_list]
+        self.assertFalse([table for table in walked_tables if table.startswith('entPhysical')])
+        requested_properties = [call[0][1] for call in self.device.handler.get_property.call_args_list]
+        self.assertNotIn('ifAlias', requested_properties)
+        self.assertNotIn('ifMtu', requested_properties)
+
+    def test_refresh_requires_full_autoload(self):
+        self.assertRaises(Exception, self._get_handler().refresh_port_attributes)
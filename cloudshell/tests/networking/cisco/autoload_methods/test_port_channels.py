@@ -0,0 +1,34 @@
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.snmp.quali_snmp import QualiMibTable
+from cloudshell.networking.cisco.autoload.cisco_generic_snmp_autoload import CiscoGenericSNMPAutoload
+
+
+class TestCiscoAutoloadPortChannels(TestCase):
+    def _get_handler(self):
+        self.snmp = MagicMock()
+        self.logger = MagicMock()
+        handler = CiscoGenericSNMPAutoload(snmp_handler=self.snmp, logger=self.logger, supported_os=['IOS'],
+                                           autoload_profile='full')
+        handler.if_table = QualiMibTable('ifDescr')
+        handler.if_table[1] = {'ifDescr': 'GigabitEthernet1/0/1'}
+        handler.if_table[2] = {'ifDescr': 'GigabitEthernet1/0/2'}
+        handler.if_table[3] = {'ifDescr': 'GigabitEthernet1/0/3'}
+        handler.if_table[5001] = {'ifDescr': 'Port-channel1'}
+        handler.if_table[5010] = {'ifDescr': 'Port-channel10'}
+        handler.port_channel_ports = QualiMibTable('dot3adAggPortAttachedAggID')
+        handler.port_channel_ports[1] = {'dot3adAggPortAttachedAggID': '5001'}
+        handler.port_channel_ports[2] = {'dot3adAggPortAttachedAggID': '5010'}
+        handler.port_channel_ports[3] = {'dot3adAggPortAttachedAggID': '0'}
+        handler.port_channel_members = handler._get_port_channel_members_map()
+        return handler
+
+    def test_members_map_is_inverted_attachment_table(self):
+        handler = self._get_handler()
+        self.assertEqual(handler.port_channel_members, {5001: [1], 5010: [2]})
+
+    def test_associated_ports_match_exact_aggregator(self):
+        handler = self._get_handler()
+        self.assertEqual(handler._get_associated_ports(5001), 'GigabitEthernet1-0-1;')
+        self.assertEqual(handler._get_associated_ports(5010), 'GigabitEthernet1-0-2;')
+        self.assertEqual(handler._get_associated_ports(5002), '')
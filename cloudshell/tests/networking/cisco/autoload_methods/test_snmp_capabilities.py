@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.snmp.quali_snmp import QualiMibTable
+from cloudshell.networking.cisco.autoload.cached_snmp_handler import CachedSnmpHandler
+from cloudshell.networking.cisco.autoload.snmp_capabilities import SnmpCapabilityCache
+
+PLATFORM_ID = 'SNMPv2-SMI::enterprises.9.1.359'
+
+
+class TestSnmpCapabilityCache(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.folder, 'snmp_capabilities.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _get_handler(self, capabilities):
+        self.snmp = MagicMock()
+        self.snmp.get_table = MagicMock(side_effect=lambda mib, table: QualiMibTable(table))
+        handler = CachedSnmpHandler(self.snmp, capabilities=capabilities)
+        handler.set_platform(PLATFORM_ID)
+        return handler
+
+    def test_unsupported_objects_are_persisted(self):
+        capabilities = SnmpCapabilityCache(self.file_path)
+        capabilities.set_unsupported(PLATFORM_ID, 'LLDP-MIB', 'lldpRemTable')
+        capabilities.save()
+        self.assertFalse(SnmpCapabilityCache(self.file_path).is_supported(PLATFORM_ID, 'LLDP-MIB', 'lldpRemTable'))
+        self.assertTrue(SnmpCapabilityCache(self.file_path).is_supported('other', 'LLDP-MIB', 'lldpRemTable'))
+
+    def test_unsupported_objects_are_reprobed(self):
+        capabilities = SnmpCapabilityCache(self.file_path, reprobe_interval=1)
+        capabilities.set_unsupported(PLATFORM_ID, 'LLDP-MIB', 'lldpRemTable')
+        capabilities.platforms[PLATFORM_ID]['LLDP-MIB::lldpRemTable'] -= 2
+        self.assertTrue(capabilities.is_supported(PLATFORM_ID, 'LLDP-MIB', 'lldpRemTable'))
+
+    def test_saved_unsupported_optional_table_is_skipped(self):
+        capabilities = SnmpCapabilityCache(self.file_path)
+        capabilities.set_unsupported(PLATFORM_ID, 'LLDP-MIB', 'lldpRemTable')
+        capabilities.save()
+        handler = self._get_handler(SnmpCapabilityCache(self.file_path))
+        handler.get_optional_table('LLDP-MIB', 'lldpRemTable')
+        handler.get_table('IF-MIB', 'ifDescr')
+        self.snmp.get_table.assert_called_once_with('IF-MIB', 'ifDescr')
+
+    def test_empty_optional_table_is_not_recorded_as_unsupported(self):
+        capabilities = SnmpCapabilityCache(self.file_path)
+        self._get_handler(capabilities).get_optional_table('CISCO-CDP-MIB', 'cdpCacheTable')
+        capabilities.save()
+        self.assertTrue(SnmpCapabilityCache(self.file_path).is_supported(PLATFORM_ID, 'CISCO-CDP-MIB',
+                                                                         'cdpCacheTable'))
+        self._get_handler(SnmpCapabilityCache(self.file_path)).get_optional_table('CISCO-CDP-MIB', 'cdpCacheTable')
+        self.snmp.get_table.assert_called_once_with('CISCO-CDP-MIB', 'cdpCacheTable')
+
+    def test_no_such_object_response_is_recorded(self):
+        handler = self._get_handler(SnmpCapabilityCache(self.file_path))
+        self.snmp.get_property = MagicMock(return_value='No Such Object currently exists at this OID')
+        handler.get_property('MAU-MIB', 'ifMauAutoNegAdminStatus', '1.1')
+        self.assertEqual(handler.get_property('MAU-MIB', 'ifMauAutoNegAdminStatus', '2.1'), '')
+        self.assertEqual(self.snmp.get_property.call_count, 1)
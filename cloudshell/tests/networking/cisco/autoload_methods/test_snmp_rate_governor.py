@@ -0,0 +1,58 @@
+from unittest import TestCase
+from mock import MagicMock
+from pysnmp.error import PySnmpError
+from pysnmp.proto import errind
+from cloudshell.snmp.quali_snmp import QualiSnmp
+from cloudshell.networking.cisco.autoload.cached_snmp_handler import CachedSnmpHandler
+from cloudshell.networking.cisco.autoload.snmp_rate_governor import SnmpRateGovernor, TokenBucket
+
+
+class TestSnmpRateGovernor(TestCase):
+    def test_bucket_allows_burst_then_delays(self):
+        bucket = TokenBucket(10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+
+    def test_device_rate_backs_off_on_timeout_and_recovers(self):
+        governor = SnmpRateGovernor('backoff-device', device_rate=20)
+        governor.record_timeout()
+        self.assertEqual(governor.current_device_rate, 10)
+        governor.record_timeout()
+        self.assertEqual(governor.current_device_rate, 5)
+        for _ in range(20):
+            governor.record_success()
+        self.assertEqual(governor.current_device_rate, 20)
+
+    def test_device_limit_is_shared_by_governors_of_same_device(self):
+        first_governor = SnmpRateGovernor('shared-device', device_rate=20)
+        second_governor = SnmpRateGovernor('shared-device', device_rate=20)
+        first_governor.record_timeout()
+        self.assertEqual(second_governor.current_device_rate, 10)
+        self.assertEqual(SnmpRateGovernor('other-device', device_rate=20).current_device_rate, 20)
+
+    def test_cached_handler_acquires_only_for_sent_requests(self):
+        snmp = MagicMock()
+        snmp.get_property = MagicMock(return_value='value')
+        governor = MagicMock()
+        handler = CachedSnmpHandler(snmp, rate_governor=governor)
+        handler.get_property('ENTITY-MIB', 'entPhysicalSerialNum', 1)
+        handler.get_property('ENTITY-MIB', 'entPhysicalSerialNum', 1)
+        handler.get_table('IF-MIB', 'ifDescr')
+        self.assertEqual(governor.acquire.call_count, 2)
+
+    def test_timeout_of_plain_request_backs_off(self):
+        snmp = QualiSnmp.__new__(QualiSnmp)
+        snmp._logger = MagicMock()
+        snmp.get = MagicMock(side_effect=PySnmpError(errind.requestTimedOut))
+        governor = MagicMock()
+        handler = CachedSnmpHandler(snmp, rate_governor=governor)
+        self.assertEqual(handler.get_property('ENTITY-MIB', 'entPhysicalSerialNum', 1), '')
+        self.assertRaises(PySnmpError, handler.get, ('ENTITY-MIB', 'entPhysicalSerialNum', 2))
+        self.assertEqual(governor.record_timeout.call_count, 2)
+        self.assertFalse(governor.record_success.called)
+
+        snmp.get = MagicMock(return_value={'entPhysicalSerialNum': 'FOC123 '})
+        self.assertEqual(handler.get_property('ENTITY-MIB', 'entPhysicalSerialNum', 3), 'FOC123')
+        governor.record_success.assert_called_once_with()
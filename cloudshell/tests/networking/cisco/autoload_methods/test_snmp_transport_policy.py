@@ -0,0 +1,41 @@
+from unittest import TestCase
+from cloudshell.networking.cisco.autoload.snmp_transport_policy import AdaptiveSnmpTransportPolicy
+
+
+class TestAdaptiveSnmpTransportPolicy(TestCase):
+    def test_fast_responses_increase_max_repetitions(self):
+        policy = AdaptiveSnmpTransportPolicy()
+        policy.record_bulk_response(0.05, 25, 25, 1000)
+        self.assertEqual(policy.max_repetitions, 50)
+        self.assertEqual(policy.timeout, policy.MIN_TIMEOUT)
+
+    def test_trimmed_response_limits_max_repetitions(self):
+        policy = AdaptiveSnmpTransportPolicy()
+        policy.record_bulk_response(0.05, 25, 12, 1000)
+        self.assertEqual(policy.max_repetitions, 12)
+        policy.record_bulk_response(0.05, 12, 12, 1000)
+        self.assertEqual(policy.max_repetitions, 12)
+
+    def test_end_of_table_does_not_change_max_repetitions(self):
+        policy = AdaptiveSnmpTransportPolicy()
+        policy.record_bulk_response(0.05, 25, 3, 100, end_of_table=True)
+        self.assertEqual(policy.max_repetitions, 25)
+
+    def test_slow_responses_and_timeouts_shrink_requests(self):
+        policy = AdaptiveSnmpTransportPolicy()
+        policy.record_bulk_response(1.5, 25, 25, 1000)
+        self.assertEqual(policy.max_repetitions, 12)
+        self.assertEqual(policy.timeout, 6.0)
+        policy.record_timeout()
+        self.assertEqual(policy.max_repetitions, 6)
+        self.assertEqual(policy.max_varbinds, 5)
+        self.assertEqual(policy.timeout, policy.MAX_TIMEOUT)
+
+    def test_tuned_settings_are_remembered_per_platform(self):
+        policy = AdaptiveSnmpTransportPolicy('SNMPv2-SMI::enterprises.9.1.9999')
+        policy.record_get_response(0.05, policy.max_varbinds)
+        policy.record_bulk_response(0.05, 25, 25, 1000)
+        settings = policy.get_settings()
+        self.assertEqual(AdaptiveSnmpTransportPolicy('SNMPv2-SMI::enterprises.9.1.9999').get_settings(), settings)
+        self.assertEqual(AdaptiveSnmpTransportPolicy('SNMPv2-SMI::enterprises.9.1.9998').max_repetitions,
+                         AdaptiveSnmpTransportPolicy.DEFAULT_MAX_REPETITIONS)
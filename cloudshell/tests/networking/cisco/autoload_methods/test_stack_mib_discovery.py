@@ -0,0 +1,81 @@
+import shutil
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.snmp.quali_snmp import QualiMibTable
+from cloudshell.networking.cisco.autoload.autoload_state import AutoloadStateStorage
+from cloudshell.networking.cisco.autoload.cisco_generic_snmp_autoload import CiscoGenericSNMPAutoload
+from cloudshell.networking.cisco.autoload.snmp_capabilities import SnmpCapabilityCache
+
+SYSTEM_DESCRIPTION = 'Cisco Systems WS-C6509 Cisco Catalyst Operating System Software, Version 8.4(4)'
+
+
+class CatOSDeviceMock(object):
+    """Snmp handler mock, which answers CISCO-STACK-MIB and IF-MIB requests"""
+
+    def __init__(self):
+        self.tables = {
+            'moduleTable': {1: {'suffix': '1', 'moduleModel': 'WS-X6K-SUP2-2GE', 'moduleSlotNum': '1',
+                                'moduleSerialNumberString': 'SAL1', 'moduleSwVersion': '8.4(4)'},
+                            3: {'suffix': '3', 'moduleModel': 'WS-X6748-GE-TX', 'moduleSlotNum': '3',
+                                'moduleSerialNumberString': 'SAL3', 'moduleSwVersion': '8.4(4)'}},
+            'portTable': {1.1: {'suffix': '1.1', 'portIfIndex': '1', 'portName': ''},
+                          3.1: {'suffix': '3.1', 'portIfIndex': '31', 'portName': 'uplink'},
+                          '3.10': {'suffix': '3.10', 'portIfIndex': '40', 'portName': ''},
+                          5.1: {'suffix': '5.1', 'portIfIndex': '51', 'portName': ''}},
+            'chassisComponentTable': {1: {'suffix': '1', 'chassisComponentType': 'wsc6509eFan',
+                                          'chassisComponentModel': 'WS-C6509-E-FAN'},
+                                      2: {'suffix': '2', 'chassisComponentType': 'wsc6000vtt',
+                                          'chassisComponentModel': 'WS-C6K-VTT'}},
+            'ifDescr': {1: {'suffix': '1', 'ifDescr': '1/1'}, 31: {'suffix': '31', 'ifDescr': '3/1'}}}
+        self.properties = {'sysDescr': SYSTEM_DESCRIPTION, 'chassisModel': 'WS-C6509',
+                           'chassisSerialNumberString': 'SCA1', 'chassisPs1Type': "'wscac2500w'",
+                           'chassisPs1Status': "'ok'", 'chassisPs2Type': "'none'", 'chassisPs2Status': "'other'",
+                           'chassisPs3Type': 'No Such Object currently exists at this OID'}
+        self.handler = MagicMock()
+        self.handler.get_table = MagicMock(side_effect=self._get_table)
+        self.handler.get_property = MagicMock(side_effect=self._get_property)
+        self.handler.get = MagicMock(side_effect=lambda oid: OrderedDict([(oid[1], self.properties[oid[1]])]))
+
+    def _get_table(self, snmp_module_name, table_name):
+        result = QualiMibTable(table_name)
+        result.update(self.tables.get(table_name, {}))
+        return result
+
+    def _get_property(self, snmp_module_name, property_name, index, return_type='str'):
+        return self.properties.get(property_name, '')
+
+
+class TestCiscoAutoloadStackMibDiscovery(TestCase):
+    def setUp(self):
+        self.storage_folder = tempfile.mkdtemp()
+        self.device = CatOSDeviceMock()
+        self.handler = CiscoGenericSNMPAutoload(snmp_handler=self.device.handler, logger=MagicMock(),
+                                                supported_os=['CATOS', 'Catalyst Operating System', 'IOS'],
+                                                autoload_profile='structure')
+        self.handler.capabilities = SnmpCapabilityCache(file_path=self.storage_folder + '/capabilities.json')
+        self.handler._state_storage = AutoloadStateStorage('catos', storage_folder=self.storage_folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_folder)
+
+    def test_structure_is_built_from_stack_mib(self):
+        details = self.handler.discover()
+
+        paths = sorted((resource.name, resource.relative_address) for resource in details.resources)
+        self.assertEqual(paths, [('1-1', '0/1/1'), ('3-1', '0/3/1'), ('3-10', '0/3/10'), ('Chassis 0', '0'),
+                                 ('Module 1', '0/1'), ('Module 3', '0/3'), ('PP0', '0/PP1')])
+        walked_tables = [call[0][1] for call in self.device.handler.get_table.call_args_list]
+        self.assertNotIn('entPhysicalParentRelPos', walked_tables)
+        self.assertIn('portTable', walked_tables)
+        self.assertNotIn('chassisComponentTable', walked_tables)
+        power_port_attributes = [(attribute.attribute_name, attribute.attribute_value)
+                                 for attribute in details.attributes if attribute.relative_address == '0/PP1']
+        self.assertIn(('Model', 'wscac2500w'), power_port_attributes)
+        self.assertIn(('Port Description', 'wscac2500w, status ok'), power_port_attributes)
+
+    def test_entity_mib_is_used_for_other_devices(self):
+        self.device.properties['sysDescr'] = 'Cisco IOS Software'
+        self.handler._load_snmp_tables = MagicMock(side_effect=Exception('entity'))
+        self.assertRaisesRegexp(Exception, 'entity', self.handler.discover)
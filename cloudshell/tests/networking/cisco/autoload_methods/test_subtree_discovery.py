@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.networking.cisco.autoload.autoload_state import AutoloadStateStorage
+from cloudshell.networking.cisco.autoload.cisco_generic_snmp_autoload import CiscoGenericSNMPAutoload
+from cloudshell.networking.cisco.autoload.snmp_capabilities import SnmpCapabilityCache
+from cloudshell.tests.networking.cisco.autoload_methods.snmp_device_mock import SnmpDeviceMock, get_entity
+
+
+class TestCiscoAutoloadSubtreeDiscovery(TestCase):
+    def setUp(self):
+        self.storage_folder = tempfile.mkdtemp()
+        self.device = SnmpDeviceMock(
+            entities={1: get_entity(0, -1, 'chassis', 'cevChassisCat6509', 'Chassis'),
+                      2: get_entity(1, 1, 'container', 'cevContainerSlot', 'Slot 1'),
+                      3: get_entity(2, 0, 'module', 'cevModuleCat6kWsx6748', 'Module 1'),
+                      4: get_entity(3, 1, 'port', 'cevPortGe', 'GigabitEthernet1/1', 10),
+                      5: get_entity(3, 2, 'port', 'cevPortGe', 'GigabitEthernet1/2', 11),
+                      6: get_entity(1, 2, 'container', 'cevContainerSlot', 'Slot 2'),
+                      7: get_entity(6, 0, 'module', 'cevModuleCat6kWsx6748', 'Module 2'),
+                      8: get_entity(7, 1, 'port', 'cevPortGe', 'GigabitEthernet2/1', 20)},
+            interfaces={10: 'GigabitEthernet1/1', 11: 'GigabitEthernet1/2', 20: 'GigabitEthernet2/1'})
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_folder)
+
+    def _get_handler(self):
+        self.device.handler.reset_mock()
+        handler = CiscoGenericSNMPAutoload(snmp_handler=self.device.handler, logger=MagicMock(),
+                                           supported_os=['IOS'], autoload_profile='structure')
+        handler.capabilities = SnmpCapabilityCache(file_path=self.storage_folder + '/capabilities.json')
+        handler._state_storage = AutoloadStateStorage('switch', storage_folder=self.storage_folder)
+        return handler
+
+    @staticmethod
+    def _get_paths(details):
+        return sorted((resource.name, resource.relative_address) for resource in details.resources)
+
+    def test_subtree_keeps_relative_paths_of_full_autoload(self):
+        full_details = self._get_handler().discover()
+        self.assertIn(('GigabitEthernet2-1', '0/2/1'), self._get_paths(full_details))
+
+        self.device.entities[9] = get_entity(7, 2, 'port', 'cevPortGe', 'GigabitEthernet2/2', 21)
+        self.device.interfaces[21] = 'GigabitEthernet2/2'
+        subtree_details = self._get_handler().discover_subtree('0/2')
+
+        self.assertEqual(self._get_paths(subtree_details), [('GigabitEthernet2-1', '0/2/1'),
+                                                            ('GigabitEthernet2-2', '0/2/2'),
+                                                            ('Module 2', '0/2')])
+        self.assertFalse(self.device.handler.get_table.called)
+        walked_rows = [call[0][0][1:] for call in self.device.handler.walk.call_args_list]
+        self.assertEqual(sorted(walked_rows), [('entPhysicalChildIndex', '7'), ('entPhysicalChildIndex', '8'),
+                                               ('entPhysicalChildIndex', '9')])
+
+    def test_subtree_port_attributes_are_read_only_for_subtree_ports(self):
+        self._get_handler().discover()
+        self.device.table_rows = {'cdpCacheDeviceId': {'10.1': 'switch-a', '20.1': 'switch-b'},
+                                  'cdpCacheDevicePort': {'10.1': 'Gi0/1', '20.1': 'Gi0/2'}}
+        handler = self._get_handler()
+        handler._autoload_profile = 'full'
+        handler.discover_subtree(7)
+
+        self.assertEqual(handler.cdp_table.keys(), ['20.1'])
+        self.assertEqual(handler.cdp_table['20.1']['cdpCacheDeviceId'], 'switch-b')
+        walked_tables = [call[0][1] for call in self.device.handler.get_table.call_args_list]
+        self.assertNotIn('cdpCacheTable', walked_tables)
+        self.assertNotIn('entPhysicalContainedIn', walked_tables)
+        walked_interfaces = set(call[0][0][2] for call in self.device.handler.walk.call_args_list
+                                if call[0][0][1] != 'entPhysicalChildIndex')
+        self.assertEqual(walked_interfaces, {'20'})
+
+    def test_subtree_drops_removed_elements(self):
+        self._get_handler().discover()
+        del self.device.entities[8]
+        handler = self._get_handler()
+        handler.discover_subtree(7)
+        self.assertNotIn(8, handler.port_list)
+        self.assertEqual(handler.relative_path[4], '0/1/1')
+        self.assertNotIn(8, handler.state_storage.load()['relative_path'])
+
+    def test_subtree_requires_full_autoload(self):
+        self.assertRaises(Exception, self._get_handler().discover_subtree, '0/2')
@@ -0,0 +1,63 @@
+import json
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.snmp.quali_snmp import QualiMibTable
+from cloudshell.networking.cisco.autoload.cisco_topology_builder import CiscoTopologyBuilder, \
+    normalize_device_name, normalize_port_name
+
+
+def _get_snmp(system_name, interfaces, cdp_neighbors=None, lldp_neighbors=None):
+    tables = {'ifDescr': {str(index): {'ifDescr': name} for index, name in interfaces.iteritems()},
+              'cdpCacheTable': {}, 'lldpLocPortTable': {}, 'lldpRemTable': {}}
+    for if_index, (device_id, port) in (cdp_neighbors or {}).iteritems():
+        tables['cdpCacheTable']['{0}.1'.format(if_index)] = {'cdpCacheDeviceId': device_id,
+                                                             'cdpCacheDevicePort': port}
+    for port_number, (local_port, system, port_id) in (lldp_neighbors or {}).iteritems():
+        tables['lldpLocPortTable'][str(port_number)] = {'lldpLocPortId': local_port}
+        tables['lldpRemTable']['0.{0}.1'.format(port_number)] = {'lldpRemSysName': system, 'lldpRemPortId': port_id}
+
+    def get_table(snmp_module_name, table_name):
+        result = QualiMibTable(table_name)
+        for suffix, row in tables[table_name].iteritems():
+            result[suffix] = dict(row, suffix=suffix)
+        return result
+
+    snmp = MagicMock()
+    snmp.get_table = MagicMock(side_effect=get_table)
+    snmp.get_property = MagicMock(side_effect=lambda mib, name, index: system_name if name == 'sysName' else '')
+    return snmp
+
+
+class TestCiscoTopologyBuilder(TestCase):
+    def test_normalize_names(self):
+        self.assertEqual(normalize_device_name('Core-1.lab.local(FOC1234X0AB)'), 'core-1')
+        self.assertEqual(normalize_device_name('10.0.0.1'), '10.0.0.1')
+        self.assertEqual(normalize_port_name('Gi1/0/1'), 'gigabitethernet1/0/1')
+        self.assertEqual(normalize_port_name('GigabitEthernet 1/0/1'), 'gigabitethernet1/0/1')
+        self.assertEqual(normalize_port_name('Te1/1/1'), 'tengigabitethernet1/1/1')
+        self.assertEqual(normalize_port_name('Eth1/49'), 'ethernet1/49')
+        self.assertEqual(normalize_port_name('Port-channel10'), 'port-channel10')
+
+    def test_links_are_joined_from_both_sides(self):
+        handlers = {
+            'core': _get_snmp('core-1.lab.local', {1: 'GigabitEthernet1/0/1', 2: 'GigabitEthernet1/0/2'},
+                              cdp_neighbors={1: ('access-1(FOC1)', 'GigabitEthernet0/1'),
+                                             2: ('access-2', 'GigabitEthernet0/1')}),
+            'access-1': _get_snmp('access-1', {1: 'GigabitEthernet0/1'},
+                                  lldp_neighbors={1: ('Gi0/1', 'core-1.lab.local', 'Gi1/0/1')}),
+            'access-2': _get_snmp('access-2', {1: 'GigabitEthernet0/1'},
+                                  cdp_neighbors={1: ('core-1', 'GigabitEthernet1/0/3')}),
+            'broken': MagicMock(get_property=MagicMock(side_effect=Exception('timeout')))}
+
+        graph = CiscoTopologyBuilder(handlers, MagicMock(), threads_count=2).build()
+
+        self.assertEqual(graph.devices, ['access-1', 'access-2', 'core-1'])
+        self.assertEqual(graph.errors.keys(), ['broken'])
+        confirmed = graph.get_links('confirmed')
+        self.assertEqual(len(confirmed), 1)
+        self.assertEqual(confirmed[0]['endpoints'], (('access-1', 'gigabitethernet0/1'),
+                                                     ('core-1', 'gigabitethernet1/0/1')))
+        self.assertEqual(confirmed[0]['protocols'], ['cdp', 'lldp'])
+        self.assertEqual(len(graph.get_links('mismatch')), 1)
+        self.assertEqual(len(graph.get_links('unconfirmed')), 1)
+        self.assertEqual(len(json.loads(graph.to_json())['links']), 3)
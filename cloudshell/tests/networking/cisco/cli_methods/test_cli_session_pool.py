@@ -0,0 +1,144 @@
+import time
+from unittest import TestCase
+from mock import MagicMock, patch
+from cloudshell.networking.cisco.cli_session_pool import CliSessionPool, SessionBoundCli, SessionFactoryError, \
+    releases_cli_session
+from cloudshell.networking.cisco.cisco_send_command_operations import CiscoSendCommandOperations
+
+
+class TestCliSessionPool(TestCase):
+    def setUp(self):
+        self.sessions = []
+        self.pool = CliSessionPool('switch', MagicMock(), session_factory=self._create_session, max_sessions=2)
+
+    def tearDown(self):
+        self.pool.idle_timeout = CliSessionPool.DEFAULT_IDLE_TIMEOUT
+        self.pool.keepalive_interval = CliSessionPool.DEFAULT_KEEPALIVE_INTERVAL
+
+    def _create_session(self, logger):
+        session = MagicMock()
+        self.sessions.append(session)
+        return session
+
+    def test_released_session_is_reused(self):
+        session = self.pool.acquire()
+        self.pool.release(session)
+        self.assertIs(self.pool.acquire(), session)
+        self.assertEqual(len(self.sessions), 1)
+
+    def test_acquire_waits_for_released_session_when_pool_is_full(self):
+        first = self.pool.acquire()
+        self.pool.acquire()
+        self.assertRaises(Exception, self.pool.acquire, 0.01)
+        self.pool.release(first)
+        self.assertIs(self.pool.acquire(0.01), first)
+
+    def test_dead_idle_session_is_replaced(self):
+        self.pool._start_maintenance = MagicMock()
+        session = self.pool.acquire()
+        self.pool.release(session)
+        self.pool.keepalive_interval = -1
+        session.hardware_expect.side_effect = Exception('Socket closed')
+        new_session = self.pool.acquire()
+        self.assertIsNot(new_session, session)
+        self.assertTrue(session.disconnect.called)
+        self.assertEqual(self.pool.sessions_count, 1)
+
+    def test_prewarmed_session_is_used_by_acquire(self):
+        self.pool.prewarm(1)
+        session = self.pool.acquire(5)
+        self.assertEqual(self.sessions, [session])
+
+    def test_pool_is_prewarmed_once_on_creation(self):
+        with patch.object(CliSessionPool, 'prewarm') as prewarm:
+            try:
+                pool = CliSessionPool.get_pool('prewarmed', MagicMock(), prewarm_count=1,
+                                               session_factory=self._create_session)
+                self.assertIs(CliSessionPool.get_pool('prewarmed', MagicMock(), prewarm_count=1), pool)
+            finally:
+                CliSessionPool._POOLS.pop('prewarmed', None)
+        prewarm.assert_called_once_with(1)
+
+    def test_idle_sessions_are_evicted_by_maintenance(self):
+        self.pool.idle_timeout = 0.05
+        self.pool.keepalive_interval = 0.05
+        self.pool.release(self.pool.acquire())
+        time.sleep(0.3)
+        self.assertEqual(self.pool.sessions_count, 0)
+        self.assertTrue(self.sessions[0].disconnect.called)
+
+
+class TestSessionBoundCli(TestCase):
+    def test_commands_are_sent_to_bound_session(self):
+        session = MagicMock()
+        pool = CliSessionPool('router', MagicMock(), session_factory=lambda logger: session)
+        cli_service = MagicMock()
+        cli = SessionBoundCli(cli_service, pool)
+
+        cli.send_command('show version')
+        cli.exit_configuration_mode()
+        self.assertEqual(cli_service.send_command.call_args[1]['session'], session)
+        self.assertEqual(cli_service.exit_configuration_mode.call_args[1]['session'], session)
+
+        cli.release()
+        self.assertEqual(pool.idle_count, 1)
+        self.assertFalse(session.hardware_expect.called)
+
+    def test_session_is_checked_after_failure(self):
+        session = MagicMock()
+        session.hardware_expect.side_effect = Exception('Socket closed')
+        pool = CliSessionPool('router', MagicMock(), session_factory=lambda logger: session)
+        cli_service = MagicMock()
+        cli_service.send_config_command.side_effect = Exception('Failed to send command')
+        cli = SessionBoundCli(cli_service, pool)
+
+        self.assertRaises(Exception, cli.send_config_command, 'vlan 10')
+        cli.release()
+        self.assertEqual(pool.sessions_count, 0)
+
+    def test_thread_session_is_used_if_session_factory_is_not_supported(self):
+        def create_session(logger):
+            raise SessionFactoryError('CliSessionPool', 'Not supported')
+
+        pool = CliSessionPool('router', MagicMock(), session_factory=create_session)
+        cli_service = MagicMock()
+        cli = SessionBoundCli(cli_service, pool)
+
+        cli.send_command('show version')
+        self.assertNotIn('session', cli_service.send_command.call_args[1])
+        self.assertEqual(pool.sessions_count, 0)
+
+    def test_back_to_back_operations_reuse_released_session(self):
+        sessions = []
+        pool = CliSessionPool('router', MagicMock(), session_factory=lambda logger: sessions.append(MagicMock()) or
+                              sessions[-1], max_sessions=1)
+        pool.DEFAULT_ACQUIRE_TIMEOUT = 0.01
+        cli_service = MagicMock()
+        operations = CiscoSendCommandOperations(resource_name='router', cli=SessionBoundCli(cli_service, pool),
+                                                logger=MagicMock())
+
+        operations.send_command('show version')
+        operations.send_config_command('vlan 10')
+        operations.send_command('show vlan')
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual(pool.idle_count, 1)
+        self.assertEqual([call[1]['session'] for call in cli_service.send_command.call_args_list], sessions * 2)
+
+    def test_nested_operation_keeps_session(self):
+        pool = CliSessionPool('router', MagicMock(), session_factory=lambda logger: MagicMock(), max_sessions=1)
+        cli_service = MagicMock()
+
+        class Operations(object):
+            cli = SessionBoundCli(cli_service, pool)
+
+            @releases_cli_session
+            def inner(self):
+                self.cli.send_command('show version')
+                return pool.idle_count
+
+            @releases_cli_session
+            def outer(self):
+                return self.inner()
+
+        self.assertEqual(Operations().outer(), 0)
+        self.assertEqual(pool.idle_count, 1)
@@ -0,0 +1,46 @@
+import re
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.networking.cisco.cisco_expected_map import MergedExpectedMap, send_line
+from cloudshell.networking.cisco.cisco_configuration_operations import CiscoConfigurationOperations
+
+
+class TestMergedExpectedMap(TestCase):
+    def setUp(self):
+        self.expected_map = MergedExpectedMap([('[\[\(][Yy]es/[Nn]o[\)\]]|\[confirm\]', send_line('yes')),
+                                               ('\(y/n\)', send_line('y')),
+                                               ('[\[\(][Yy]/[Nn][\)\]]', send_line('y')),
+                                               ('bytes', send_line(''))])
+
+    @staticmethod
+    def _run_cli_action(expected_map, output):
+        """Pick action the same way the cli does: first pattern of the map found in the output"""
+
+        session = MagicMock()
+        for pattern in expected_map:
+            if re.search(pattern, output, re.DOTALL):
+                expected_map[pattern](session)
+                break
+        return session
+
+    def test_patterns_with_the_same_action_are_merged_for_cli(self):
+        self.assertIs(send_line('y'), send_line('y'))
+        self.assertEqual(len(self.expected_map), 3)
+        for output, answer in [('Delete? [confirm]', 'yes'), ('Erase flash (y/n)', 'y'), ('Erase flash [Y/N]', 'y'),
+                               ('1024 bytes copied', '')]:
+            self._run_cli_action(self.expected_map, output).send_line.assert_called_once_with(answer)
+
+    def test_map_priority_is_kept(self):
+        expected_map = MergedExpectedMap([('confirm', send_line('a')), ('conf', send_line('b')),
+                                          ('y/n', send_line('a'))])
+        self.assertEqual(len(expected_map), 3)
+        self._run_cli_action(expected_map, '[y/n] [confirm]').send_line.assert_called_once_with('a')
+        self._run_cli_action(expected_map, '[conf]').send_line.assert_called_once_with('b')
+        self.assertFalse(self._run_cli_action(expected_map, 'Accessing tftp://10.0.0.1/startup').send_line.called)
+        self.assertEqual(len(MergedExpectedMap()), 0)
+
+    def test_operations_maps_keep_patterns_order(self):
+        self.assertEqual(CiscoConfigurationOperations.RELOAD_EXPECTED_MAP.keys(),
+                         ['[\[\(][Yy]es/[Nn]o[\)\]]|\[confirm\]', '\(y\/n\)|continue', 'reload',
+                          '[\[\(][Yy]/[Nn][\)\]]'])
+        self.assertEqual(len(CiscoConfigurationOperations.CONFIGURE_REPLACE_EXPECTED_MAP), 3)
@@ -0,0 +1,80 @@
+import shutil
+import tempfile
+from unittest import TestCase
+from mock import MagicMock, patch
+from cloudshell.networking.cisco.cisco_cli_capabilities import CliCapabilityCache, get_interface_type
+from cloudshell.networking.cisco.cisco_configuration_operations import CiscoConfigurationOperations
+from cloudshell.networking.cisco.cisco_connectivity_operations import CiscoConnectivityOperations
+
+
+class TestCliCapabilityCache(TestCase):
+    def setUp(self):
+        self.storage_folder = tempfile.mkdtemp()
+        self.file_path = self.storage_folder + '/cli_capabilities.json'
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_folder)
+
+    def test_probe_result_is_persisted_per_platform(self):
+        probe = MagicMock(return_value=True)
+        cache = CliCapabilityCache('WS-C3750/15.0', MagicMock(), file_path=self.file_path)
+        self.assertTrue(cache.get_or_probe('qnq', probe, 'gigabitethernet'))
+
+        cache = CliCapabilityCache('WS-C3750/15.0', MagicMock(), file_path=self.file_path)
+        self.assertTrue(cache.get_or_probe('qnq', probe, 'gigabitethernet'))
+        self.assertEqual(probe.call_count, 1)
+
+        cache.get_or_probe('qnq', probe, 'port-channel')
+        CliCapabilityCache('N5K/7.0', MagicMock(), file_path=self.file_path).get_or_probe('qnq', probe)
+        self.assertEqual(probe.call_count, 3)
+
+    def test_expired_result_is_probed_again(self):
+        probe = MagicMock(return_value=False)
+        cache = CliCapabilityCache('WS-C3750/15.0', MagicMock(), file_path=self.file_path, reprobe_interval=-1)
+        self.assertFalse(cache.get_or_probe('configure_replace', probe))
+        self.assertFalse(cache.get_or_probe('configure_replace', probe))
+        self.assertEqual(probe.call_count, 2)
+
+    def test_interface_type(self):
+        self.assertEqual(get_interface_type('GigabitEthernet0/1'), 'gigabitethernet')
+        self.assertEqual(get_interface_type('Port-channel10'), 'port-channel')
+
+
+class TestCiscoOperationsCliCapabilities(TestCase):
+    def setUp(self):
+        self.storage_folder = tempfile.mkdtemp()
+        self.cli = MagicMock()
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_folder)
+
+    def _get_cache(self):
+        return CliCapabilityCache('ASR1004/15.5', MagicMock(), file_path=self.storage_folder + '/capabilities.json')
+
+    def test_qnq_is_probed_once(self):
+        self.cli.send_config_command = MagicMock(return_value='  dot1q-tunnel  set trunking mode to TUNNEL')
+        for _ in range(2):
+            handler = CiscoConnectivityOperations(cli=self.cli, logger=MagicMock(), api=MagicMock(),
+                                                  resource_name='switch')
+            handler._cli_capabilities = self._get_cache()
+            self.assertTrue(handler._does_interface_support_qnq('GigabitEthernet0/1'))
+        self.cli.send_config_command.assert_any_call('switchport mode ?')
+        self.assertEqual(self.cli.send_config_command.call_count, 2)
+
+    def test_configure_replace_is_probed_once(self):
+        self.cli.send_command = MagicMock(return_value='% Invalid input detected')
+        for _ in range(2):
+            handler = CiscoConfigurationOperations(cli=self.cli, logger=MagicMock(), api=MagicMock(),
+                                                   resource_name='switch')
+            handler._cli_capabilities = self._get_cache()
+            self.assertFalse(handler._check_replace_command())
+        self.assertEqual(self.cli.send_command.call_count, 1)
+
+    def test_nxos_check_is_evaluated_once(self):
+        CiscoConnectivityOperations._SWITCHPORT_COMMAND_REQUIRED.clear()
+        with patch('cloudshell.networking.cisco.cisco_connectivity_operations.re.search',
+                   MagicMock(return_value=True)) as search:
+            self.assertTrue(CiscoConnectivityOperations._is_switchport_command_required(['NX-?OS']))
+            self.assertTrue(CiscoConnectivityOperations._is_switchport_command_required(['NX-?OS']))
+        self.assertEqual(search.call_count, 1)
+        self.assertFalse(CiscoConnectivityOperations._is_switchport_command_required(['IOS']))
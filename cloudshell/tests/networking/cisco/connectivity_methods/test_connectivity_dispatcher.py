@@ -0,0 +1,73 @@
+import json
+import threading
+import time
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.core.action_result import ActionResult
+from cloudshell.networking.cisco.cisco_connectivity_dispatcher import CiscoConnectivityDispatcher
+from cloudshell.tests.networking.cisco.connectivity_methods.test_vlan_batch import get_action
+
+
+class DeviceOperationsMock(object):
+    active_devices = []
+    max_active = 0
+    lock = threading.Lock()
+
+    def __init__(self, device_id):
+        self.device_id = device_id
+        self._cli = MagicMock()
+
+    def apply_vlan_actions(self, actions):
+        with self.lock:
+            self.active_devices.append(self.device_id)
+            DeviceOperationsMock.max_active = max(self.max_active, len(self.active_devices))
+        time.sleep(0.1)
+        with self.lock:
+            self.active_devices.remove(self.device_id)
+        if self.device_id == '10.0.0.3':
+            raise Exception('Cisco OS', 'Failed to open connection')
+        results = []
+        for action in actions:
+            action_result = ActionResult()
+            action_result.actionId = action.actionId
+            action_result.errorMessage = None
+            action_result.infoMessage = 'Vlan Configuration Completed.'
+            results.append(action_result)
+        return results
+
+
+class TestCiscoConnectivityDispatcher(TestCase):
+    def setUp(self):
+        DeviceOperationsMock.max_active = 0
+        self.operations = {}
+
+    def _create_operations(self, device_id):
+        self.operations[device_id] = DeviceOperationsMock(device_id)
+        return self.operations[device_id]
+
+    def _apply(self, threads_count):
+        actions = []
+        for device in range(1, 5):
+            for port in range(1, 3):
+                action = get_action('{0}-{1}'.format(device, port), 'setVlan', '10', 'Access', '0/{0}'.format(port))
+                action['actionTarget']['fullAddress'] = '10.0.0.{0}/0/{1}'.format(device, port)
+                actions.append(action)
+        dispatcher = CiscoConnectivityDispatcher(self._create_operations, MagicMock(), threads_count)
+        response = dispatcher.apply_connectivity_changes(json.dumps({'driverRequest': {'actions': actions}}))
+        return json.loads(response)['driverResponse']['actionResults']
+
+    def test_devices_are_configured_concurrently(self):
+        start_time = time.time()
+        results = self._apply(threads_count=4)
+        self.assertLess(time.time() - start_time, 0.3)
+        self.assertEqual(DeviceOperationsMock.max_active, 4)
+        self.assertEqual([result['actionId'] for result in results],
+                         ['1-1', '1-2', '2-1', '2-2', '3-1', '3-2', '4-1', '4-2'])
+        self.assertEqual([result['errorMessage'] for result in results if result['actionId'].startswith('3')],
+                         ['Cisco OS, Failed to open connection'] * 2)
+        self.assertEqual(results[0]['infoMessage'], 'Vlan Configuration Completed.')
+        self.assertTrue(self.operations['10.0.0.1']._cli.release.called)
+
+    def test_concurrency_is_limited(self):
+        self._apply(threads_count=2)
+        self.assertEqual(DeviceOperationsMock.max_active, 2)
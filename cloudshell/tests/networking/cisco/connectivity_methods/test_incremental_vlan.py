@@ -0,0 +1,153 @@
+import json
+from unittest import TestCase
+from mock import MagicMock, patch
+from cloudshell.snmp.quali_snmp import QualiMibTable
+from cloudshell.networking.cisco.cisco_connectivity_operations import CiscoConnectivityOperations
+from cloudshell.networking.cisco.cisco_vlan_inventory import CiscoVlanInventory
+from cloudshell.networking.cisco.cisco_port_name_index import PortNameIndex
+from cloudshell.networking.cisco.cisco_running_config import RunningConfigService
+from cloudshell.tests.networking.cisco.connectivity_methods.test_vlan_batch import get_action, get_resource
+
+RUNNING_CONFIG = '''!
+interface GigabitEthernet0/1
+ switchport mode trunk
+ switchport trunk allowed vlan 10,20
+!
+interface GigabitEthernet0/2
+ switchport access vlan 30
+ switchport mode access
+!
+interface GigabitEthernet0/3
+ switchport mode trunk
+ shutdown
+!
+end
+'''
+
+
+class TestCiscoConnectivityIncrementalVlan(TestCase):
+    def setUp(self):
+        CiscoVlanInventory._CACHE.clear()
+        CiscoVlanInventory._FAILURES.clear()
+        PortNameIndex._CACHE.clear()
+        RunningConfigService._CACHE.clear()
+        self.cli = MagicMock()
+        self.cli.send_command = MagicMock(return_value=RUNNING_CONFIG)
+        self.cli.send_command_list = MagicMock(return_value='')
+        api = MagicMock()
+        ports = [get_resource('switch/Chassis 0/GigabitEthernet0-{0}'.format(index), '192.168.1.1/0/{0}'.format(index))
+                 for index in range(1, 4)]
+        api.GetResourceDetails = MagicMock(return_value=get_resource('switch', '192.168.1.1',
+                                                                     [get_resource('Chassis 0', '192.168.1.1/0',
+                                                                                   ports)]))
+        vlan_table = QualiMibTable('vtpVlanState')
+        vlan_table.update({index: {'suffix': '1.{0}'.format(index), 'vtpVlanState': 'operational'}
+                           for index in (10, 20, 30, 40)})
+        snmp_handler = MagicMock()
+        snmp_handler.get_table = MagicMock(return_value=vlan_table)
+        self.config = MagicMock()
+        self.config.SUPPORTED_OS = ['IOS']
+        self.config.VLAN_INCREMENTAL_CONFIGURATION = True
+        with patch('cloudshell.networking.cisco.cisco_connectivity_operations.get_resource_name',
+                   MagicMock(return_value='switch')):
+            self.handler = CiscoConnectivityOperations(cli=self.cli, logger=MagicMock(), api=api,
+                                                       snmp_handler=snmp_handler)
+        self.inject_patcher = patch('cloudshell.networking.cisco.cisco_connectivity_operations.inject.instance',
+                                    MagicMock(return_value=self.config))
+        self.inject_patcher.start()
+
+    def tearDown(self):
+        self.inject_patcher.stop()
+
+    def _apply(self, actions):
+        request = json.dumps({'driverRequest': {'actions': actions}})
+        return json.loads(self.handler.apply_connectivity_changes(request))['driverResponse']['actionResults']
+
+    def _get_sent_lists(self):
+        return [call[0][0] for call in self.cli.send_command_list.call_args_list]
+
+    def test_only_trunk_vlan_delta_is_sent(self):
+        self._apply([get_action('1', 'setVlan', '20,40', 'Trunk', '0/1'),
+                     get_action('2', 'setVlan', '10', 'Trunk', '0/3')])
+
+        self.assertEqual(self._get_sent_lists(), [['interface GigabitEthernet0/1',
+                                                   'switchport trunk allowed vlan add 40',
+                                                   'switchport trunk allowed vlan remove 10'],
+                                                  ['interface GigabitEthernet0/3', 'no shutdown',
+                                                   'switchport trunk allowed vlan 10']])
+        self.assertEqual(self.handler.running_config.get_interface_config('GigabitEthernet0/1'),
+                         'interface GigabitEthernet0/1\n switchport mode trunk\n switchport trunk allowed vlan 20,40')
+
+    def test_configured_interface_is_not_changed(self):
+        results = self._apply([get_action('1', 'setVlan', '30', 'Access', '0/2'),
+                               get_action('2', 'setVlan', '10,20', 'Trunk', '0/1')])
+
+        self.assertEqual(self._get_sent_lists(), [])
+        self.assertFalse(self.cli.exit_configuration_mode.called)
+        self.assertEqual([result['infoMessage'] for result in results], ['Vlan Configuration Completed.'] * 2)
+
+    def test_device_is_checked_before_nothing_is_sent(self):
+        def send_command(command, *args, **kwargs):
+            if command == 'show running-config interface GigabitEthernet0/2':
+                return 'interface GigabitEthernet0/2\n switchport access vlan 40\n switchport mode access\n'
+            return RUNNING_CONFIG
+
+        self.cli.send_command = MagicMock(side_effect=send_command)
+        results = self._apply([get_action('1', 'setVlan', '30', 'Access', '0/2')])
+
+        self.assertEqual(self._get_sent_lists(), [['interface GigabitEthernet0/2', 'switchport access vlan 30']])
+        self.assertEqual(results[0]['infoMessage'], 'Vlan Configuration Completed.')
+
+    def test_trunk_vlan_is_removed_without_teardown(self):
+        self._apply([get_action('1', 'removeVlan', '10', 'Trunk', '0/1'),
+                     get_action('2', 'removeVlan', '30', 'Access', '0/2')])
+
+        self.assertEqual(self._get_sent_lists(), [['interface GigabitEthernet0/1',
+                                                   'switchport trunk allowed vlan remove 10'],
+                                                  ['interface GigabitEthernet0/2', 'no switchport mode access',
+                                                   'no switchport access vlan']])
+
+    def test_mode_change_and_disabled_mode_rebuild_interface(self):
+        self.config.VLAN_INCREMENTAL_CONFIGURATION = False
+        self._apply([get_action('1', 'setVlan', '20,40', 'Trunk', '0/1'),
+                     get_action('2', 'setVlan', '10', 'Trunk', '0/2')])
+
+        sent_lists = self._get_sent_lists()
+        self.assertEqual(sent_lists[0][:3], ['interface GigabitEthernet0/1', 'no switchport trunk allowed vlan',
+                                             'no switchport mode trunk'])
+        self.assertIn('no switchport mode access', sent_lists[1])
+
+    def test_trunk_remove_clears_switchport_configuration_by_default(self):
+        del self.config.VLAN_INCREMENTAL_CONFIGURATION
+        self._apply([get_action('1', 'removeVlan', '10', 'Trunk', '0/1')])
+
+        self.assertEqual(self._get_sent_lists(), [['interface GigabitEthernet0/1',
+                                                   'no switchport trunk allowed vlan', 'no switchport mode trunk']])
+
+    def test_single_port_reads_only_interface_config(self):
+        def send_command(command, *args, **kwargs):
+            return 'interface GigabitEthernet0/1\n switchport mode trunk\n switchport trunk allowed vlan 10,20\n'
+
+        self.cli.send_command = MagicMock(side_effect=send_command)
+        self.handler.add_vlan('40', '192.168.1.1/0/1', 'Trunk', False, '')
+        self.handler.remove_vlan('10', '192.168.1.1/0/1', 'Trunk')
+
+        commands = [call[0][0] for call in self.cli.send_command.call_args_list]
+        self.assertNotIn('show running-config', commands)
+        self.assertIn('show running-config interface GigabitEthernet0/1', commands)
+
+    def test_default_teardown_is_built_from_device_config(self):
+        del self.config.VLAN_INCREMENTAL_CONFIGURATION
+        self.handler.running_config.get_snapshot()
+
+        def send_command(command, *args, **kwargs):
+            if command == 'show running-config interface GigabitEthernet0/1':
+                return 'interface GigabitEthernet0/1\n switchport access vlan 20\n switchport mode access\n'
+            return RUNNING_CONFIG
+
+        self.cli.send_command = MagicMock(side_effect=send_command)
+        self._apply([get_action('1', 'setVlan', '10', 'Trunk', '0/1')])
+
+        sent_lists = self._get_sent_lists()
+        self.assertIn('no switchport mode access', sent_lists[0])
+        self.assertNotIn('no switchport mode trunk', sent_lists[0])
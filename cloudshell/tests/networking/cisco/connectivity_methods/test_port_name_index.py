@@ -0,0 +1,34 @@
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.networking.cisco.cisco_port_name_index import PortNameIndex
+from cloudshell.tests.networking.cisco.connectivity_methods.test_vlan_batch import get_resource
+
+
+class TestPortNameIndex(TestCase):
+    def setUp(self):
+        PortNameIndex._CACHE.clear()
+        self.ports = [get_resource('switch/Chassis 0/GigabitEthernet0-1', '192.168.1.1/0/1'),
+                      get_resource('switch/Chassis 0/GigabitEthernet0-10', '192.168.1.1/0/10')]
+        self.api = MagicMock()
+        self.api.GetResourceDetails = MagicMock(
+            side_effect=lambda name: get_resource('switch', '192.168.1.1',
+                                                  [get_resource('switch/Chassis 0', '192.168.1.1/0', self.ports)]))
+
+    def test_resource_details_are_downloaded_once(self):
+        index = PortNameIndex(self.api, 'switch', MagicMock())
+        self.assertEqual(index.get_resource_name('192.168.1.1/0/1'), 'switch/Chassis 0/GigabitEthernet0-1')
+        self.assertEqual(PortNameIndex(self.api, 'switch', MagicMock()).get_resource_name('192.168.1.1/0/10'),
+                         'switch/Chassis 0/GigabitEthernet0-10')
+        self.assertEqual(self.api.GetResourceDetails.call_count, 1)
+
+    def test_index_is_reloaded_for_unknown_address_and_after_ttl(self):
+        index = PortNameIndex(self.api, 'switch', MagicMock())
+        index.get_resource_name('192.168.1.1/0/1')
+        self.ports.append(get_resource('switch/Chassis 0/GigabitEthernet0-2', '192.168.1.1/0/2'))
+        self.assertEqual(index.get_resource_name('192.168.1.1/0/2'), 'switch/Chassis 0/GigabitEthernet0-2')
+        self.assertIsNone(index.get_resource_name('192.168.1.1/0/3'))
+        self.assertEqual(self.api.GetResourceDetails.call_count, 3)
+
+        index.ttl = -1
+        index.get_resource_name('192.168.1.1/0/1')
+        self.assertEqual(self.api.GetResourceDetails.call_count, 4)
@@ -0,0 +1,127 @@
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.networking.cisco.cisco_running_config import RunningConfig, RunningConfigService
+
+RUNNING_CONFIG = '''Switch#show running-config
+Building configuration...
+
+Current configuration : 1024 bytes
+!
+hostname Switch
+!
+boot-start-marker
+boot system flash bootflash:old.bin
+boot-end-marker
+!
+banner motd ^C
+Authorized access only
+^C
+!
+archive
+ path flash:archive
+ maximum 5
+!
+vlan 10,20-21
+!
+interface GigabitEthernet0/1
+ switchport mode trunk
+ switchport trunk allowed vlan 10,20
+ switchport trunk allowed vlan add 30-32
+!
+interface GigabitEthernet0/2
+ switchport access vlan 10
+ switchport mode access
+ shutdown
+!
+end
+Switch#'''
+
+
+class TestCiscoRunningConfig(TestCase):
+    def setUp(self):
+        self.config = RunningConfig.parse(RUNNING_CONFIG)
+
+    def test_sections_are_indexed(self):
+        self.assertEqual(self.config.get_interface('gigabitethernet0/2'),
+                         'interface GigabitEthernet0/2\n switchport access vlan 10\n switchport mode access\n shutdown')
+        self.assertEqual(self.config.get_vlan_ids(), [10, 20, 21])
+        self.assertEqual(self.config.get_boot_lines(),
+                         ['boot-start-marker', 'boot system flash bootflash:old.bin', 'boot-end-marker'])
+        self.assertEqual(self.config.get_archive(), [' path flash:archive', ' maximum 5'])
+        self.assertEqual(self.config.include('^hostname'), ['hostname Switch'])
+        self.assertNotIn('Authorized access only', self.config.headers)
+
+    def test_interface_commands_are_applied(self):
+        self.config.apply_commands(['interface GigabitEthernet0/2', 'no switchport access vlan',
+                                    'no switchport mode access', 'no shutdown', 'switchport mode trunk',
+                                    'switchport trunk allowed vlan 10', 'exit',
+                                    'interface GigabitEthernet0/1', 'switchport trunk allowed vlan remove 20,31'])
+
+        self.assertEqual(self.config.get_interface('GigabitEthernet0/2'),
+                         'interface GigabitEthernet0/2\n switchport mode trunk\n switchport trunk allowed vlan 10')
+        self.assertEqual(self.config.get_interface('GigabitEthernet0/1'),
+                         'interface GigabitEthernet0/1\n switchport mode trunk\n'
+                         ' switchport trunk allowed vlan 10,30,32')
+        self.assertFalse(self.config.is_stale_interface('GigabitEthernet0/1'))
+        self.assertFalse(self.config.stale)
+
+    def test_global_commands_are_applied(self):
+        self.config.apply_commands(['vlan 21-22', 'state active', 'exit', 'no vlan 10',
+                                    'no boot system flash bootflash:old.bin', 'hostname Core'])
+
+        self.assertEqual(self.config.get_vlan_ids(), [20, 21, 22])
+        self.assertEqual(self.config.get_boot_lines(), ['boot-start-marker', 'boot-end-marker'])
+        self.assertEqual(self.config.include('^hostname'), ['hostname Core'])
+        self.assertFalse(self.config.stale)
+
+    def test_unknown_commands_mark_snapshot_stale(self):
+        self.config.apply_commands(['interface GigabitEthernet0/1', 'spanning-tree portfast'])
+        self.assertTrue(self.config.is_stale_interface('GigabitEthernet0/1'))
+        self.config.apply_commands(['router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0'])
+        self.assertTrue(self.config.stale)
+
+
+class TestCiscoRunningConfigService(TestCase):
+    def setUp(self):
+        RunningConfigService._CACHE.clear()
+        self.cli = MagicMock()
+        self.cli.send_command = MagicMock(side_effect=self._send_command)
+        self.service = RunningConfigService(self.cli, 'switch', MagicMock())
+
+    @staticmethod
+    def _send_command(command, *args, **kwargs):
+        if command == 'show running-config':
+            return RUNNING_CONFIG
+        return 'Building configuration...\n!\ninterface GigabitEthernet0/3\n switchport mode access\nend\n'
+
+    def test_running_config_is_read_once(self):
+        self.service.get_snapshot()
+        self.service.get_interface_config('GigabitEthernet0/1')
+        self.service.apply_commands(['interface GigabitEthernet0/2', 'no shutdown'])
+        RunningConfigService(self.cli, 'switch', MagicMock()).get_interface_config('GigabitEthernet0/2')
+
+        self.assertEqual(self.cli.send_command.call_count, 1)
+        self.assertNotIn('shutdown', self.service.get_interface_config('GigabitEthernet0/2'))
+
+    def test_only_interface_is_read_without_snapshot(self):
+        self.assertEqual(self.service.get_interface_config('GigabitEthernet0/3'),
+                         'interface GigabitEthernet0/3\n switchport mode access')
+        self.cli.send_command.assert_called_once_with('show running-config interface GigabitEthernet0/3')
+
+    def test_missing_and_stale_interfaces_are_read_from_device(self):
+        self.service.get_snapshot()
+        self.assertEqual(self.service.get_interface_config('GigabitEthernet0/3'),
+                         'interface GigabitEthernet0/3\n switchport mode access')
+        self.service.get_interface_config('GigabitEthernet0/3')
+        self.assertEqual(self.cli.send_command.call_count, 2)
+
+        self.service.invalidate_interface('GigabitEthernet0/3')
+        self.service.get_interface_config('GigabitEthernet0/3')
+        self.cli.send_command.assert_called_with('show running-config interface GigabitEthernet0/3')
+        self.assertEqual(self.cli.send_command.call_count, 3)
+
+    def test_invalidated_snapshot_is_read_again(self):
+        self.service.include('^boot')
+        self.service.invalidate()
+        self.service.include('^boot')
+        self.assertEqual(self.cli.send_command.call_count, 2)
@@ -0,0 +1,33 @@
+from collections import OrderedDict
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.cli.command_template.command_template import CommandTemplate
+from cloudshell.networking.cisco.command_templates.template_registry import CommandTemplateRegistry, \
+    VLAN_CONFIGURATION_TEMPLATES
+
+
+class TestCommandTemplateRegistry(TestCase):
+    def setUp(self):
+        self.validator = MagicMock(return_value=True)
+        self.registry = CommandTemplateRegistry({'vlan': CommandTemplate('vlan {0}', self.validator, 'Wrong vlan!'),
+                                                 'interface': CommandTemplate('interface {0}', r'[\w-]+\s*[0-9/]+',
+                                                                              'Wrong interface!'),
+                                                 'exit': CommandTemplate('exit')})
+
+    def test_rendered_command_is_memoized(self):
+        self.assertEqual(self.registry.render('vlan', ['10']), 'vlan 10')
+        self.assertEqual(self.registry.render('vlan', '10'), 'vlan 10')
+        self.assertEqual(self.validator.call_count, 1)
+        self.assertEqual(self.registry.render('exit', []), 'exit')
+
+    def test_invalid_arguments_raise_template_error(self):
+        self.assertRaisesRegexp(Exception, 'Wrong interface!', self.registry.render, 'interface', ['?'])
+        self.assertRaisesRegexp(Exception, 'Wrong interface!', self.registry.render, 'interface', ['a', 'b'])
+        self.assertRaisesRegexp(Exception, 'not registered', self.registry.render, 'shutdown', [])
+
+    def test_commands_list_is_built_as_command_template_service_does(self):
+        commands = VLAN_CONFIGURATION_TEMPLATES.get_commands_list(OrderedDict(
+            [('configure_interface', 'GigabitEthernet0/1'), ('switchport_mode_trunk', []),
+             ('trunk_allow_vlan', ['10-20']), (CommandTemplate('spanning-tree portfast'), [])]))
+        self.assertEqual(commands, ['interface GigabitEthernet0/1', 'switchport mode trunk',
+                                    'switchport trunk allowed vlan 10-20', 'spanning-tree portfast'])
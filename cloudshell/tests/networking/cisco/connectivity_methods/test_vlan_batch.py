@@ -0,0 +1,120 @@
+import json
+from unittest import TestCase
+from mock import MagicMock, patch
+from cloudshell.snmp.quali_snmp import QualiMibTable
+from cloudshell.networking.cisco.cisco_connectivity_operations import CiscoConnectivityOperations
+from cloudshell.networking.cisco.cisco_vlan_inventory import CiscoVlanInventory
+from cloudshell.networking.cisco.cisco_port_name_index import PortNameIndex
+from cloudshell.networking.cisco.cisco_running_config import RunningConfigService
+
+
+def get_action(action_id, action_type, vlan_id, mode, port):
+    return {'type': action_type, 'actionId': action_id,
+            'connectionParams': {'vlanId': vlan_id, 'mode': mode, 'vlanServiceAttributes': []},
+            'actionTarget': {'fullName': 'switch/' + port, 'fullAddress': '192.168.1.1/' + port}}
+
+
+def get_resource(name, address, children=None):
+    resource = MagicMock()
+    resource.Name = name
+    resource.FullAddress = address
+    resource.ChildResources = children or []
+    return resource
+
+
+class TestCiscoConnectivityVlanBatch(TestCase):
+    def setUp(self):
+        CiscoVlanInventory._CACHE.clear()
+        CiscoVlanInventory._FAILURES.clear()
+        PortNameIndex._CACHE.clear()
+        RunningConfigService._CACHE.clear()
+        self.cli = MagicMock()
+        self.cli.send_command = MagicMock(side_effect=self._send_command)
+        self.cli.send_command_list = MagicMock(return_value='')
+        api = MagicMock()
+        ports = [get_resource('switch/Chassis 0/GigabitEthernet0-{0}'.format(index), '192.168.1.1/0/{0}'.format(index))
+                 for index in range(1, 4)]
+        api.GetResourceDetails = MagicMock(return_value=get_resource('switch', '192.168.1.1',
+                                                                     [get_resource('Chassis 0', '192.168.1.1/0',
+                                                                                   ports)]))
+        snmp_handler = MagicMock()
+        snmp_handler.get_table = MagicMock(return_value=QualiMibTable('vtpVlanState'))
+        config = MagicMock()
+        config.SUPPORTED_OS = ['IOS']
+        with patch('cloudshell.networking.cisco.cisco_connectivity_operations.get_resource_name',
+                   MagicMock(return_value='switch')):
+            self.handler = CiscoConnectivityOperations(cli=self.cli, logger=MagicMock(), api=api,
+                                                       snmp_handler=snmp_handler)
+        self.inject_patcher = patch('cloudshell.networking.cisco.cisco_connectivity_operations.inject.instance',
+                                    MagicMock(return_value=config))
+        self.inject_patcher.start()
+
+    def tearDown(self):
+        self.inject_patcher.stop()
+
+    @staticmethod
+    def _send_command(command, *args, **kwargs):
+        if command == 'show running-config interface GigabitEthernet0/1':
+            return 'interface GigabitEthernet0/1\n switchport mode access\n'
+        return ''
+
+    def _apply(self, actions):
+        request = json.dumps({'driverRequest': {'actions': actions}})
+        return json.loads(self.handler.apply_connectivity_changes(request))['driverResponse']['actionResults']
+
+    def test_actions_are_applied_in_single_session(self):
+        results = self._apply([get_action('1', 'setVlan', '10', 'Trunk', '0/1'),
+                               get_action('2', 'setVlan', '20', 'Trunk', '0/1'),
+                               get_action('3', 'setVlan', '30', 'Access', '0/2'),
+                               get_action('4', 'removeVlan', '40', 'Access', '0/3'),
+                               get_action('5', 'setVlan', '50-60', 'Access', '0/2')])
+
+        self.assertEqual([result['actionId'] for result in results], ['1', '2', '3', '4', '5'])
+        self.assertEqual([result['errorMessage'] for result in results][:4], [None] * 4)
+        self.assertIn('Access mode', results[4]['errorMessage'])
+
+        sent_lists = [call[0][0] for call in self.cli.send_command_list.call_args_list]
+        self.assertEqual(sent_lists[0], ['vlan 10,20,30', 'state active', 'no shutdown'])
+        self.assertEqual(sent_lists[1], ['interface GigabitEthernet0/1', 'no switchport mode access', 'no shutdown',
+                                         'switchport mode trunk', 'switchport trunk allowed vlan 10,20'])
+        self.assertEqual(sent_lists[2][0], 'interface GigabitEthernet0/2')
+        self.assertEqual(sent_lists[3], ['interface GigabitEthernet0/3'])
+        self.assertEqual(len(sent_lists), 4)
+        self.assertEqual(self.handler.api.GetResourceDetails.call_count, 1)
+
+    def test_failed_port_does_not_fail_other_ports(self):
+        self.cli.send_command_list = MagicMock(side_effect=['', '% Command rejected: bad vlan', ''])
+        results = self._apply([get_action('1', 'setVlan', '10', 'Access', '0/1'),
+                               get_action('2', 'setVlan', '10', 'Access', '0/2')])
+        self.assertIn('Command rejected', results[0]['errorMessage'])
+        self.assertEqual(results[1]['infoMessage'], 'Vlan Configuration Completed.')
+
+    def test_invalid_vlan_range_fails_only_its_action(self):
+        results = self._apply([get_action('1', 'setVlan', 'abc', 'Trunk', '0/1'),
+                               get_action('2', 'setVlan', '10-', 'Trunk', '0/2'),
+                               get_action('3', 'setVlan', '10', 'Access', '0/3')])
+        self.assertFalse(results[0]['success'])
+        self.assertFalse(results[1]['success'])
+        self.assertIsNone(results[2]['errorMessage'])
+        self.assertEqual(results[2]['infoMessage'], 'Vlan Configuration Completed.')
+
+    def test_overridden_action_is_reported_as_not_applied(self):
+        results = self._apply([get_action('1', 'setVlan', '10', 'Trunk', '0/1'),
+                               get_action('2', 'setVlan', '20', 'Access', '0/1')])
+        self.assertFalse(results[0]['success'])
+        self.assertIn('overridden by action 2', results[0]['errorMessage'])
+        self.assertIsNone(results[0]['infoMessage'])
+        self.assertEqual(results[1]['infoMessage'], 'Vlan Configuration Completed.')
+
+    def test_remove_then_set_on_the_same_port_both_succeed(self):
+        results = self._apply([get_action('1', 'removeVlan', '10', 'Access', '0/1'),
+                               get_action('2', 'setVlan', '20', 'Access', '0/1'),
+                               get_action('3', 'setVlan', '30', 'Access', '0/2'),
+                               get_action('4', 'removeVlan', '30', 'Access', '0/2')])
+
+        self.assertEqual([result['success'] for result in results], [True] * 4)
+        self.assertEqual([result['infoMessage'] for result in results],
+                         ['Remove Vlan Completed.', 'Vlan Configuration Completed.', 'Vlan Configuration Completed.',
+                          'Remove Vlan Completed.'])
+        sent_lists = [call[0][0] for call in self.cli.send_command_list.call_args_list]
+        self.assertIn('switchport access vlan 20', sent_lists[1])
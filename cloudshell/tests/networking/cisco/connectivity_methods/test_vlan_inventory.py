@@ -0,0 +1,47 @@
+from unittest import TestCase
+from mock import MagicMock
+from cloudshell.snmp.quali_snmp import QualiMibTable
+from cloudshell.networking.cisco.cisco_vlan_inventory import CiscoVlanInventory, parse_vlan_range
+
+
+class TestCiscoVlanInventory(TestCase):
+    def setUp(self):
+        CiscoVlanInventory._CACHE.clear()
+        CiscoVlanInventory._FAILURES.clear()
+        self.snmp_handler = MagicMock()
+        table = QualiMibTable('vtpVlanState')
+        table[1.1] = {'suffix': '1.1', 'vtpVlanState': 'operational'}
+        table['1.10'] = {'suffix': '1.10', 'vtpVlanState': 'operational'}
+        table[1.11] = {'suffix': '1.11', 'vtpVlanState': 'suspended'}
+        self.snmp_handler.get_table = MagicMock(return_value=table)
+        self.inventory = CiscoVlanInventory(self.snmp_handler, 'switch', MagicMock())
+
+    def test_vlan_range_is_parsed(self):
+        self.assertEqual(parse_vlan_range('10, 20,30-32,31'), [10, 20, 30, 31, 32])
+
+    def test_only_missing_and_inactive_vlans_are_returned(self):
+        self.assertEqual(self.inventory.get_missing_vlans('1,10-12'), '11-12')
+        self.assertEqual(self.inventory.get_missing_vlans('10'), '')
+
+    def test_vlan_table_is_walked_once_per_ttl(self):
+        self.inventory.get_missing_vlans('10')
+        CiscoVlanInventory(self.snmp_handler, 'switch', MagicMock()).get_missing_vlans('11')
+        self.assertEqual(self.snmp_handler.get_table.call_count, 1)
+
+        self.inventory.set_active('11-12')
+        self.assertEqual(self.inventory.get_missing_vlans('11-13'), '13')
+
+        self.inventory.ttl = -1
+        self.inventory.get_vlans()
+        self.assertEqual(self.snmp_handler.get_table.call_count, 2)
+
+    def test_snmp_failure_is_remembered(self):
+        self.snmp_handler.get_table.side_effect = Exception('No SNMP response received')
+        self.assertRaises(Exception, self.inventory.get_missing_vlans, '10')
+        self.assertRaises(Exception, CiscoVlanInventory(self.snmp_handler, 'switch', MagicMock()).get_missing_vlans,
+                          '10')
+        self.assertEqual(self.snmp_handler.get_table.call_count, 1)
+
+        self.inventory.failure_ttl = -1
+        self.assertRaises(Exception, self.inventory.get_missing_vlans, '10')
+        self.assertEqual(self.snmp_handler.get_table.call_count, 2)
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from unittest import TestCase
+from mock import MagicMock, patch
+from cloudshell.networking.cisco.cisco_connectivity_operations import CiscoConnectivityOperations
+from cloudshell.networking.cisco.cisco_vlan_range import VlanRange
+
+
+class TestVlanRange(TestCase):
+    def test_fragmented_ranges_are_coalesced(self):
+        vlans = VlanRange.parse('30-40,10, 11,12-20,35-45,100')
+        self.assertEqual(str(vlans), '10-20,30-45,100')
+        self.assertEqual(len(vlans), 28)
+        self.assertEqual(str(VlanRange.from_ids([5, 3, 4, 7])), '3-5,7')
+
+    def test_range_algebra(self):
+        first = VlanRange.parse('1-100,200-300')
+        second = VlanRange.parse('50-250,400')
+        self.assertEqual(str(first | second), '1-300,400')
+        self.assertEqual(str(first - second), '1-49,251-300')
+        self.assertEqual(str(first & second), '50-100,200-250')
+        self.assertEqual(str(VlanRange.all() - VlanRange.parse('1,4094')), '2-4093')
+        self.assertFalse(VlanRange.parse('10') - VlanRange.parse('1-20'))
+        self.assertIn(250, first)
+        self.assertEqual(VlanRange.parse('none'), VlanRange())
+
+    def test_range_is_split_by_length(self):
+        vlans = VlanRange.from_ids(range(2, 100, 2))
+        parts = vlans.split(30)
+        self.assertTrue(all(len(part) <= 30 for part in parts))
+        self.assertEqual(VlanRange.parse(','.join(parts)), vlans)
+        self.assertTrue(all(len(parts[index]) + len(parts[index + 1].split(',')[0]) + 1 > 30
+                            for index in range(len(parts) - 1)))
+
+    def test_wrong_range_is_rejected(self):
+        for vlan_range in ['10-5', '0', '10,4095', '4000-5000', 'abc', '10-']:
+            self.assertRaises(Exception, VlanRange.parse, vlan_range)
+        self.assertEqual(str(VlanRange.parse('1,4094')), '1,4094')
+
+
+class TestCiscoConnectivityVlanRangeCommands(TestCase):
+    def setUp(self):
+        config = MagicMock()
+        config.CLI_MAX_LINE_LENGTH = 60
+        with patch('cloudshell.networking.cisco.cisco_connectivity_operations.get_resource_name',
+                   MagicMock(return_value='switch')):
+            self.handler = CiscoConnectivityOperations(cli=MagicMock(), logger=MagicMock(), api=MagicMock())
+        self.inject_patcher = patch('cloudshell.networking.cisco.cisco_connectivity_operations.inject.instance',
+                                    MagicMock(return_value=config))
+        self.inject_patcher.start()
+        self.vlan_range = ','.join(str(vlan_id) for vlan_id in range(100, 300, 4))
+
+    def tearDown(self):
+        self.inject_patcher.stop()
+
+    def test_trunk_vlans_are_split_into_add_commands(self):
+        commands = self.handler._get_commands_list(OrderedDict([('configure_interface', 'GigabitEthernet0/1'),
+                                                                ('trunk_allow_vlan', [self.vlan_range])]))
+
+        self.assertEqual(commands[0], 'interface GigabitEthernet0/1')
+        self.assertTrue(commands[1].startswith('switchport trunk allowed vlan 100,'))
+        self.assertTrue(all(command.startswith('switchport trunk allowed vlan add ') for command in commands[2:]))
+        self.assertTrue(all(len(command) <= 60 for command in commands))
+        vlans = VlanRange.parse(','.join(command.split()[-1] for command in commands[1:]))
+        self.assertEqual(vlans, VlanRange.parse(self.vlan_range))
+
+    def test_vlan_sub_commands_are_repeated_for_each_part(self):
+        commands = self.handler._get_commands_list(OrderedDict([('configure_vlan', self.vlan_range),
+                                                                ('state_active', []), ('no_shutdown', [])]))
+
+        vlan_commands = [command for command in commands if command.startswith('vlan ')]
+        self.assertTrue(len(vlan_commands) > 1)
+        self.assertEqual(len(commands), len(vlan_commands) * 3)
+        self.assertEqual(commands[1:3], ['state active', 'no shutdown'])
+
+    def test_short_range_is_sent_as_single_command(self):
+        commands = self.handler._get_commands_list(OrderedDict([('configure_interface', 'GigabitEthernet0/1'),
+                                                                ('trunk_allow_vlan', ['10-12, 13,20'])]))
+        self.assertEqual(commands, ['interface GigabitEthernet0/1', 'switchport trunk allowed vlan 10-13,20'])
+
+    def test_reversed_range_is_not_dropped(self):
+        self.assertRaisesRegexp(Exception, 'reversed', self.handler._get_commands_list,
+                                OrderedDict([('configure_interface', 'GigabitEthernet0/1'),
+                                             ('trunk_allow_vlan', ['10-5'])]))